@@ -0,0 +1,119 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Benchmark of the Redfish crawler (ctam_redfish_uri_deep_hunt, as run by the LogServices URI
+                     test H99) against the Redfish emulator on a local port. Every run is a ctam.py process, the
+                     duration and the Redfish calls of the test are read from the Results.db of the run.
+
+:Command line:       python benchmarks/bench_crawler.py [--gpus 64] [--test-id H99] [--repeat 3]
+
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from bench_utils import BENCH_DIR, CTAM_DIR, format_result, summarize
+
+EMULATOR_DIR = BENCH_DIR.parent / "emulator"
+sys.path.append(str(EMULATOR_DIR))
+
+from redfish_emulator import start_emulator
+
+
+def create_workspace(work_dir, port):
+    """
+    :Description:                       Copy the emulator workspace and point it to the emulator port
+
+    :param str work_dir:                Directory to create the workspace in
+    :param int port:                    Port of the emulator
+
+    :returns:                           Workspace directory
+    :rtype:                             str
+    """
+    workspace = os.path.join(work_dir, "workspace")
+    shutil.copytree(EMULATOR_DIR / "workspace", workspace, ignore=shutil.ignore_patterns("TestRuns"))
+    dut_info_file = os.path.join(workspace, "dut_info.json")
+    with open(dut_info_file) as f:
+        dut_info = json.load(f)
+    dut_info["properties"]["ConnectionIPAddress"]["value"] = f"127.0.0.1:{port}"
+    with open(dut_info_file, "w") as f:
+        json.dump(dut_info, f, indent=2)
+    return workspace
+
+
+def run_test(workspace, test_id):
+    """
+    :Description:                       Run one test with ctam.py and read its result from Results.db
+
+    :param str workspace:               Workspace directory
+    :param str test_id:                 Test to run
+
+    :returns:                           (execution time in seconds, number of Redfish calls)
+    :rtype:                             Tuple
+    """
+    subprocess.run(
+        [sys.executable, "ctam.py", "-w", workspace, "-test_seq", test_id], cwd=CTAM_DIR, capture_output=True
+    )
+    run_dirs = glob.glob(os.path.join(workspace, "TestRuns", "*", "Results.db"))
+    if not run_dirs:
+        raise Exception(f"Test run of {test_id} did not create a Results.db")
+    connection = sqlite3.connect(max(run_dirs, key=os.path.getmtime))
+    try:
+        test = connection.execute(
+            "SELECT result, execution_time FROM tests WHERE test_id = ?", (test_id,)
+        ).fetchone()
+        (calls,) = connection.execute("SELECT COUNT(*) FROM redfish_calls WHERE test_id = ?", (test_id,)).fetchone()
+    finally:
+        connection.close()
+    if not test or test[0] != "PASS":
+        raise Exception(f"{test_id} did not pass against the emulator")
+    return test[1], calls
+
+
+def run(gpus=64, test_id="H99", repeat=3):
+    """
+    :Description:                       Run the crawler benchmark
+
+    :param int gpus:                    GPUs of the emulated DUT, every GPU adds resources to crawl
+    :param str test_id:                 Crawling test to run
+    :param int repeat:                  Timed runs
+
+    :returns:                           Benchmark results
+    :rtype:                             list
+    """
+    work_dir = tempfile.mkdtemp(prefix="ctam_bench_")
+    server = start_emulator({"gpus": gpus}, port=0)
+    try:
+        workspace = create_workspace(work_dir, server.server_address[1])
+        durations = []
+        calls = 0
+        for _ in range(repeat):
+            duration, calls = run_test(workspace, test_id)
+            durations.append(duration)
+        return [summarize(f"crawler.{test_id}_{gpus}_gpus", durations, items=calls, unit="requests")]
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Redfish crawler against the emulator")
+    parser.add_argument("--gpus", type=int, default=64)
+    parser.add_argument("--test-id", default="H99")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for result in run(args.gpus, args.test_id, args.repeat):
+        print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Benchmark of TestHierarchy discovery on a synthetic test tree (2000 tests by default).
+                     Measures serial parsing, parallel parsing, a cold and a warm discovery manifest.
+
+:Command line:       python benchmarks/bench_discovery.py [--groups 100] [--tests-per-group 20] [--workers 0]
+                     [--repeat 3]
+
+"""
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+
+from bench_utils import CTAM_DIR, format_result, measure
+from test_hierarchy import TestHierarchy
+
+GROUP_TEMPLATE = '''
+from typing import List
+from tests.test_group import TestGroup
+from interfaces.health_check_ifc import HealthCheckIfc
+
+
+class BenchGroup{group}(TestGroup):
+    """
+    Synthetic group {group}
+    """
+
+    group_id: str = "BG{group}"
+    tags: List[str] = ["Bench"]
+
+    def __init__(self):
+        super().__init__()
+
+    def configure_interfaces(self, health_check_ifc: HealthCheckIfc):
+        self.health_check_ifc = health_check_ifc
+
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+'''
+
+# module names of the test directories are global to the process (see TestDirectoryFinder), every tree gets its own
+tree_numbers = itertools.count()
+
+TEST_TEMPLATE = '''
+from typing import List
+from tests.test_case import TestCase
+from {module}.{module} import BenchGroup{group}
+
+
+class BenchTest{group}x{test}(TestCase):
+    """
+    Synthetic test {test} of group {group}
+    """
+
+    test_name: str = "BenchTest{group}x{test}"
+    test_id: str = "B{number}"
+    score_weight: int = 10
+    tags: List[str] = []
+    compliance_level: str = ""
+
+    def __init__(self, group: BenchGroup{group}):
+        super().__init__()
+        self.group = group
+
+    def setup(self):
+        pass
+
+    def run(self):
+        result = True
+        for step in range(10):
+            result = result and step >= 0
+        return result
+
+    def teardown(self, result):
+        pass
+'''
+
+
+def build_tree(root, groups, tests_per_group):
+    """
+    :Description:                       Write the synthetic test tree
+
+    :param str root:                    Directory to create the tree in
+    :param int groups:                  Number of test groups
+    :param int tests_per_group:         Number of tests in every group
+
+    :returns:                           Test root directory
+    :rtype:                             str
+    """
+    test_root = os.path.join(root, "tests")
+    tree = next(tree_numbers)
+    for group in range(groups):
+        module = f"bench_{tree}_group_{group}"
+        group_dir = os.path.join(test_root, "bench", module)
+        os.makedirs(group_dir)
+        with open(os.path.join(group_dir, f"{module}.py"), "w") as f:
+            f.write(GROUP_TEMPLATE.format(group=group))
+        for test in range(tests_per_group):
+            with open(os.path.join(group_dir, f"bench_{tree}_test_{group}_{test}.py"), "w") as f:
+                f.write(
+                    TEST_TEMPLATE.format(
+                        module=module, group=group, test=test, number=group * tests_per_group + test + 1
+                    )
+                )
+    return test_root
+
+
+def run(groups=100, tests_per_group=20, workers=0, repeat=3):
+    """
+    :Description:                       Run the discovery benchmarks
+
+    :param int groups:                  Number of test groups
+    :param int tests_per_group:         Number of tests in every group
+    :param int workers:                 Worker processes, 0 for one per cpu
+    :param int repeat:                  Timed runs of every benchmark
+
+    :returns:                           Benchmark results
+    :rtype:                             list
+    """
+    work_dir = tempfile.mkdtemp(prefix="ctam_bench_")
+    try:
+        test_root = build_tree(work_dir, groups, tests_per_group)
+        ifc_dir = str(CTAM_DIR / "interfaces")
+        manifest_file = os.path.join(work_dir, "discovery_manifest.json")
+        tests = groups * tests_per_group
+        hierarchies = {}
+
+        def discover(label, **kwargs):
+            hierarchies[label] = TestHierarchy(test_root_dir=test_root, ifc_dir=ifc_dir, **kwargs)
+
+        def remove_manifest():
+            if os.path.exists(manifest_file):
+                os.remove(manifest_file)
+
+        results = [
+            measure("discovery.serial", lambda: discover("serial", parse_workers=1), repeat, items=tests, unit="tests"),
+            measure(
+                "discovery.parallel",
+                lambda: discover("parallel", parse_workers=workers),
+                repeat,
+                items=tests,
+                unit="tests",
+            ),
+            measure(
+                "discovery.cold_manifest",
+                lambda _: discover("cold", manifest_file=manifest_file, parse_workers=workers),
+                repeat,
+                setup=remove_manifest,
+                items=tests,
+                unit="tests",
+            ),
+            measure(
+                "discovery.warm_manifest",
+                lambda: discover("warm", manifest_file=manifest_file, parse_workers=workers),
+                repeat,
+                items=tests,
+                unit="tests",
+            ),
+        ]
+        if hierarchies["serial"].test_groups != hierarchies["parallel"].test_groups:
+            raise Exception("Serial and parallel discovery returned different hierarchies")
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark test discovery")
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--tests-per-group", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes, 0 for one per cpu")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for result in run(args.groups, args.tests_per_group, args.workers, args.repeat):
+        print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Benchmark of PLDMUnpack parsing and of the corrupted package variants of PLDMFwpkg, on a
+                     synthetic PLDM package. Use --package-mb to benchmark multi-GB packages (up to 4 GB,
+                     the largest component offset PLDM can describe).
+
+:Command line:       python benchmarks/bench_fwpkg.py [--package-mb 256] [--components 16] [--repeat 3]
+
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from bench_utils import BENCH_DIR, format_result, measure
+from utils.fwpkg_utils import PLDMFwpkg, PLDMUnpack
+
+EMULATOR_DIR = BENCH_DIR.parent / "emulator"
+sys.path.append(str(EMULATOR_DIR))
+
+from fwpkg import build_package
+
+
+def run(package_mb=256, components=16, repeat=3):
+    """
+    :Description:                       Run the firmware package benchmarks
+
+    :param int package_mb:              Package size in MB
+    :param int components:              Number of component images
+    :param int repeat:                  Timed runs of every benchmark
+
+    :returns:                           Benchmark results
+    :rtype:                             list
+    """
+    work_dir = tempfile.mkdtemp(prefix="ctam_bench_")
+    try:
+        package = build_package(os.path.join(work_dir, "golden.fwpkg"), package_mb * 1024 * 1024, components)
+
+        def parse():
+            if not PLDMUnpack(package).parse_pldm_package():
+                raise Exception(f"Failed to parse {package}")
+
+        def variant(corrupt):
+            # the variants print progress for every component
+            with contextlib.redirect_stdout(io.StringIO()):
+                corrupted_package = corrupt(package)
+            if not corrupted_package:
+                raise Exception(f"{corrupt.__name__} failed on {package}")
+            os.remove(corrupted_package)
+
+        results = [measure("fwpkg.parse", parse, repeat, items=components, unit="components")]
+        for corrupt in (
+            PLDMFwpkg.corrupt_package_UUID,
+            PLDMFwpkg.corrupt_component_image_in_pkg,
+            PLDMFwpkg.clear_component_image_in_pkg,
+            PLDMFwpkg.corrupt_device_record_uuid_in_pkg,
+        ):
+            results.append(
+                measure(f"fwpkg.{corrupt.__name__}", lambda: variant(corrupt), repeat, items=package_mb, unit="MB")
+            )
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PLDM package parsing and corruption")
+    parser.add_argument("--package-mb", type=int, default=256)
+    parser.add_argument("--components", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for result in run(args.package_mb, args.components, args.repeat):
+        print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
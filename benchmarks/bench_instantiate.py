@@ -0,0 +1,73 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Benchmark of TestHierarchy.instantiate_obj_for_testcase on a synthetic test tree, with and
+                     without shared interface instances.
+
+:Command line:       python benchmarks/bench_instantiate.py [--groups 20] [--tests-per-group 20] [--repeat 3]
+
+"""
+import argparse
+import shutil
+import tempfile
+
+from bench_discovery import build_tree
+from bench_utils import CTAM_DIR, format_result, measure
+from test_hierarchy import TestHierarchy
+
+
+def run(groups=20, tests_per_group=20, repeat=3):
+    """
+    :Description:                       Run the instantiation benchmarks
+
+    :param int groups:                  Number of test groups
+    :param int tests_per_group:         Number of tests in every group
+    :param int repeat:                  Timed runs of every benchmark
+
+    :returns:                           Benchmark results
+    :rtype:                             list
+    """
+    work_dir = tempfile.mkdtemp(prefix="ctam_bench_")
+    try:
+        test_root = build_tree(work_dir, groups, tests_per_group)
+        hierarchy = TestHierarchy(test_root_dir=test_root, ifc_dir=str(CTAM_DIR / "interfaces"), parse_workers=1)
+        test_names = [
+            test_case["testcase_name"]
+            for group in hierarchy.test_groups.values()
+            for test_case in group["test_cases"]
+        ]
+
+        def instantiate(reuse_interfaces):
+            for test_name in test_names:
+                hierarchy.instantiate_obj_for_testcase(test_name, reuse_interfaces)
+
+        # the first instantiation imports the modules, every later one is what a run pays per test
+        instantiate(False)
+        return [
+            measure("instantiate.testcase", lambda: instantiate(False), repeat, items=len(test_names), unit="tests"),
+            measure(
+                "instantiate.testcase_reuse_interfaces",
+                lambda: instantiate(True),
+                repeat,
+                items=len(test_names),
+                unit="tests",
+            ),
+        ]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark test case instantiation")
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--tests-per-group", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for result in run(args.groups, args.tests_per_group, args.repeat):
+        print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
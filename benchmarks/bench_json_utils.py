@@ -0,0 +1,104 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Benchmark of the json_utils hunts on a large expanded FirmwareInventory payload.
+
+:Command line:       python benchmarks/bench_json_utils.py [--members 5000] [--repeat 5]
+
+"""
+import argparse
+
+from bench_utils import format_result, measure
+from utils.json_utils import jsondeephunt, jsonhunt, jsonhuntall, jsonmultihunt
+
+
+def get_firmware_inventory(members):
+    """
+    :Description:                       Expanded FirmwareInventory collection, as returned for $expand=.($levels=1)
+
+    :param int members:                 Number of inventory members
+
+    :returns:                           FirmwareInventory payload
+    :rtype:                             dict
+    """
+    uri = "/redfish/v1/UpdateService/FirmwareInventory"
+    return {
+        "@odata.id": uri,
+        "@odata.type": "#SoftwareInventoryCollection.SoftwareInventoryCollection",
+        "Name": "Firmware Inventory Collection",
+        "Members@odata.count": members,
+        "Members": [
+            {
+                "@odata.id": f"{uri}/FW_{number}",
+                "@odata.type": "#SoftwareInventory.v1_4_0.SoftwareInventory",
+                "Id": f"FW_{number}",
+                "Name": f"Firmware {number}",
+                "Version": f"1.{number // 100}.{number % 100}",
+                "SoftwareId": hex(0x10 + number % 16),
+                "Updateable": number % 3 != 0,
+                "Status": {"State": "Enabled", "Health": "OK", "Conditions": []},
+                "RelatedItem": [{"@odata.id": f"/redfish/v1/Chassis/Component_{number}"}],
+                "Oem": {"Vendor": {"ComponentIdentifier": number, "Attributes": [{"Key": "A", "Value": number}]}},
+            }
+            for number in range(members)
+        ],
+    }
+
+
+def run(members=5000, repeat=5):
+    """
+    :Description:                       Run the json_utils benchmarks
+
+    :param int members:                 Number of FirmwareInventory members
+    :param int repeat:                  Timed runs of every benchmark
+
+    :returns:                           Benchmark results
+    :rtype:                             list
+    """
+    payload = get_firmware_inventory(members)
+    last_id = f"FW_{members - 1}"
+    return [
+        measure(
+            "json_utils.jsonhunt_last_member",
+            lambda: jsonhunt(payload, "Id", last_id, "Version"),
+            repeat,
+            items=members,
+            unit="members",
+        ),
+        measure(
+            "json_utils.jsonhuntall_updateable",
+            lambda: jsonhuntall(payload, "Updateable", True, "Id", []),
+            repeat,
+            items=members,
+            unit="members",
+        ),
+        measure(
+            "json_utils.jsonmultihunt_versions",
+            lambda: jsonmultihunt(payload, "Id", "Version", {}),
+            repeat,
+            items=members,
+            unit="members",
+        ),
+        measure(
+            "json_utils.jsondeephunt_missing_key",
+            lambda: jsondeephunt(payload, "MissingKey"),
+            repeat,
+            items=members,
+            unit="members",
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark json_utils hunts")
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for result in run(args.members, args.repeat):
+        print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Benchmark of the log throughput of LoggingWriter and JsonFormatter with OCPTV artifacts.
+
+:Command line:       python benchmarks/bench_logging.py [--messages 20000] [--repeat 3]
+
+"""
+import argparse
+import itertools
+import json
+import logging
+import shutil
+import tempfile
+
+from bench_utils import format_result, measure
+from test_runner import JsonFormatter, LoggingWriter
+
+
+def get_artifacts(count, severity="INFO"):
+    """
+    :Description:                       OCPTV log artifacts as written by a test step
+
+    :param int count:                   Number of artifacts
+    :param str severity:                Log severity. Default is "INFO".
+
+    :returns:                           Serialized artifacts
+    :rtype:                             list
+    """
+    return [
+        json.dumps(
+            {
+                "testStepArtifact": {
+                    "log": {
+                        "severity": severity,
+                        "message": f"URI /redfish/v1/UpdateService/FirmwareInventory/FW_GPU_SXM_{number % 8} "
+                        f"responded with Version 1.0.{number}",
+                    },
+                    "testStepId": str(number % 10),
+                },
+                "sequenceNumber": number,
+                "timestamp": "2024-01-01T00:00:00.000000+00:00",
+            }
+        )
+        for number in range(count)
+    ]
+
+
+def run(messages=20000, repeat=3):
+    """
+    :Description:                       Run the logging benchmarks
+
+    :param int messages:                Messages logged per run
+    :param int repeat:                  Timed runs of every benchmark
+
+    :returns:                           Benchmark results
+    :rtype:                             list
+    """
+    work_dir = tempfile.mkdtemp(prefix="ctam_bench_")
+    writers = []
+    writer_names = (f"BenchLog{number}" for number in itertools.count())
+
+    def new_writer():
+        writer = LoggingWriter(work_dir, False, next(writer_names), "json", False)
+        writers.append(writer)
+        return writer
+
+    def write_all(writer, artifacts):
+        for artifact in artifacts:
+            writer.write(artifact)
+
+    try:
+        artifacts = get_artifacts(messages)
+        debug_artifacts = get_artifacts(messages, "DEBUG")
+        formatter = JsonFormatter()
+        records = [logging.LogRecord("bench", logging.INFO, "", 0, artifact, None, None) for artifact in artifacts]
+        return [
+            measure(
+                "logging.json_formatter",
+                lambda: [formatter.format(record) for record in records],
+                repeat,
+                items=messages,
+                unit="messages",
+            ),
+            measure(
+                "logging.writer",
+                lambda writer: write_all(writer, artifacts),
+                repeat,
+                setup=new_writer,
+                items=messages,
+                unit="messages",
+            ),
+            measure(
+                "logging.writer_debug_filtered",
+                lambda writer: write_all(writer, debug_artifacts),
+                repeat,
+                setup=new_writer,
+                items=messages,
+                unit="messages",
+            ),
+        ]
+    finally:
+        for writer in writers:
+            writer.logger.removeHandler(writer.file_handler)
+            writer.file_handler.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark log throughput")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for result in run(args.messages, args.repeat):
+        print(format_result(result))
+
+
+if __name__ == "__main__":
+    main()
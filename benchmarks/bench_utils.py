@@ -0,0 +1,214 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Timing helpers and the result history shared by the benchmarks.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+CTAM_DIR = BENCH_DIR.parent / "ctam"
+sys.path.append(str(CTAM_DIR))
+
+from version import __version__
+
+
+def measure(name, function, repeat=5, setup=None, items=None, unit="items"):
+    """
+    :Description:                       Time repeated runs of a function, their median is the benchmark value
+
+    :param str name:                    Benchmark name, e.g. "discovery.serial"
+    :param callable function:           Function to time, called with the return value of setup if given
+    :param int repeat:                  Number of timed runs
+    :param callable setup:              Called before every run, not timed. Default is None.
+    :param int items:                   Items processed per run, to report a throughput. Default is None.
+    :param str unit:                    Unit of items, e.g. "tests" or "MB". Default is "items".
+
+    :returns:                           Benchmark result
+    :rtype:                             dict
+    """
+    durations = []
+    for _ in range(repeat):
+        arguments = (setup(),) if setup else ()
+        start = time.perf_counter()
+        function(*arguments)
+        durations.append(time.perf_counter() - start)
+    return summarize(name, durations, items, unit)
+
+
+def summarize(name, durations, items=None, unit="items"):
+    """
+    :Description:                       Benchmark result of durations measured by the caller
+
+    :param str name:                    Benchmark name
+    :param list durations:              Durations of the runs in seconds
+    :param int items:                   Items processed per run, to report a throughput. Default is None.
+    :param str unit:                    Unit of items. Default is "items".
+
+    :returns:                           Benchmark result
+    :rtype:                             dict
+    """
+    result = {
+        "name": name,
+        "seconds": statistics.median(durations),
+        "min_seconds": min(durations),
+        "max_seconds": max(durations),
+        "repeat": len(durations),
+    }
+    if items:
+        result["items"] = items
+        result["unit"] = unit
+        result["throughput"] = items / result["seconds"] if result["seconds"] else 0
+    return result
+
+
+def format_result(result):
+    """
+    :Description:                       One line summary of a benchmark result
+
+    :param dict result:                 Benchmark result, see measure
+
+    :returns:                           Summary
+    :rtype:                             str
+    """
+    line = f"{result['name']:<40} {result['seconds'] * 1000:>12.3f} ms (min {result['min_seconds'] * 1000:.3f} ms)"
+    if "throughput" in result:
+        line += f"   {result['throughput']:.1f} {result['unit']}/s"
+    return line
+
+
+def get_machine():
+    """
+    :Description:                       Identify the machine and python the benchmarks ran on.
+                                        Results are only compared against results of the same machine.
+
+    :returns:                           Machine description
+    :rtype:                             dict
+    """
+    return {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def get_commit():
+    """
+    :Description:                       Git commit of the benchmarked tree
+
+    :returns:                           Commit hash, "" outside of a git checkout
+    :rtype:                             str
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+class BenchmarkHistory:
+    """
+    Benchmark results of every run, one json line per run in the history file, so regressions show up between
+    commits and releases. A run is compared against the latest earlier run of the same machine and python with the
+    same benchmark parameters.
+    """
+
+    def __init__(self, history_file):
+        """
+        :param history_file: json lines file, created on the first append
+        :type history_file: str
+        """
+        self.history_file = history_file
+
+    def load(self):
+        """
+        :return: runs in the history, oldest first
+        :rtype: list
+        """
+        if not os.path.isfile(self.history_file):
+            return []
+        runs = []
+        with open(self.history_file) as f:
+            for line in f:
+                if line.strip():
+                    runs.append(json.loads(line))
+        return runs
+
+    def get_baseline(self, machine, parameters):
+        """
+        :param machine: machine of the current run, see get_machine
+        :type machine: dict
+        :param parameters: benchmark parameters of the current run
+        :type parameters: dict
+        :return: latest run of the same host, python and parameters, None if there is none
+        :rtype: dict
+        """
+        for run in reversed(self.load()):
+            if (
+                run["machine"]["host"] == machine["host"]
+                and run["machine"]["python"] == machine["python"]
+                and run.get("parameters") == parameters
+            ):
+                return run
+        return None
+
+    def append(self, results, parameters, label=""):
+        """
+        :param results: benchmark results, see measure
+        :type results: list
+        :param parameters: benchmark parameters, e.g. input sizes by suite
+        :type parameters: dict
+        :param label: label of the run, e.g. a release, defaults to ""
+        :type label: str, optional
+        :return: the appended run
+        :rtype: dict
+        """
+        run = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "version": __version__,
+            "commit": get_commit(),
+            "label": label,
+            "machine": get_machine(),
+            "parameters": parameters,
+            "results": {result["name"]: result for result in results},
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.history_file)), exist_ok=True)
+        with open(self.history_file, "a") as f:
+            f.write(json.dumps(run) + "\n")
+        return run
+
+    @staticmethod
+    def compare(results, baseline, threshold=0.2):
+        """
+        :param results: benchmark results of the current run, see measure
+        :type results: list
+        :param baseline: run of the history to compare against
+        :type baseline: dict
+        :param threshold: relative slowdown reported as regression, defaults to 0.2 (20%)
+        :type threshold: float, optional
+        :return: (name, baseline seconds, seconds, relative change) of the regressed benchmarks
+        :rtype: list
+        """
+        regressions = []
+        for result in results:
+            previous = baseline["results"].get(result["name"])
+            if not previous or not previous["seconds"]:
+                continue
+            change = result["seconds"] / previous["seconds"] - 1
+            if change > threshold:
+                regressions.append((result["name"], previous["seconds"], result["seconds"], change))
+        return regressions
@@ -0,0 +1,84 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Runs the framework overhead benchmarks, appends the results to the benchmark history and
+                     reports the benchmarks that got slower than in the previous run on the same machine.
+
+:Command line:       python benchmarks/run_benchmarks.py [--only discovery fwpkg ...] [--quick] [--label v0.2.0]
+                     [--history benchmarks/history.jsonl] [--threshold 0.2] [--fail-on-regression]
+
+"""
+import argparse
+import os
+import sys
+
+import bench_crawler
+import bench_discovery
+import bench_fwpkg
+import bench_instantiate
+import bench_json_utils
+import bench_logging
+from bench_utils import BENCH_DIR, BenchmarkHistory, format_result, get_machine
+
+# suite: (run function, arguments, arguments with --quick)
+SUITES = {
+    "discovery": (bench_discovery.run, {}, {"groups": 20, "tests_per_group": 10}),
+    "instantiate": (bench_instantiate.run, {}, {"groups": 5, "tests_per_group": 10}),
+    "logging": (bench_logging.run, {}, {"messages": 2000}),
+    "json_utils": (bench_json_utils.run, {}, {"members": 1000}),
+    "fwpkg": (bench_fwpkg.run, {}, {"package_mb": 16}),
+    "crawler": (bench_crawler.run, {}, {"gpus": 8, "repeat": 1}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CTAM framework overhead benchmarks")
+    parser.add_argument("--only", nargs="+", choices=list(SUITES), help="Suites to run, default all")
+    parser.add_argument("--quick", action="store_true", help="Small inputs, e.g. to check the benchmarks run")
+    parser.add_argument("--package-mb", type=int, help="Size of the firmware package, e.g. 4000 for multi-GB")
+    parser.add_argument("--history", default=os.path.join(BENCH_DIR, "history.jsonl"), help="Benchmark history")
+    parser.add_argument("--no-history", action="store_true", help="Neither record nor compare the results")
+    parser.add_argument("--label", default="", help="Label of the run in the history, e.g. a release")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown reported as regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with 1 if there are regressions")
+    args = parser.parse_args()
+
+    results = []
+    parameters = {}
+    for suite in args.only or SUITES:
+        run, arguments, quick_arguments = SUITES[suite]
+        arguments = dict(quick_arguments if args.quick else arguments)
+        if suite == "fwpkg" and args.package_mb:
+            arguments["package_mb"] = args.package_mb
+        parameters[suite] = arguments
+        print(f"--- {suite}")
+        for result in run(**arguments):
+            print(format_result(result))
+            results.append(result)
+
+    if args.no_history:
+        return 0
+    history = BenchmarkHistory(args.history)
+    baseline = history.get_baseline(get_machine(), parameters)
+    history.append(results, parameters, args.label)
+    print(f"Results appended to {args.history}")
+    if not baseline:
+        print("No earlier run of this machine and these parameters in the history, nothing to compare")
+        return 0
+
+    regressions = history.compare(results, baseline, args.threshold)
+    baseline_name = baseline["label"] or baseline["commit"] or baseline["timestamp"]
+    for name, baseline_seconds, seconds, change in regressions:
+        print(
+            f"[WARNING]: {name} regressed by {change:.0%} against {baseline_name}: "
+            f"{baseline_seconds * 1000:.3f} ms -> {seconds * 1000:.3f} ms"
+        )
+    if not regressions:
+        print(f"No regressions against {baseline_name}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
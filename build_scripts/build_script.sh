@@ -4,7 +4,7 @@
 #
 
 # pyinstaller command to make binary
-pyinstaller_cmd="pyinstaller --add-data=/app/ctam:. --name ctam.build --paths=/app/ctam  --onefile ctam/ctam.py --workpath /tmp --distpath dist --exclude-module sqlite3"
+pyinstaller_cmd="pyinstaller --add-data=/app/ctam:. --name ctam.build --paths=/app/ctam  --onefile ctam/ctam.py --workpath /tmp --distpath dist"
 
 # static to make one executable
 staticx_cmd="staticx ./dist/ctam.build ./dist/ctam"
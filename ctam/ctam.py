@@ -3,6 +3,7 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 import argparse
+import multiprocessing
 import os
 import sys
 import traceback
@@ -14,8 +15,13 @@ from pathlib import Path
 # we need to manually adjust the path so that running the main script's imports work
 sys.path.append(str(Path(__file__).resolve().parent))
 
-from test_hierarchy import TestHierarchy
+from test_hierarchy import TestHierarchy, DiscoveryManifest
 from test_runner import TestRunner
+from fleet_runner import FleetRunner
+from utils.result_store import RunComparison
+from utils.cassette import Cassette
+from utils.profiler import TestProfiler
+from utils.ssh_tunnel_utils import SSHTunnelManager
 
 from sys import exit
 from version import __version__
@@ -69,11 +75,74 @@ def parse_args():
     parser.add_argument(
         "-w",
         "--workspace",
-        required=not any(arg in sys.argv for arg in ["-l", "--list", "-v", "--version"]),
+        required=not any(
+            arg in sys.argv for arg in ["-l", "--list", "-v", "--version", "compare", "--ssh-tunnel-manager"]
+        ),
         help="Path to workspace directory that contains test run files",
     )
 
 
+    parser.add_argument(
+        "--fleet",
+        help="Path to a fleet json file listing DUTs. Runs the selected tests against every DUT in parallel",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--shard",
+        help="Run only shard i of N of the selected tests, e.g. 2/4. Tests are balanced over the shards by duration",
+        type=str,
+    )
+
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["merge", "compare"],
+        help="merge: merge the results of the shard run directories given as run_dirs into one set of reports. "
+        "compare: compare the results of the two run directories given as run_dirs and report regressions",
+    )
+
+    parser.add_argument("run_dirs", nargs="*", help="Run directories of the shards to merge or the runs to compare")
+
+    parser.add_argument(
+        "--resume",
+        help="Path to the output directory of an interrupted test run. Runs its remaining tests and regenerates the reports",
+        type=str,
+    )
+
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record",
+        help="Record the Redfish exchanges of the run to the given cassette file",
+        type=str,
+    )
+    cassette.add_argument(
+        "--replay",
+        help="Replay the Redfish exchanges of the given cassette file instead of connecting to the DUT",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--replay-speed",
+        help="Speed of --replay relative to the recorded latencies, e.g. 100 replays 100x faster, 0 without delays",
+        type=float,
+        default=1.0,
+    )
+
+    parser.add_argument(
+        "--profile",
+        help="Profile the run of every test case: cpu (cProfile, .prof and speedscope files) or alloc (tracemalloc). "
+        "Profiles are written to the Profiles directory of the run, hotspots are added to the test report",
+        choices=TestProfiler.MODES,
+    )
+
+    parser.add_argument(
+        "--ssh-tunnel-manager",
+        help="Run an SSH tunnel manager listening on the given unix socket until interrupted. Runs whose dut_info.json "
+        "points SSHTunnelControlSocket to it share its keepalive SSH connections and tunnels",
+        metavar="SOCKET",
+    )
+
     parser.add_argument(
         "-v",
         "--version",
@@ -82,6 +151,79 @@ def parse_args():
     )
     return parser.parse_args()
 
+def get_discovery_manifest_file(test_runner_config=None, workspace_dir=None):
+    """
+    :Description:                       Get the discovery manifest cache file from the test runner config
+
+    :param dict test_runner_config:     Test runner config, None when running without workspace
+    :param str workspace_dir:           Workspace directory, None when running without workspace
+
+    :returns:                           Path to the manifest file, None if caching is disabled
+    :rtype:                             str
+    """
+    manifest_file = (test_runner_config or {}).get("discovery_manifest", "")
+    if manifest_file is False:
+        return None
+    return manifest_file or DiscoveryManifest.default_manifest_file(workspace_dir)
+
+
+def get_test_selection(args, test_hierarchy):
+    """
+    :Description:                       Get the TestRunner test selection arguments from the command line
+
+    :param args:                        Parsed arguments
+    :param TestHierarchy test_hierarchy: Discovered tests
+
+    :returns:                           TestRunner keyword arguments selecting the tests
+    :rtype:                             Dict
+    """
+    if args.testcase:
+        return {"single_test_override": args.testcase}
+    if args.testcase_sequence:
+        return {"sequence_test_override": args.testcase_sequence}
+    if args.group:
+        return {"single_group_override": args.group}
+    if args.group_sequence:
+        return {"sequence_group_override": args.group_sequence}
+    return {"run_all_tests": test_hierarchy.get_all_tests()}
+
+
+def get_shard(shard):
+    """
+    :Description:                       Parse the --shard argument
+
+    :param str shard:                   Shard as "i/N", None if the run is not sharded
+
+    :returns:                           (index, count), None if the run is not sharded
+    :rtype:                             Tuple
+    """
+    if not shard:
+        return None
+    try:
+        index, count = (int(value) for value in shard.split("/"))
+    except ValueError:
+        raise Exception(f"Invalid shard {shard}, expected i/N, e.g. 2/4")
+    if not 1 <= index <= count:
+        raise Exception(f"Invalid shard {shard}, i must be between 1 and N")
+    return index, count
+
+
+def get_cassette(args):
+    """
+    :Description:                       Open the cassette of the --record or --replay argument
+
+    :param argparse.Namespace args:     Command line arguments
+
+    :returns:                           Cassette, None if the run is neither recorded nor replayed
+    :rtype:                             Cassette
+    """
+    if args.record:
+        return Cassette(args.record, Cassette.RECORD)
+    if args.replay:
+        return Cassette(args.replay, Cassette.REPLAY, speed=args.replay_speed)
+    return None
+
+
 def get_exception_details(exec: Exception = ""):
     """
     :Description:                           It will trace back the exception object for getting
@@ -127,12 +269,22 @@ def main():
             print(f"CTAM - version {__version__}")
             exit()
 
+        if args.ssh_tunnel_manager:
+            SSHTunnelManager().serve(args.ssh_tunnel_manager)
+            return 0, None, "SSH tunnel manager stopped"
+
+        if args.command == "compare":
+            if len(args.run_dirs) != 2:
+                return 1, None, "compare needs two run directories"
+            status_code, exit_string = RunComparison(*args.run_dirs).run()
+            return status_code, None, exit_string
+
         default_config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "json_spec", "input")
         default_config_path = default_config_path.replace('/tmp/', '') if default_config_path.startswith('/tmp/') else default_config_path 
         if not args.workspace:
             ifc_dir = os.path.join(os.path.dirname(__file__), "interfaces")
             ext_test_root_dir =  os.path.join(os.path.dirname(__file__), "tests")
-            test_hierarchy = TestHierarchy(ext_test_root_dir, ifc_dir)
+            test_hierarchy = TestHierarchy(ext_test_root_dir, ifc_dir, get_discovery_manifest_file())
             if args.list:
                 test_hierarchy.print_test_groups_test_cases(args.group)
                 return 0, None, "List of tests is printed"
@@ -200,14 +352,63 @@ def main():
         if internal_testing:
             int_test_root_dir =  os.path.join(test_ifc_root_dir, "internal_tests")
             test_root_dir =  [ext_test_root_dir, int_test_root_dir]
-            test_hierarchy = TestHierarchy(test_root_dir, ifc_dir)
+            test_hierarchy = TestHierarchy(
+                test_root_dir,
+                ifc_dir,
+                get_discovery_manifest_file(test_runner_config, args.workspace),
+                test_runner_config.get("discovery_workers", 0),
+            )
         else:
-            test_hierarchy = TestHierarchy(ext_test_root_dir, ifc_dir)
+            test_hierarchy = TestHierarchy(
+                ext_test_root_dir,
+                ifc_dir,
+                get_discovery_manifest_file(test_runner_config, args.workspace),
+                test_runner_config.get("discovery_workers", 0),
+            )
 
         if args.list:
             test_hierarchy.print_test_groups_test_cases(args.group)
             return 0, None, "List of tests is printed"
 
+        if args.fleet:
+            # a cassette, shard or interrupted run belongs to a single dut run
+            unsupported = [
+                option
+                for option, value in (
+                    ("--record", args.record),
+                    ("--replay", args.replay),
+                    ("--shard", args.shard),
+                    ("--resume", args.resume),
+                    ("-d", args.Discovery),
+                    (args.command, args.command),
+                )
+                if value
+            ]
+            if unsupported:
+                return 1, None, f"--fleet can not be combined with {', '.join(unsupported)}"
+            fleet_runner = FleetRunner(
+                fleet_file=args.fleet,
+                workspace_dir=args.workspace,
+                runner_files={
+                    "test_runner_json_file": test_runner_json,
+                    "dut_info_json_file": dut_info_json,
+                    "package_info_json_file": package_info_json,
+                    "redfish_uri_config_file": redfish_uri_config,
+                    "redfish_response_messages": redfish_response_messages,
+                    "net_rc": net_rc,
+                },
+                hierarchy_args={
+                    "test_root_dir": test_hierarchy.test_root_dir,
+                    "ifc_dir": ifc_dir,
+                    "manifest_file": get_discovery_manifest_file(test_runner_config, args.workspace),
+                },
+                selection=get_test_selection(args, test_hierarchy),
+                runner_args={"profile": args.profile},
+            )
+            status_code, exit_string = fleet_runner.run()
+            log_directory = os.path.relpath(fleet_runner.output_dir, os.getcwd())
+            return status_code, log_directory, exit_string
+
         if args.Discovery:
             runner = TestRunner(
                 workspace_dir=args.workspace,
@@ -218,71 +419,31 @@ def main():
                 redfish_uri_config_file=redfish_uri_config,
                 redfish_response_messages=redfish_response_messages,
                 net_rc=net_rc,
+                cassette=get_cassette(args),
             )
             status_code, exit_string = runner.get_system_details()
             return status_code, None, exit_string
 
-        elif args.testcase:
-            runner = TestRunner(
-                workspace_dir=args.workspace,
-                test_hierarchy=test_hierarchy,
-                test_runner_json_file=test_runner_json,
-                dut_info_json_file=dut_info_json,
-                package_info_json_file=package_info_json,
-                redfish_uri_config_file=redfish_uri_config,
-                redfish_response_messages=redfish_response_messages,
-                net_rc=net_rc,
-                single_test_override=args.testcase,
-            )
-        elif args.testcase_sequence:
-            runner = TestRunner(
-                workspace_dir=args.workspace,
-                test_hierarchy=test_hierarchy,
-                test_runner_json_file=test_runner_json,
-                dut_info_json_file=dut_info_json,
-                package_info_json_file=package_info_json,
-                redfish_uri_config_file=redfish_uri_config,
-                redfish_response_messages=redfish_response_messages,
-                net_rc=net_rc,
-                sequence_test_override=args.testcase_sequence,
-            )
-        elif args.group:
-            runner = TestRunner(
-                workspace_dir=args.workspace,
-                test_hierarchy=test_hierarchy,
-                test_runner_json_file=test_runner_json,
-                dut_info_json_file=dut_info_json,
-                package_info_json_file=package_info_json,
-                redfish_uri_config_file=redfish_uri_config,
-                redfish_response_messages=redfish_response_messages,
-                net_rc=net_rc,
-                single_group_override=args.group,
-            )
-        elif args.group_sequence:
-            runner = TestRunner(
-                workspace_dir=args.workspace,
-                test_hierarchy=test_hierarchy,
-                test_runner_json_file=test_runner_json,
-                dut_info_json_file=dut_info_json,
-                package_info_json_file=package_info_json,
-                redfish_uri_config_file=redfish_uri_config,
-                redfish_response_messages=redfish_response_messages,
-                net_rc=net_rc,
-                sequence_group_override=args.group_sequence,
-            )
-        else:
-            all_tests = test_hierarchy.get_all_tests()
-            runner = TestRunner(
-                workspace_dir=args.workspace,
-                test_hierarchy=test_hierarchy,
-                test_runner_json_file=test_runner_json,
-                dut_info_json_file=dut_info_json,
-                package_info_json_file=package_info_json,
-                net_rc=net_rc,
-                redfish_uri_config_file=redfish_uri_config,
-                redfish_response_messages=redfish_response_messages,
-                run_all_tests=all_tests
-            )
+        runner = TestRunner(
+            workspace_dir=args.workspace,
+            test_hierarchy=test_hierarchy,
+            test_runner_json_file=test_runner_json,
+            dut_info_json_file=dut_info_json,
+            package_info_json_file=package_info_json,
+            redfish_uri_config_file=redfish_uri_config,
+            redfish_response_messages=redfish_response_messages,
+            net_rc=net_rc,
+            resume_dir=args.resume,
+            shard=get_shard(args.shard),
+            cassette=None if args.command == "merge" else get_cassette(args),
+            profile=args.profile,
+            # a resumed run continues the test selection of the interrupted run
+            **({} if args.resume else get_test_selection(args, test_hierarchy)),
+        )
+        if args.command == "merge":
+            status_code, exit_string = runner.merge_runs(args.run_dirs)
+            log_directory = os.path.relpath(runner.output_dir, os.getcwd())
+            return status_code, log_directory, exit_string
 
         status_code, exit_string = runner.run()
         log_directory = os.path.relpath(runner.output_dir, os.getcwd())
@@ -295,6 +456,8 @@ def main():
 
 
 if __name__ == "__main__":
+    # test discovery may use worker processes, which needs this in the frozen (pyinstaller) executable
+    multiprocessing.freeze_support()
     status_code, log_directory, exit_string = main()
     print("\nTest exited with status code*: {} - {}".format("FAIL" if status_code else "PASS", exit_string))
     print(f"Log Directory: {log_directory}")
@@ -0,0 +1,240 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+"""
+import contextlib
+import json
+import multiprocessing
+import os
+import traceback
+from datetime import datetime, timedelta
+
+from prettytable import PrettyTable
+
+from version import __version__
+
+
+class FleetRunner:
+    """
+    Runs the same test selection against many DUTs. Every DUT runs in its own worker process with its own
+    TestRunner, so the DUTs share neither connections nor loggers. Each DUT gets its own output directory below
+    a common fleet directory, which also receives the merged fleet report.
+
+    Fleet file format::
+
+        {
+            "max_parallel": 8,
+            "duts": [
+                {"name": "node01", "overrides": {"ConnectionIPAddress": "10.0.0.11"}},
+                {"name": "node02", "dut_info": "node02_dut_info.json", "net_rc": "node02.netrc"}
+            ]
+        }
+
+    "dut_info" and "net_rc" default to the files of the workspace, relative paths are relative to the fleet file.
+    "overrides" replaces the "value" of dut_info properties.
+    """
+
+    def __init__(self, fleet_file, workspace_dir, runner_files, hierarchy_args, selection, runner_args=None):
+        """
+        :param fleet_file: fleet definition json file
+        :type fleet_file: str
+        :param workspace_dir: workspace directory
+        :type workspace_dir: str
+        :param runner_files: TestRunner file arguments shared by all DUTs (test_runner_json_file, dut_info_json_file,
+            package_info_json_file, redfish_uri_config_file, redfish_response_messages, net_rc)
+        :type runner_files: dict
+        :param hierarchy_args: TestHierarchy arguments (test_root_dir, ifc_dir, manifest_file) to rediscover the
+            tests in the worker processes
+        :type hierarchy_args: dict
+        :param selection: TestRunner test selection arguments, e.g. {"single_group_override": "GH1"}
+        :type selection: dict
+        :param runner_args: further TestRunner arguments of all DUTs, e.g. {"profile": "cpu"}, defaults to None
+        :type runner_args: dict, optional
+        """
+        with open(fleet_file) as f:
+            fleet_config = json.load(f)
+        fleet_dir = os.path.dirname(os.path.abspath(fleet_file))
+
+        self.workspace_dir = workspace_dir
+        self.runner_files = runner_files
+        self.hierarchy_args = hierarchy_args
+        self.selection = selection
+        self.runner_args = runner_args or {}
+        self.duts = fleet_config.get("duts", [])
+        if not self.duts:
+            raise Exception(f"No duts defined in fleet file {fleet_file}")
+        names = [dut.get("name") for dut in self.duts]
+        if None in names or len(set(names)) != len(names):
+            raise Exception(f"Every dut in fleet file {fleet_file} needs a unique name")
+        for dut in self.duts:
+            for key in ("dut_info", "net_rc"):
+                if dut.get(key):
+                    dut[key] = os.path.join(fleet_dir, dut[key])
+        self.max_parallel = min(fleet_config.get("max_parallel", len(self.duts)), len(self.duts))
+
+        with open(runner_files["test_runner_json_file"]) as f:
+            output_override = json.load(f).get("output_override_directory", "")
+        self.dt = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
+        self.runs_dir = os.path.join("TestRuns", f"Fleet_{self.dt}")
+        self.output_dir = os.path.join(workspace_dir, output_override, self.runs_dir)
+
+    def run(self):
+        """
+        Run the suite on all DUTs and write the fleet report
+
+        :return: status_code, exit_string
+        :rtype: int, str
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        print(f"Fleet run of {len(self.duts)} duts, {self.max_parallel} in parallel. Output Dir is : {self.output_dir}")
+
+        jobs = [self._get_node_job(dut) for dut in self.duts]
+        # a fresh process per DUT, loggers are registered by name and would otherwise leak into the next run
+        with multiprocessing.Pool(processes=self.max_parallel, maxtasksperchild=1) as pool:
+            node_results = pool.map(run_fleet_node, jobs, chunksize=1)
+
+        self.generate_fleet_report(node_results)
+        failed_nodes = [node["name"] for node in node_results if node["status_code"]]
+        if failed_nodes:
+            return 1, f"Fleet run failed on {len(failed_nodes)} of {len(node_results)} duts: {', '.join(failed_nodes)}"
+        return 0, f"Fleet run is complete on {len(node_results)} duts"
+
+    def _get_node_job(self, dut):
+        """
+        Build the arguments of the worker process of a DUT. Property overrides are written into a dut_info file
+        of that DUT in the fleet directory.
+
+        :param dut: entry of the fleet file
+        :type dut: dict
+        :return: worker arguments
+        :rtype: dict
+        """
+        runner_files = dict(self.runner_files)
+        dut_info_json_file = dut.get("dut_info") or runner_files["dut_info_json_file"]
+        if dut.get("overrides"):
+            with open(dut_info_json_file) as f:
+                dut_config = json.load(f)
+            for property_name, value in dut["overrides"].items():
+                dut_config["properties"].setdefault(property_name, {})["value"] = value
+            dut_info_json_file = os.path.join(self.output_dir, f"{dut['name']}_dut_info.json")
+            with open(dut_info_json_file, "w") as f:
+                json.dump(dut_config, f, indent=4)
+        runner_files["dut_info_json_file"] = dut_info_json_file
+        runner_files["net_rc"] = dut.get("net_rc") or runner_files["net_rc"]
+
+        return {
+            "name": dut["name"],
+            "workspace_dir": self.workspace_dir,
+            "runner_files": runner_files,
+            "hierarchy_args": self.hierarchy_args,
+            "selection": self.selection,
+            "runner_args": self.runner_args,
+            "runs_dir": os.path.join(self.runs_dir, dut["name"]),
+            "console_file": os.path.join(self.output_dir, f"{dut['name']}_console.log"),
+        }
+
+    def generate_fleet_report(self, node_results):
+        """
+        Write the merged fleet report, a table with one row per DUT and a json file with the per test results of
+        every DUT.
+
+        :param node_results: results returned by run_fleet_node
+        :type node_results: List[dict]
+        """
+        t = PrettyTable(
+            ["DUT", "Result", "Tests Passed", "Total Score", "Max Score", "Grade", "Execution Time", "Failed Tests"]
+        )
+        t.title = f"Fleet Result -  V {__version__}"
+        for node in node_results:
+            passed = sum(1 for test in node["tests"] if test["result"] == "PASS")
+            t.add_row(
+                [
+                    node["name"],
+                    "FAIL" if node["status_code"] else "PASS",
+                    f"{passed}/{len(node['tests'])}",
+                    node["total_score"],
+                    node["max_score"],
+                    f"{node['grade']}%",
+                    timedelta(seconds=node["execution_time"]),
+                    " ".join(test["test_id"] for test in node["tests"] if test["result"] != "PASS"),
+                ]
+            )
+        t.align["DUT"] = "l"
+        t.align["Failed Tests"] = "l"
+
+        report = str(t)
+        for node in node_results:
+            if node["status_code"]:
+                report += f"\n{node['name']}: {node['exit_string']}"
+
+        with open(os.path.join(self.output_dir, f"FleetReport_{self.dt}.log"), "w") as f:
+            f.write(report + "\n")
+        with open(os.path.join(self.output_dir, f"FleetReport_{self.dt}.json"), "w") as f:
+            json.dump({"version": __version__, "duts": node_results}, f, indent=4)
+        print(report)
+
+
+def run_fleet_node(job):
+    """
+    Worker process entry point, runs the suite against one DUT. The console output of the run goes to the console
+    file of the DUT, so parallel runs do not interleave on the terminal.
+
+    :param job: arguments built by FleetRunner._get_node_job
+    :type job: dict
+    :return: summary of the run, see FleetRunner.generate_fleet_report
+    :rtype: dict
+    """
+    # imported here so that the parent process does not need the test framework modules
+    from test_hierarchy import TestHierarchy
+    from test_runner import TestRunner
+
+    result = {
+        "name": job["name"],
+        "status_code": 1,
+        "exit_string": "",
+        "output_dir": None,
+        "total_score": 0,
+        "max_score": 0,
+        "grade": 0,
+        "execution_time": 0,
+        "tests": [],
+    }
+    with open(job["console_file"], "w") as console, contextlib.redirect_stdout(console), contextlib.redirect_stderr(
+        console
+    ):
+        try:
+            test_hierarchy = TestHierarchy(**job["hierarchy_args"], parse_workers=1)
+            runner = TestRunner(
+                workspace_dir=job["workspace_dir"],
+                test_hierarchy=test_hierarchy,
+                runs_dir=job["runs_dir"],
+                **job["runner_files"],
+                **job["selection"],
+                **job["runner_args"],
+            )
+            result["status_code"], result["exit_string"] = runner.run()
+            result["output_dir"] = runner.output_dir
+            if runner.run_context:
+                result["total_score"] = runner.run_context.total_compliance_score
+                result["max_score"] = runner.run_context.max_compliance_score
+                result["grade"] = round(runner.run_context.grade, 2)
+                result["execution_time"] = runner.run_context.total_execution_time
+            result["tests"] = [
+                {
+                    "test_id": test_id,
+                    "test_name": test_name,
+                    "execution_time": execution_time.total_seconds(),
+                    "score_weight": score_weight,
+                    "score": score,
+                    "result": test_result,
+                }
+                for test_id, test_name, execution_time, score_weight, score, test_result in runner.test_result_data
+                if test_id != "Total"
+            ]
+        except Exception as e:
+            traceback.print_exc()
+            result["exit_string"] = f"Test failed due to exception: {e}"
+    return result
@@ -6,9 +6,11 @@ This source code is licensed under the MIT license found in the
 LICENSE file in the root directory of this source tree.
 """
 
+import contextvars
 import os
 import typing as ty
 import redfish
+from redfish.rest.v1 import RestRequest, RestResponse
 import subprocess
 import platform
 import json
@@ -25,6 +27,38 @@ from ocptv.output import Dut
 from interfaces.uri_builder import UriBuilder
 # from sshtunnel import SSHTunnelForwarder, HandlerSSHTunnelForwarderError
 from utils.ssh_tunnel_utils import SSHTunnel
+from utils.power_drivers import get_power_driver
+from utils.cassette import Cassette
+from utils.clock import Clock
+from utils.events import EventBus
+from utils.log_policy import ResponseLogPolicy
+from utils.metrics import MetricsRegistry
+from utils.tracing import trace_span
+
+
+class ContextLocal:
+    """
+    Descriptor for CompToolDut attributes that belong to the test case being run, such as its command logger.
+    Test cases that run concurrently each run in their own contextvars context, so every test sees its own value.
+    Values set before the test cases are started are inherited by all of them.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def _var(self, obj) -> contextvars.ContextVar:
+        context_vars = obj.__dict__.setdefault("_context_vars", {})
+        if self.name not in context_vars:
+            context_vars[self.name] = contextvars.ContextVar(self.name, default=None)
+        return context_vars[self.name]
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return self._var(obj).get()
+
+    def __set__(self, obj, value):
+        self._var(obj).set(value)
 
 
 class CompToolDut(Dut):
@@ -37,6 +71,13 @@ class CompToolDut(Dut):
     :type Dut: ocptv.output.Dut
     """
 
+    # per test case state, see ContextLocal
+    current_test_name = ContextLocal()
+    current_test_id = ContextLocal()
+    logger = ContextLocal()
+    response_log_policy = ContextLocal()
+    request_stats = ContextLocal()  # attempts and timed out attempts of the Redfish call in progress
+
     def __init__(
         self,
         id: str,
@@ -52,6 +93,7 @@ class CompToolDut(Dut):
         test_uri_response_check,
         redfish_response_messages,
         logger_path,
+        response_log_policy: ty.Optional[ResponseLogPolicy] = None,
         name: ty.Optional[str] = None,
         metadata: ty.Optional[Metadata] = None,
     ):
@@ -62,6 +104,8 @@ class CompToolDut(Dut):
         :type id: str
         :param debugMode: true if in debug mode
         :type debugMode: bool
+        :param response_log_policy: policy deciding how response bodies are logged, defaults to full logging
+        :type response_log_policy: ty.Optional[ResponseLogPolicy], optional
         :param name: name to identify dyt, defaults to None
         :type name: ty.Optional[str], optional
         :param metadata: additional descriptive data, defaults to None
@@ -74,6 +118,11 @@ class CompToolDut(Dut):
         self.redfish_uri_config = redfish_uri_config
         self.uri_builder = UriBuilder(redfish_uri_config)
         self.current_test_name = ""
+        self.current_test_id = None
+        self.event_bus = None  # EventBus of the run, every Redfish call is published to it
+        self.cassette = None  # Cassette the Redfish exchanges are recorded to or replayed from
+        self.metrics = MetricsRegistry()  # latency histograms and counters of the Redfish calls, by endpoint
+        self.clock = Clock()  # clock the waits of the tests go through
         self.net_rc = net_rc
         self.logger = logger
         self.workspace_dir = workspace_dir
@@ -81,6 +130,7 @@ class CompToolDut(Dut):
         self.test_info_logger = test_info_logger
         self.test_uri_response_check = test_uri_response_check
         self.redfish_response_messages = redfish_response_messages
+        self.response_log_policy = response_log_policy or ResponseLogPolicy()
         self.cwd = self.get_cwd()
         super().__init__(id, name, metadata)
         self.connection_ip_address = config["properties"]["ConnectionIPAddress"][
@@ -105,7 +155,11 @@ class CompToolDut(Dut):
         
         self.redfish_ifc = None
         self.redfish_auth = config["properties"].get("AuthenticationRequired", {}).get("value", False)
-        self.ssh_tunnel = SSHTunnel(self.test_info_logger)
+        self.ssh_tunnel = SSHTunnel(
+            self.test_info_logger, config["properties"].get("SSHTunnelControlSocket", {}).get("value", "")
+        )
+        self.power_on_time = None  # clock time of the last power on of an AC reset
+        self.power_driver = get_power_driver(self)
     
     def get_cwd(self):
         cwd = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -115,8 +169,13 @@ class CompToolDut(Dut):
     def set_up_connection(self):
         """
         This method sets up connection to the DUT,
-        which includes ssh_tunneling, Redfish client setup and login if needed
+        which includes ssh_tunneling, Redfish client setup and login if needed.
+        Nothing is connected when the Redfish exchanges are replayed from a cassette.
         """
+        if self.cassette and self.cassette.replaying:
+            self.__connection_url = f"{self.protocol}://" + self.connection_ip_address
+            return
+
         # Set up SSH Tunneling if requested
         if self.ssh_tunnel_required:
             # Set up port forwarding
@@ -141,6 +200,7 @@ class CompToolDut(Dut):
             default_prefix=self.default_prefix,
             timeout=30
         )
+        self._count_attempts(self.redfish_ifc._session)
 
         if self.redfish_auth:
             self.redfish_ifc.login(auth="basic")   #TODO investigate 'session' token auth
@@ -182,7 +242,7 @@ class CompToolDut(Dut):
     def connection_url(self, value):
         raise Exception("Connection IP can not be override...")
 
-    def run_redfish_command(self, uri, mode="GET", body=None, headers=None, timeout=None):
+    def run_redfish_command(self, uri, mode="GET", body=None, headers=None, timeout=None, max_retry=None):
         """
         This method is for running redfish commands according to mode and log the output into
         a formatted log file and return the response
@@ -195,6 +255,10 @@ class CompToolDut(Dut):
         :type body: ty.Optional[dict], optional
         :param header: header for requests, defaults to None
         :type metadata: ty.Optional[dict], optional
+        :param timeout: seconds to wait for the connection and the response, defaults to None (client timeout)
+        :type timeout: float, optional
+        :param max_retry: retries after a timeout, defaults to None (client retries)
+        :type max_retry: int, optional
 
         :return: response for requests
         :rtype: response object or None in case of failure
@@ -202,6 +266,8 @@ class CompToolDut(Dut):
         try:
             start_time = time.time()
             response = None
+            time_difference_seconds = None
+            self.request_stats = {"attempts": 0, "timeouts": 0}
             msg = {
                     "TimeStamp": datetime.now().strftime("%m-%d-%YT%H:%M:%S"),
                     "TestName": self.current_test_name,
@@ -210,22 +276,24 @@ class CompToolDut(Dut):
             kwargs = {"path": uri, "headers": headers}
             if timeout is not None:
                 kwargs.update({"timeout": timeout})
+            if max_retry is not None:
+                kwargs.update({"max_retry": max_retry})
                 
             if mode == "POST":
                 msg.update({"Method":"POST"})
                 #msg.update({"Method":"POST","Data":"{}".format(body),}) # FIXME: It floods the logs. Do we need to log the entire body? 
                 kwargs.update({"body": body})
-                response = self.redfish_ifc.post(**kwargs) # path=uri, body=body, headers=headers
+                response = self._send_redfish("POST", kwargs)
             elif mode == "PATCH":
                 msg.update({"Mode":"PATCH","Data":"{}".format(body),})
                 kwargs.update({"body": body})
-                response = self.redfish_ifc.patch(**kwargs) # path=uri, body=body, headers=headers
+                response = self._send_redfish("PATCH", kwargs)
             elif mode == "GET":
                 msg.update({"Method":"GET",})
-                response = self.redfish_ifc.get(**kwargs) # path=uri, headers=headers
+                response = self._send_redfish("GET", kwargs)
             elif mode == "DELETE":
                 msg.update({"Method":"DELETE",})
-                response = self.redfish_ifc.delete(**kwargs) # path=uri, headers=headers   
+                response = self._send_redfish("DELETE", kwargs)
             
             end_time = time.time()
             time_difference_seconds = end_time - start_time
@@ -238,10 +306,9 @@ class CompToolDut(Dut):
             msg.update({"ResponseTime": "{}".format(formatted_time)})
 
             if response.status in range (200,204) and response.text: # FIXME: Add error handling in case the request fails
-                msg.update({
-                    "ResponseCode": response.status,
-                    "Response":response.dict, # FIXME: self-test report cannot be converted to dict # FIXED: Throws error in some cases when response.dict is used and the response body is empty
-                    }) 
+                msg.update({"ResponseCode": response.status})
+                # FIXME: self-test report cannot be converted to dict # FIXED: Throws error in some cases when response.dict is used and the response body is empty
+                msg.update(self.response_log_policy.render(uri, response.dict, msg["TimeStamp"]))
             elif response.status in range (200,204):
                 msg.update({
                     "ResponseCode": response.status,
@@ -264,6 +331,13 @@ class CompToolDut(Dut):
             })
         finally:                         
             self.logger.write(json.dumps(msg))
+            bytes_sent = MetricsRegistry.get_request_size(body)
+            if response is not None:
+                self._publish_redfish_call(
+                    mode, uri, response.status, time_difference_seconds, response.text, bytes_sent
+                )
+            else:
+                self._publish_redfish_call(mode, uri, None, time.time() - start_time, None, bytes_sent)
             return response
         
     
@@ -287,6 +361,8 @@ class CompToolDut(Dut):
         try:
             start_time = time.time()
             response = None
+            time_difference_seconds = None
+            self.request_stats = {"attempts": 0, "timeouts": 0}
             msg = {
                     "TimeStamp": datetime.now().strftime("%m-%d-%YT%H:%M:%S"),
                     "TestName": self.current_test_name,
@@ -302,17 +378,17 @@ class CompToolDut(Dut):
                 msg.update({"Method":"POST"})
                 #msg.update({"Method":"POST","Data":"{}".format(body),}) # FIXME: It floods the logs. Do we need to log the entire body? 
                 kwargs.update({"body": body})
-                response = requests.post(url=url, data=body, files=files, headers=headers, auth=auth, verify=verify) # path=uri, body=body, headers=headers
+                response = self._send_request("POST", url, uri, body, files, headers, auth, verify)
             elif mode == "PATCH":
                 msg.update({"Mode":"PATCH","Data":"{}".format(body),})
                 kwargs.update({"body": body})
-                response = requests.patch(url=url, data=body, files=files, headers=headers, auth=auth, verify=verify) # path=uri, body=body, headers=headers
+                response = self._send_request("PATCH", url, uri, body, files, headers, auth, verify)
             elif mode == "GET":
                 msg.update({"Method":"GET",})
-                response = requests.get(url=url, data=body, files=files, headers=headers, auth=auth, verify=verify)# path=uri, headers=headers
+                response = self._send_request("GET", url, uri, body, files, headers, auth, verify)
             elif mode == "DELETE":
                 msg.update({"Method":"DELETE",})
-                response = requests.delete(url=url, data=body, files=files, headers=headers, auth=auth, verify=verify) # path=uri, headers=headers   
+                response = self._send_request("DELETE", url, uri, body, files, headers, auth, verify)
             
             end_time = time.time()
             time_difference_seconds = end_time - start_time
@@ -325,10 +401,9 @@ class CompToolDut(Dut):
             msg.update({"ResponseTime": "{}".format(formatted_time)})
 
             if response.status_code in range (200,204) and response.text: # FIXME: Add error handling in case the request fails
-                msg.update({
-                    "ResponseCode": response.status_code,
-                    "Response":response.json(), # FIXME: self-test report cannot be converted to dict # FIXED: Throws error in some cases when response.dict is used and the response body is empty
-                    }) 
+                msg.update({"ResponseCode": response.status_code})
+                # FIXME: self-test report cannot be converted to dict # FIXED: Throws error in some cases when response.dict is used and the response body is empty
+                msg.update(self.response_log_policy.render(uri, response.json(), msg["TimeStamp"]))
             elif response.status_code in range (200,204):
                 msg.update({
                     "ResponseCode": response.status_code,
@@ -351,8 +426,164 @@ class CompToolDut(Dut):
             })
         finally:                         
             self.logger.write(json.dumps(msg))
+            bytes_sent = MetricsRegistry.get_request_size(body, files)
+            if response is not None:
+                self._publish_redfish_call(
+                    mode, uri, response.status_code, time_difference_seconds, response.content, bytes_sent
+                )
+            else:
+                self._publish_redfish_call(mode, uri, None, time.time() - start_time, None, bytes_sent)
             return response
 
+    def _send_redfish(self, mode, kwargs):
+        """
+        Send a request with the Redfish client, or replay it from the cassette
+
+        :param mode: HTTP method
+        :type mode: str
+        :param kwargs: arguments of the Redfish client request (path, headers, body, timeout)
+        :type kwargs: dict
+        :return: response
+        :rtype: RestResponse
+        """
+        request_hash = Cassette.request_hash(kwargs.get("body")) if self.cassette else ""
+        if self.cassette and self.cassette.replaying:
+            http_response = self.cassette.replay(mode, kwargs["path"], request_hash)
+            return RestResponse(RestRequest(kwargs["path"], mode, kwargs.get("body") or ""), http_response)
+        start_time = time.time()
+        response = getattr(self.redfish_ifc, mode.lower())(**kwargs)
+        if self.cassette and response is not None:
+            self.cassette.record(
+                mode,
+                kwargs["path"],
+                request_hash,
+                response.status,
+                dict(response.getheaders()),
+                response.read,
+                time.time() - start_time,
+            )
+        return response
+
+    def _send_request(self, mode, url, uri, body, files, headers, auth, verify):
+        """
+        Send a request with requests, or replay it from the cassette
+
+        :return: response
+        :rtype: requests.Response
+        """
+        request_hash = Cassette.request_hash(body, files) if self.cassette else ""
+        if self.cassette and self.cassette.replaying:
+            return self.cassette.replay(mode, uri, request_hash)
+        start_time = time.time()
+        self.request_stats["attempts"] += 1
+        try:
+            response = requests.request(
+                mode, url=url, data=body, files=files, headers=headers, auth=auth, verify=verify
+            )
+        except requests.exceptions.Timeout:
+            self.request_stats["timeouts"] += 1
+            raise
+        if self.cassette:
+            latency = time.time() - start_time
+            self.cassette.record(
+                mode, uri, request_hash, response.status_code, response.headers, response.content, latency
+            )
+        return response
+
+    def _count_attempts(self, session):
+        """
+        Count the attempts of every Redfish call in request_stats. The Redfish client retries failed requests
+        internally, every attempt is a request of its session.
+
+        :param session: session of the Redfish client
+        :type session: requests.Session
+        """
+        send = session.request
+
+        def request(*args, **kwargs):
+            request_stats = self.request_stats
+            if request_stats is not None:
+                request_stats["attempts"] += 1
+            try:
+                return send(*args, **kwargs)
+            except requests.exceptions.Timeout:
+                if request_stats is not None:
+                    request_stats["timeouts"] += 1
+                raise
+
+        session.request = request
+
+    def _publish_redfish_call(self, mode, uri, status, latency, body, bytes_sent=0):
+        """
+        Record a Redfish call in the metrics and publish it to the event bus of the run
+
+        :param mode: HTTP method
+        :type mode: str
+        :param uri: requested URI
+        :type uri: str
+        :param status: HTTP status, None if the request failed
+        :type status: int
+        :param latency: response time in seconds, None if the response was not timed
+        :type latency: float
+        :param body: response body
+        :type body: str or bytes
+        :param bytes_sent: bytes of the request body, defaults to 0
+        :type bytes_sent: int, optional
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        request_stats = self.request_stats or {"attempts": 0, "timeouts": 0}
+        self.metrics.record(
+            mode,
+            uri,
+            status,
+            latency,
+            bytes_in=len(body or b""),
+            bytes_out=bytes_sent,
+            retries=max(request_stats["attempts"] - 1, 0),
+            timeouts=request_stats["timeouts"],
+        )
+        if self.event_bus is None:
+            return
+        self.event_bus.publish(
+            EventBus.REDFISH_CALL,
+            test_id=self.current_test_id,
+            method=mode,
+            uri=uri,
+            status=status,
+            latency=latency if latency is not None else 0,
+            bytes=len(body or b""),
+            bytes_sent=bytes_sent,
+        )
+
+    def sleep(self, seconds, reason, until=None, poll_interval=1):
+        """
+        Wait through the clock of the run, traced and accounted to the current test case
+
+        :param seconds: seconds to wait, None to wait until until is met
+        :type seconds: float
+        :param reason: reason of the wait, e.g. "PowerOnWaitTime"
+        :type reason: str
+        :param until: ends the wait early, see Clock.sleep, defaults to None
+        :type until: threading.Event or callable, optional
+        :param poll_interval: seconds between the checks of until, defaults to 1
+        :type poll_interval: float, optional
+        :return: True if until ended the wait early
+        :rtype: bool
+        """
+        with trace_span(reason, "sleep", seconds=seconds):
+            return self.clock.sleep(seconds, reason, self.current_test_id, until, poll_interval)
+
+    def advance_emulator_clock(self, seconds):
+        """
+        Advance the clock of the Redfish emulator the run is connected to, so its tasks and boot progress with
+        the waits of a virtual clock
+
+        :param seconds: seconds to advance
+        :type seconds: float
+        """
+        requests.post(f"{self.connection_url}/emulator/clock", json={"Advance": seconds}, timeout=30)
+
     def check_uri_response(self, uri, response):
         if not self.test_uri_response_check:
             msg = {"Message":"FATAL: Please provide the file name in test runner config"}
@@ -9,16 +9,15 @@ LICENSE file in the root directory of this source tree.
 from operator import contains
 import os
 import json
-import subprocess
 import time
 import ast
-import shlex
 from datetime import datetime
 from typing import Optional, List
 import ocptv.output as tv
 from ocptv.output import LogSeverity
 
 from interfaces.comptool_dut import CompToolDut
+from utils.run_context import RunContext, get_run_context, set_run_context
 from utils.fwpkg_utils import FwpkgSignature, PLDMFwpkg
 
 class FunctionalIfc:
@@ -27,20 +26,16 @@ class FunctionalIfc:
     items.  Create additional focused subclasses from this one.
     """
 
-    _dut: CompToolDut | None = None
-    _test_run: Optional[tv.TestRun] = None  # OCP TestRun
-
     @staticmethod
     def SetUpAssociations(testrun: tv.TestRun, dut: CompToolDut):
         """
-        The test framework will instance interfaces first, and then this class static method is used
-        to create the class associations.
+        Start a new run context for testrun and dut in the current context. The test runner creates the
+        run context itself, this is kept for callers driving interfaces directly.
 
         :param dut: device under test
         :type dut: CompToolDut
         """
-        FunctionalIfc._test_run = testrun
-        FunctionalIfc._dut = dut
+        set_run_context(RunContext(testrun, dut))
 
     @staticmethod
     def dut() -> CompToolDut:
@@ -51,10 +46,7 @@ class FunctionalIfc:
         :return: active dut
         :rtype: CompToolDut
         """
-        if FunctionalIfc._dut:
-            return FunctionalIfc._dut
-        else:
-            raise NotImplementedError(f"need to call FunctionalIfc.SetUpAssociations")
+        return get_run_context("FunctionalIfc").dut
 
     @staticmethod
     def test_run() -> tv.TestRun:
@@ -65,10 +57,7 @@ class FunctionalIfc:
         :return: active dut
         :rtype: CompToolDut
         """
-        if FunctionalIfc._test_run:
-            return FunctionalIfc._test_run
-        else:
-            raise NotImplementedError(f"need to call FunctionalIfc.SetUpAssociations")
+        return get_run_context("FunctionalIfc").test_run
 
     def __init__(self):
         """
@@ -471,25 +460,25 @@ class FunctionalIfc:
         :rtype:              None
         """
         MyName = __name__ + "." + self.NodeACReset.__qualname__
-        power_off_command = self.dut().dut_config.get("PowerOffCommand", {}).get("value", "")
-        power_on_command = self.dut().dut_config.get("PowerOnCommand", {}).get("value", "")
-        if not power_off_command or not power_on_command:
-            self.test_run().add_log(LogSeverity.INFO, "Please provide both power on and power off command in dut config!")
+        power_driver = self.dut().power_driver
+        missing_config = power_driver.get_missing_config()
+        if missing_config:
+            self.test_run().add_log(LogSeverity.INFO, missing_config)
             return 
         # execute power off
-        self.test_run().add_log(LogSeverity.INFO, json.dumps(power_off_command, indent=4))
-        arguments = shlex.split(power_off_command)
-        cwd_path = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        cwd_path = None if cwd_path == "/tmp" else cwd_path
-        subprocess.check_output(arguments, cwd=cwd_path)
-        time.sleep(self.dut().dut_config.get("PowerOffWaitTime", {}).get("value", 60))
-        self.test_run().add_log(LogSeverity.INFO, "Power Off wait time done")
+        self.test_run().add_log(LogSeverity.INFO, json.dumps(power_driver.describe(power_driver.OFF), indent=4))
+        if power_driver.set_power(power_driver.OFF):
+            self.test_run().add_log(LogSeverity.INFO, "Power Off is confirmed")
+        else:
+            self.test_run().add_log(LogSeverity.INFO, "Power Off wait time done")
         # execute power on
-        self.test_run().add_log(LogSeverity.INFO, json.dumps(power_on_command, indent=4))
-        arguments = shlex.split(power_on_command)
-        subprocess.check_output(arguments, cwd=cwd_path)
-        time.sleep(self.dut().dut_config.get("PowerOnWaitTime", {}).get("value", 300))
-        self.test_run().add_log(LogSeverity.INFO, "Power ON wait time done")
+        self.test_run().add_log(LogSeverity.INFO, json.dumps(power_driver.describe(power_driver.ON), indent=4))
+        self.dut().power_on_time = self.dut().clock.time()
+        if power_driver.set_power(power_driver.ON):
+            self.test_run().add_log(LogSeverity.INFO, "Power ON is confirmed")
+        else:
+            self.test_run().add_log(LogSeverity.WARNING, "Power ON is not confirmed within PowerOnWaitTime")
+        get_run_context("FunctionalIfc").ac_reset_pending = False  # a deferred reset is done as well
         return
 
     def IsGPUReachable(self):
@@ -516,11 +505,24 @@ class FunctionalIfc:
         
         :param check_time:              Check the activation time does not exceed maximum time per spec
 
-        :returns:				    	ActivationStatus
+        :returns:				    	ActivationStatus, True as well if the AC cycle is deferred
         :rtype: 						Bool
         """
         MyName = __name__ + "." + self.ctam_activate_ac.__qualname__
         ActivationStatus = False
+
+        run_context = get_run_context("FunctionalIfc")
+        test_scheduler = run_context.test_scheduler
+        if (
+            not (check_time or gpu_check or fwupd_hyst_wait)
+            and test_scheduler
+            and test_scheduler.may_defer_reset(self.dut().current_test_id)
+        ):
+            # reset only AC cycle of a test case declaring it deferrable, the test runner executes it before the
+            # next test case or group that does not accept a pending reset, or at the end of the run
+            run_context.ac_reset_pending = True
+            self.test_run().add_log(LogSeverity.INFO, "AC reset deferred")
+            return True  # postponed, not failed
         
         if check_time:
             FwActivationTimeMax = self.dut().dut_config["FwActivationTimeMax"]["value"]
@@ -532,20 +534,23 @@ class FunctionalIfc:
         self.NodeACReset()  # NodeACReset declaration pending
         
         if gpu_check:
-            ActivationStartTime = time.time() - self.dut().dut_config["PowerOnWaitTime"]["value"] # When the system was reset
-            while "error" in self.IsGPUReachable():  # declaration pending
-                msg = "GPU showing error"
+            ActivationStartTime = self.dut().power_on_time or self.dut().clock.time() # When the system was reset
+
+            def is_gpu_enabled():
+                JSONData = self.IsGPUReachable()
+                if "error" in JSONData:
+                    msg = "GPU showing error"
+                elif JSONData["Status"]["State"] != "Enabled":
+                    msg = "Waiting for GPU to be back up, {}".format(JSONData["Status"]["State"])
+                else:
+                    return True
                 self.test_run().add_log(LogSeverity.DEBUG, msg)
-            while (self.IsGPUReachable())["Status"][
-                "State"
-            ] != "Enabled" \
-                    and (not check_time or (check_time and (time.time() - ActivationStartTime) <= FwActivationTimeMax)): # declaration pending
-                msg = "Waiting for GPU to be back up, {}".format(
-                    (self.IsGPUReachable())["Status"]["State"]
-                )
-                self.test_run().add_log(LogSeverity.DEBUG, msg)
-                time.sleep(30)
-            ActivationEndTime = time.time()
+                return False
+
+            # polls every 30 seconds until the GPU is enabled, with check_time at most FwActivationTimeMax after reset
+            WaitTime = FwActivationTimeMax - (self.dut().clock.time() - ActivationStartTime) if check_time else None
+            self.dut().sleep(WaitTime, "GPU reachable poll", until=is_gpu_enabled, poll_interval=30)
+            ActivationEndTime = self.dut().clock.time()
             
             if check_time and (ActivationEndTime - ActivationStartTime) > FwActivationTimeMax:
                 ActivationStatus = False
@@ -558,7 +563,7 @@ class FunctionalIfc:
             IdleWaitTime = self.dut().dut_config["IdleWaitTimeAfterFirmwareUpdate"]["value"]
             msg = f"Execution will be delayed by {IdleWaitTime} seconds."
             self.test_run().add_log(LogSeverity.INFO, msg)
-            time.sleep(IdleWaitTime)
+            self.dut().sleep(IdleWaitTime, "IdleWaitTimeAfterFirmwareUpdate")
             msg = f"Execution is delayed successfully by {IdleWaitTime} seconds."
             self.test_run().add_log(LogSeverity.INFO, msg)
             
@@ -651,16 +656,20 @@ class FunctionalIfc:
         if self.dut().is_debug_mode():
             self.test_run().add_log(LogSeverity.DEBUG, f"Task URI: {TaskURI}")
             
-        response = self.dut().run_redfish_command(TaskURI)
-        JSONData = response.dict
-        while JSONData["TaskState"] == "Running":
+        def is_task_finished():
+            nonlocal JSONData
             response = self.dut().run_redfish_command(TaskURI)
             JSONData = response.dict
+            if JSONData["TaskState"] != "Running":
+                return True
             if self.dut().is_debug_mode():
                 self.test_run().add_log(LogSeverity.DEBUG,
                     "Task Percentage_Completion = {}".format(JSONData["PercentComplete"])
                 )
-            time.sleep(30)
+            return False
+
+        # polls every 30 seconds while the task runs, a finished task ends the monitoring without waiting
+        self.dut().sleep(None, "Task poll", until=is_task_finished, poll_interval=30)
         if JSONData["TaskState"] == "Completed" and JSONData["TaskStatus"] == "OK":
             Task_Completed = True
         else:
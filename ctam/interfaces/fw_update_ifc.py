@@ -160,7 +160,7 @@ class FWUpdateIfc(FunctionalIfc, metaclass=Meta):
         :rtype: 								Bool, str, str
         """
         MyName = __name__ + "." + self.ctam_stage_fw.__qualname__
-        StartTime = time.time()
+        StartTime = self.dut().clock.time()
         pushtargets = self.dut().uri_builder.format_uri(redfish_str="{HttpPushUriTargets}", component_type="GPU")
         if partial == 0 and pushtargets:
             self.ctam_pushtargets()
@@ -177,7 +177,7 @@ class FWUpdateIfc(FunctionalIfc, metaclass=Meta):
             self.test_run().add_log(LogSeverity.DEBUG, f"URI : {uri}")
         
         JSONData = self.RedFishFWUpdate(JSONFWFilePayload, uri)
-        StagingStartTime = time.time()
+        StagingStartTime = self.dut().clock.time()
 
         if self.dut().is_debug_mode():
             self.test_run().add_log(LogSeverity.DEBUG, f"{MyName}  {JSONData}")
@@ -188,10 +188,10 @@ class FWUpdateIfc(FunctionalIfc, metaclass=Meta):
             if wait_for_stage_completion:
                 if self.dut().is_debug_mode():
                     self.test_run().add_log(LogSeverity.DEBUG, FwUpdTaskID)
-                DeployTime = time.time()
+                DeployTime = self.dut().clock.time()
                 FwStagingTimeMax = self.dut().dut_config["FwStagingTimeMax"]["value"]
                 StageFWOOB_Status, JSONData = self.ctam_monitor_task(FwUpdTaskID)
-                EndTime = time.time()
+                EndTime = self.dut().clock.time()
                 if check_time and (EndTime - StagingStartTime) > FwStagingTimeMax:
                     msg = f"FW copy operation exceeded the maximum time {FwStagingTimeMax} seconds."
                     self.test_run().add_log(LogSeverity.DEBUG, msg)
@@ -10,6 +10,7 @@ import time
 import json
 import os
 import ast
+import threading
 from typing import Optional, List
 from interfaces.functional_ifc import FunctionalIfc
 from ocptv.output import LogSeverity
@@ -35,6 +36,8 @@ class HealthCheckIfc(FunctionalIfc, metaclass=Meta):
         self.dumplog_uri_list = [] # FIXME: May remove this list as we may retrieve this list from the dict whenever we need.
         self.dumplog_uri_dict = {}
         self.journal_uri_list = []
+        # read_only test cases running concurrently share this instance, the URI lists are filled once under the lock
+        self.uri_lock = threading.RLock()
 
     # def __new__(cls, *args, **kwargs):
     #     """
@@ -69,18 +72,19 @@ class HealthCheckIfc(FunctionalIfc, metaclass=Meta):
         :return:                            list of LogServices uri
         :rtype:                             list
         """
-        for resource_collection in resource_collection_list:
-            # Skip populating the list for this resource if it's present already
-            if resource_collection not in self.logservice_uri_dict:
-                URI = "/redfish/v1/" + resource_collection
-                logservice_uri_list = []
-                self.ctam_redfish_uri_deep_hunt(
-                    URI, "LogServices", logservice_uri_list
-                )
-                self.logservice_uri_dict[resource_collection] = logservice_uri_list
-                self.logservice_uri_list.extend(logservice_uri_list)
-        self.write_test_info("LogServices URI list: {}".format(self.logservice_uri_dict))
-        return self.logservice_uri_list
+        with self.uri_lock:
+            for resource_collection in resource_collection_list:
+                # Skip populating the list for this resource if it's present already
+                if resource_collection not in self.logservice_uri_dict:
+                    URI = "/redfish/v1/" + resource_collection
+                    logservice_uri_list = []
+                    self.ctam_redfish_uri_deep_hunt(
+                        URI, "LogServices", logservice_uri_list
+                    )
+                    self.logservice_uri_dict[resource_collection] = logservice_uri_list
+                    self.logservice_uri_list.extend(logservice_uri_list)
+            self.write_test_info("LogServices URI list: {}".format(self.logservice_uri_dict))
+            return self.logservice_uri_list
     
     def ctam_verify_logservice_presence(self, resource_collection_list=["Systems", "Managers"]):
         """
@@ -93,24 +97,28 @@ class HealthCheckIfc(FunctionalIfc, metaclass=Meta):
         :rtype:                             bool
         """
         result = True
-        if self.logservice_uri_dict == {}:
+        with self.uri_lock:
+            logservice_uri_dict = dict(self.logservice_uri_dict)
+        if logservice_uri_dict == {}:
             self.test_run().add_log(LogSeverity.ERROR, f"LogServices URI List is empty. Nothing to verify!")
             result = False
         else:
             for resource_collection in resource_collection_list:
-                if resource_collection not in self.logservice_uri_dict or self.logservice_uri_dict[resource_collection] == []:
+                if resource_collection not in logservice_uri_dict or logservice_uri_dict[resource_collection] == []:
                    self.test_run().add_log(LogSeverity.ERROR, f"Checking existing URI list - LogServices is not found in {resource_collection}")
                    result = False
         return result
 
     def ctam_clear_log_dump(self):
         result = True
-        if self.dumplog_uri_list == []: # FIXME: Should we use the dict instead?
-            self.dumplog_uri_list = self.ctam_get_all_logdump_uris()
-            if self.dumplog_uri_list == []:
-                self.write_test_info("LogServices Dump URI list is empty. Nothing to clear!")
-                result = False
-        for dumplog_uri in self.dumplog_uri_list:
+        with self.uri_lock:
+            if self.dumplog_uri_list == []: # FIXME: Should we use the dict instead?
+                self.dumplog_uri_list = self.ctam_get_all_logdump_uris()
+                if self.dumplog_uri_list == []:
+                    self.write_test_info("LogServices Dump URI list is empty. Nothing to clear!")
+                    result = False
+            dumplog_uri_list = list(self.dumplog_uri_list)
+        for dumplog_uri in dumplog_uri_list:
             clear_dump_uri = dumplog_uri + "/Actions/LogService.ClearLog"
             #print(clear_dump_uri)
             uri = self.dut().uri_builder.format_uri(redfish_str="{GPUMC}" + "{}".format(clear_dump_uri), component_type="GPU")
@@ -131,7 +139,7 @@ class HealthCheckIfc(FunctionalIfc, metaclass=Meta):
         :rtype: 								Bool
         """
         MyName = __name__ + "." + self.trigger_self_test_dump_collection.__qualname__
-        StartTime = time.time()
+        StartTime = self.dut().clock.time()
         instances = ast.literal_eval(self.dut().uri_builder.format_uri(redfish_str="{BaseboardIDs}", component_type="GPU"))
         for instance in instances:
             uri = "/Systems/" + instance
@@ -152,9 +160,9 @@ class HealthCheckIfc(FunctionalIfc, metaclass=Meta):
                 
                 if self.dut().is_debug_mode():
                     self.test_run().add_log(LogSeverity.DEBUG, f"Self-test Dump Collection Task ID = {TaskID}")
-                DeployTime = time.time()
+                DeployTime = self.dut().clock.time()
                 Task_Completed, JSONData = self.ctam_monitor_task(TaskID)
-                EndTime = time.time()
+                EndTime = self.dut().clock.time()
                 if Task_Completed:
                     for http_header in JSONData['Payload']['HttpHeaders']:
                         if 'Location' in  http_header:
@@ -238,15 +246,19 @@ class HealthCheckIfc(FunctionalIfc, metaclass=Meta):
         :return:                            list of LogServices Dump uri
         :rtype:                             list
         """
-        self.ctam_get_all_logservice_uris(resource_collection_list)
-        for resource in resource_collection_list:
-            dumplog_uri_list = []
-            for uri in self.logservice_uri_dict[resource]:
-                self.ctam_redfish_uri_hunt(uri, "Dump", dumplog_uri_list)
-            self.dumplog_uri_dict[resource] = dumplog_uri_list
-            self.dumplog_uri_list.extend(dumplog_uri_list)
-        self.write_test_info("Dump URI list: {}".format(self.dumplog_uri_dict))
-        return self.dumplog_uri_list
+        with self.uri_lock:
+            self.ctam_get_all_logservice_uris(resource_collection_list)
+            for resource in resource_collection_list:
+                # Skip populating the list for this resource if it's present already
+                if resource in self.dumplog_uri_dict:
+                    continue
+                dumplog_uri_list = []
+                for uri in self.logservice_uri_dict[resource]:
+                    self.ctam_redfish_uri_hunt(uri, "Dump", dumplog_uri_list)
+                self.dumplog_uri_dict[resource] = dumplog_uri_list
+                self.dumplog_uri_list.extend(dumplog_uri_list)
+            self.write_test_info("Dump URI list: {}".format(self.dumplog_uri_dict))
+            return self.dumplog_uri_list
     
     def ctam_verify_logdump_presence(self, resource_collection_list=["Systems", "Managers"]):
         """
@@ -259,12 +271,14 @@ class HealthCheckIfc(FunctionalIfc, metaclass=Meta):
         :rtype:                             bool
         """
         result = True
-        if self.dumplog_uri_dict == {}:
+        with self.uri_lock:
+            dumplog_uri_dict = dict(self.dumplog_uri_dict)
+        if dumplog_uri_dict == {}:
             self.test_run().add_log(LogSeverity.ERROR, f"LogServices Dump URI List is empty. Nothing to verify!")
             result = False
         else:
             for resource_collection in resource_collection_list:
-                if resource_collection not in self.dumplog_uri_dict or self.dumplog_uri_dict[resource_collection] == []:
+                if resource_collection not in dumplog_uri_dict or dumplog_uri_dict[resource_collection] == []:
                     self.test_run().add_log(LogSeverity.ERROR, f"Checking existing URI list - Dump is not found in {resource_collection}")
                     result = False
         return result
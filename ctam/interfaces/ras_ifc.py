@@ -8,7 +8,6 @@ LICENSE file in the root directory of this source tree.
 
 from typing import Optional, List
 from interfaces.functional_ifc import FunctionalIfc
-import time
 import json
 from ocptv.output import LogSeverity
 from utils.json_utils import *
@@ -86,7 +85,7 @@ class RasIfc(FunctionalIfc, metaclass=Meta):
 
     def ctam_crashdump_task_status(self):
         wait_for_task_completion = True
-        TaskStartTime = time.time()
+        TaskStartTime = self.dut().clock.time()
         check_time = True
         Task_completion_Status = False
         for uri in self.ctam_collect_crashdump_manager_list():
@@ -104,22 +103,23 @@ class RasIfc(FunctionalIfc, metaclass=Meta):
                     v1_str = self.dut().uri_builder.format_uri(
                         redfish_str="{GPUMC}" + "{}".format(TaskID), component_type="GPU"
                     )
-                    response = self.dut().run_redfish_command(uri=v1_str)
-                    self.JSONData = response.dict
-
-                    FwStagingTimeMax = self.dut().dut_config["FwStagingTimeMax"]["value"]
-                    while self.JSONData["TaskState"] == "Running" \
-                            and (not check_time or (check_time and (time.time() - TaskStartTime) <= FwStagingTimeMax)):
+                    def is_task_finished():
                         response = self.dut().run_redfish_command(uri=v1_str)
                         self.JSONData = response.dict
+                        if self.JSONData["TaskState"] != "Running":
+                            return True
                         if self.dut().is_debug_mode():
                             print(
                                 f"Task completion = {self.JSONData['PercentComplete']}"
                             )
                         msg = f"Task completion = {self.JSONData['PercentComplete']}"
                         self.test_run().add_log(LogSeverity.DEBUG, msg)
+                        return False
 
-                        time.sleep(5)
+                    FwStagingTimeMax = self.dut().dut_config["FwStagingTimeMax"]["value"]
+                    # polls every 5 seconds while the task runs, with check_time at most FwStagingTimeMax
+                    WaitTime = FwStagingTimeMax - (self.dut().clock.time() - TaskStartTime) if check_time else None
+                    self.dut().sleep(WaitTime, "Task poll", until=is_task_finished, poll_interval=5)
                     if self.JSONData["TaskState"] == "Completed":
                         Task_completion_Status = True
                     else:
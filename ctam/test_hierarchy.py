@@ -8,12 +8,19 @@ LICENSE file in the root directory of this source tree.
 
 import ast
 import os
+import hashlib
+import importlib.abc
+import importlib.machinery
 import importlib.util
 import inspect
+import json
 import re
 import sys
 import os
 import ast
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
 from typing import List, Any
 from prettytable import PrettyTable
 
@@ -116,7 +123,10 @@ class TestHierarchy:
 
             self.generic_visit(node)
 
-    def __init__(self, test_root_dir, ifc_dir):
+    # below this number of files to parse, starting worker processes costs more than it saves
+    PARALLEL_PARSE_THRESHOLD = 64
+
+    def __init__(self, test_root_dir, ifc_dir, manifest_file=None, parse_workers=0):
         """
         Only need to instantiate object and hierarchy is made available
 
@@ -124,11 +134,133 @@ class TestHierarchy:
         :type test_root_dir: str
         :param ifc_dir: entry point for interfaces
         :type ifc_dir: str
+        :param manifest_file: discovery manifest cache file, defaults to None (no caching)
+        :type manifest_file: str, optional
+        :param parse_workers: number of processes used to parse files, 0 (default) for one per cpu, 1 to parse serially
+        :type parse_workers: int, optional
         """
         self.test_root_dir = test_root_dir
         self.ifc_dir = ifc_dir
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.manifest = DiscoveryManifest(manifest_file) if manifest_file else None
+        self._module_registry = {}  # file path -> executed module
+        self._ifc_instances = {}  # interface class name -> shared instance, see reuse_interfaces
         self.test_groups = self._find_groups_and_cases()
         self.ifc_files = self._find_ifc_files()
+        if self.manifest:
+            self.manifest.save()
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """
+        Build the lookup tables used by _find_testcase and _find_group. The first group/test case
+        in hierarchy order wins for each key, which is the same result the former linear searches returned.
+        """
+        self._group_index = {}
+        self._testcase_index = {}
+        for group_name, group_info in self.test_groups.items():
+            for key in (group_info["group_attributes"].get("group_id"), group_name):
+                if key is not None:
+                    self._group_index.setdefault(key, group_info)
+            for testcase in group_info["test_cases"]:
+                for key in (testcase["attributes"].get("test_name"), testcase["attributes"].get("test_id")):
+                    if key is not None:
+                        self._testcase_index.setdefault(key, (group_info, testcase))
+
+    def _get_file_records(self, file_paths, parse):
+        """
+        Returns the discovery records of python files. If a manifest is in use, files that did not change
+        since they were cached are not parsed again. The remaining files are parsed in a process pool when
+        there are enough of them.
+
+        :param file_paths: python files to inspect
+        :type file_paths: List
+        :param parse: callback building the record from the parsed ast of a file
+        :type parse: function
+        :raises SyntaxError: a file cannot be parsed
+        :return: discovery records in the order of file_paths
+        :rtype: List
+        """
+        records = [None] * len(file_paths)
+        stale = []
+        for index, file_path in enumerate(file_paths):
+            source = None
+            if self.manifest:
+                records[index], source = self.manifest.get(file_path)
+                if records[index] is not None:
+                    continue
+            if source is None:
+                with open(file_path, "rb") as f:
+                    source = f.read()
+            stale.append((index, file_path, source))
+
+        if not stale:
+            return records
+
+        indexes, stale_paths, sources = zip(*stale)
+        for index, file_path, source, record in zip(
+            indexes, stale_paths, sources, self._parse_sources(parse, stale_paths, sources)
+        ):
+            records[index] = record
+            if self.manifest:
+                self.manifest.put(file_path, source, record)
+        return records
+
+    def _parse_sources(self, parse, file_paths, sources):
+        """
+        Parse the given file contents, in worker processes if parse_workers allows it and there are at least
+        PARALLEL_PARSE_THRESHOLD files. The results keep the order of the inputs regardless of which worker
+        finishes first, so discovery is deterministic.
+
+        :return: records in the order of file_paths
+        :rtype: List
+        """
+        workers = min(self.parse_workers, len(sources))
+        if workers > 1 and len(sources) >= self.PARALLEL_PARSE_THRESHOLD:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    return list(
+                        executor.map(
+                            _parse_source,
+                            repeat(parse),
+                            file_paths,
+                            sources,
+                            chunksize=max(1, len(sources) // (workers * 4)),
+                        )
+                    )
+            except (OSError, ImportError, BrokenProcessPool) as e:
+                print(f"[WARNING]: Parallel test discovery is not available, parsing files serially: {e}")
+        return [_parse_source(parse, file_path, source) for file_path, source in zip(file_paths, sources)]
+
+    @staticmethod
+    def _parse_ifc_file(tree):
+        """
+        Builds the discovery record of an interface file
+
+        :param tree: parsed file
+        :type tree: ast.Module
+        :return: class names found in the file
+        :rtype: dict
+        """
+        visitor = TestHierarchy.ClassVisitor()
+        visitor.visit(tree)
+        return {"class_names": visitor.class_names}
+
+    @staticmethod
+    def _parse_test_file(tree):
+        """
+        Builds the discovery record of a file in the test directories
+
+        :param tree: parsed file
+        :type tree: ast.Module
+        :return: test groups and test cases found in the file
+        :rtype: dict
+        """
+        visitor = TestHierarchy.ClassVisitor()
+        visitor.visit(tree)
+        for testcase in visitor.test_cases:
+            testcase["sort_key"] = int(re.findall(r"\d+\.\d+|\d+", testcase["attributes"]["test_id"])[0])
+        return {"test_groups": visitor.test_groups, "test_cases": visitor.test_cases}
 
     def _find_ifc_files(self):
         """
@@ -138,30 +270,28 @@ class TestHierarchy:
         :rtype: List
         """
         ifc_files = {}
+        module_paths = []
 
         for root, dirs, files in os.walk(self.ifc_dir):
             for file_name in files:
                 if file_name.endswith(".py"):
-                    module_name = file_name[:-3]  # Remove the .py extension
-                    
-                    module_path = os.path.join(root, file_name)
+                    module_paths.append(os.path.join(root, file_name))
 
-                    with open(module_path, "r") as f:
-                        try:
-                            tree = ast.parse(f.read())
-                            visitor = self.ClassVisitor()
-                            visitor.visit(tree)
-                            class_names = visitor.class_names
-                            if class_names:
-                                class_name = class_names[0]
-                                ifc_files[module_name] = {
-                                    "class_name": class_name,
-                                    "module_name": module_name,
-                                    "module_path": module_path,
-                                }
-                        except SyntaxError as e:
-                            print(f"Error in file {module_path}: {e}")
-                            raise
+        try:
+            records = self._get_file_records(module_paths, self._parse_ifc_file)
+        except SyntaxError as e:
+            print(f"Error in file {e.filename}: {e}")
+            raise
+
+        for module_path, record in zip(module_paths, records):
+            class_names = record["class_names"]
+            if class_names:
+                module_name = os.path.basename(module_path)[:-3]  # Remove the .py extension
+                ifc_files[module_name] = {
+                    "class_name": class_names[0],
+                    "module_name": module_name,
+                    "module_path": module_path,
+                }
 
         return ifc_files
 
@@ -172,7 +302,9 @@ class TestHierarchy:
         :return: List of TestGroups which contains a list of TestCases for that group
         :rtype: List
         """
-        visitor = self.ClassVisitor()
+        test_groups = {}
+        test_cases = []
+        discovered = set()
         test_root_dirs = ""
         if isinstance(self.test_root_dir, str):
             test_root_dirs = [self.test_root_dir]
@@ -185,51 +317,51 @@ class TestHierarchy:
             if not os.path.exists(dir):
                 print(f"[EXCEPTION]: Test directory does not exists: {dir}")
                 raise Exception(f"[EXCEPTION]: Test directory does not exists: {dir}")
+        # collect the files first so that they can be parsed in one batch
+        test_files = []
+        finder = TestDirectoryFinder.install()
         for test_dir in test_root_dirs:
             for root, dirs, _ in os.walk(test_dir):
                 for dir in dirs:
-                    sys.path.append(
-                        os.path.join(root, dir)
-                    )  # add test group dirs to python search path
                     test_group_dir = os.path.join(root, dir)
-                    
-                    for filename in os.listdir(test_group_dir):
+                    filenames = os.listdir(test_group_dir)
+                    finder.add_dir(test_group_dir, filenames)  # make test group dirs importable
+
+                    for filename in filenames:
                         if filename.endswith(".py"):
-                            with open(os.path.join(test_group_dir, filename), "r") as f:
-                                try:
-                                    tree = ast.parse(f.read())
-                                    visitor.visit(tree)
-                                    for (
-                                        class_name,
-                                        class_info,
-                                    ) in visitor.test_groups.items():
-                                        if class_info["module_name"] is None:
-                                            class_info["module_name"] = filename[:-3]
-                                            class_info["module_path"] = test_group_dir
-
-                                    for testcase in visitor.test_cases:
-                                        if testcase["module_name"] is None:
-                                            testcase["module_name"] = filename[:-3]
-                                            testcase["module_path"] = test_group_dir
-
-                                except SyntaxError as e:
-                                    print(f"Syntax error in file {filename}: {e}")
-                                    raise
-
-                    for group in visitor.test_groups:
-                        for test_case in visitor.test_cases:
-                            if test_case["group_name"] == visitor.test_groups[group]["group_name"] and test_case not in visitor.test_groups[group]["test_cases"]:
-                                visitor.test_groups[group]["test_cases"].append(test_case)
-                    # for testcase in visitor.test_cases:
-                    #     print(testcase["group_name"])
-                    #     if visitor.current_group is not None:
-                    #         visitor.current_group["test_cases"].append(testcase)
-
-                # visitor.test_cases.clear()
-        for group in visitor.test_groups:
-            new_test_list = sorted(visitor.test_groups[group]["test_cases"], key=lambda x: int(re.findall('\d+\.\d+|\d+', x["attributes"]["test_id"])[0]))
-            visitor.test_groups[group]["test_cases"] = new_test_list
-        return visitor.test_groups
+                            test_files.append((test_group_dir, filename))
+
+        try:
+            records = self._get_file_records(
+                [os.path.join(test_group_dir, filename) for test_group_dir, filename in test_files],
+                self._parse_test_file,
+            )
+        except SyntaxError as e:
+            print(f"Syntax error in file {os.path.basename(e.filename or '')}: {e}")
+            raise
+
+        for (test_group_dir, filename), record in zip(test_files, records):
+            # records may come from the manifest, so never modify them in place
+            for class_name, class_info in record["test_groups"].items():
+                test_groups[class_name] = dict(
+                    class_info, module_name=filename[:-3], module_path=test_group_dir, test_cases=[]
+                )
+            for testcase in record["test_cases"]:
+                # the same file can be reached twice through overlapping test root dirs
+                testcase_key = (test_group_dir, filename, testcase["testcase_name"])
+                if testcase_key not in discovered:
+                    discovered.add(testcase_key)
+                    test_cases.append(dict(testcase, module_name=filename[:-3], module_path=test_group_dir))
+
+        # assign the test cases to their groups in a single pass, in discovery order
+        for test_case in test_cases:
+            if test_case["group_name"] in test_groups:
+                test_groups[test_case["group_name"]]["test_cases"].append(test_case)
+
+        for group in test_groups:
+            new_test_list = sorted(test_groups[group]["test_cases"], key=lambda x: x["sort_key"])
+            test_groups[group]["test_cases"] = new_test_list
+        return test_groups
 
     def print_test_groups_all_info(self):
         """
@@ -252,10 +384,9 @@ class TestHierarchy:
         """
         searches for group in test_groups and returns the number of test cases in that group
         """
-        for group_name, group_info in self.test_groups.items():
-            if group_info["group_attributes"].get("group_id") == group or \
-                group == group_info["group_attributes"].get("group_name"):
-                return len(group_info["test_cases"])
+        group_info = self._find_group(group)
+        if group_info is not None:
+            return len(group_info["test_cases"])
 
     def print_test_groups_test_cases(self, group_name=None):
         """
@@ -318,16 +449,7 @@ class TestHierarchy:
         :return: group attributes, test case attributes
         :rtype: group, testcase
         """
-        for group_name, group_info in self.test_groups.items():
-            for testcase in group_info["test_cases"]:
-                # Check if the param matches the testcase name or the test_id
-                if testcase[
-                    "attributes"
-                ].get("test_name") == param or param == testcase[
-                    "attributes"
-                ].get("test_id"):
-                    return group_info, testcase
-        return None, None
+        return self._testcase_index.get(param, (None, None))
 
     def _find_group(self, param):
         """
@@ -338,15 +460,7 @@ class TestHierarchy:
         :return: group attributes, 
         :rtype: group
         """
-        for group_name, group_info in self.test_groups.items():
-            # print(group_name, group_info)
-            # for group in group_info["group_attributes"]:
-            #     # Check if the param matches the testcase name or the test_id
-            if group_info[
-                "group_attributes"
-            ].get("group_id") == param or param == group_name:
-                return group_info
-        return None
+        return self._group_index.get(param)
 
     def get_domains(self):
         domains = {}
@@ -393,16 +507,11 @@ class TestHierarchy:
             return None, None
 
         try:
-            spec = importlib.util.spec_from_file_location(
-                module_name, os.path.join(module_path, module_name + ".py")
-            )
-            if spec is None:
+            obj_module = self._load_module(module_name, os.path.join(module_path, module_name + ".py"))
+            if obj_module is None:
                 print(f"Module spec is None for module '{module_name}'.")
                 return None, None
 
-            obj_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(obj_module)
-
             obj_class = getattr(obj_module, class_name)
             if init_param:
                 obj_instance = obj_class(init_param)
@@ -415,12 +524,36 @@ class TestHierarchy:
             print(f"Error occurred during object instantiation: {e}")
             raise
 
-    def instantiate_obj_for_group(self, group_name):
+    def _load_module(self, module_name, file_path):
+        """
+        Execute a python file as a module. Every file is executed only once per TestHierarchy, later calls
+        return the module from the registry.
+
+        :param module_name: name of the module
+        :type module_name: str
+        :param file_path: path of the python file
+        :type file_path: str
+        :return: module, None if no module spec could be created for the file
+        :rtype: module
+        """
+        module = self._module_registry.get(file_path)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(module_name, file_path)
+            if spec is None:
+                return None
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self._module_registry[file_path] = module
+        return module
+
+    def instantiate_obj_for_group(self, group_name, reuse_interfaces=False):
         """
         When given a TestGroup instantiate it and it's associated TestCases
 
         :param group_name: Name of the TestGroup
         :type group_name: str
+        :param reuse_interfaces: share interface instances with previously instantiated groups, defaults to False
+        :type reuse_interfaces: bool, optional
         :return: group instance, List of Test Cases
         :rtype: group instance, List of Test Cases
         """
@@ -434,7 +567,7 @@ class TestHierarchy:
             group_info, group_info["group_name"]
         )
         ifc_instances = self._parse_configure_interfaces(
-            group_instance.configure_interfaces
+            group_instance.configure_interfaces, reuse_interfaces
         )
         group_instance.configure_interfaces(*ifc_instances)
 
@@ -447,36 +580,99 @@ class TestHierarchy:
 
         return group_instance, test_case_instances
 
-    def instantiate_obj_for_testcase(self, testcase_name):
+    def instantiate_obj_for_testcase(self, testcase_name, reuse_interfaces=False):
         """
         When given a test case, search the hierarchy for the group it is in,
         instantiate the group and the single test case
 
         :param testcase_name: Name of Test case
         :type testcase_name: str
+        :param reuse_interfaces: share interface instances with previously instantiated groups, defaults to False
+        :type reuse_interfaces: bool, optional
         :return: group instance, List with one entry of the test case(list is so upper level code works the same)
         :rtype: group instance, List of single testcase instance
         """
-        group_info, testcase_info = self._find_testcase(testcase_name)
-        if not group_info or not testcase_info:
-            print(f"Test case {testcase_name} not found.")
-            return None, None
+        return self.instantiate_obj_for_testcases([testcase_name], reuse_interfaces)
+
+    def instantiate_obj_for_testcases(self, testcase_names, reuse_interfaces=False):
+        """
+        When given test cases of the same group, instantiate the group once and all of the test cases
+        against that single group instance
+
+        :param testcase_names: Names or ids of the test cases, all in the same group
+        :type testcase_names: list
+        :param reuse_interfaces: share interface instances with previously instantiated groups, defaults to False
+        :type reuse_interfaces: bool, optional
+        :return: group instance, List of testcase instances in the given order
+        :rtype: group instance, List of testcase instances
+        """
+        group_info = None
+        testcase_infos = []
+        for testcase_name in testcase_names:
+            testcase_group_info, testcase_info = self._find_testcase(testcase_name)
+            if not testcase_group_info or not testcase_info:
+                print(f"Test case {testcase_name} not found.")
+                return None, None
+            if group_info and testcase_group_info is not group_info:
+                raise Exception(
+                    f"Test case {testcase_name} is not part of group {group_info['group_name']}"
+                )
+            group_info = testcase_group_info
+            testcase_infos.append(testcase_info)
 
         group_instance, _ = self._instantiate_object(
             group_info, group_info["group_name"]
         )
         ifc_instances = self._parse_configure_interfaces(
-            group_instance.configure_interfaces
+            group_instance.configure_interfaces, reuse_interfaces
         )
         group_instance.configure_interfaces(*ifc_instances)
 
-        test_case_instance, _ = self._instantiate_object(
-            testcase_info, testcase_info["testcase_name"], group_instance
-        )
+        test_case_instances = []
+        for testcase_info in testcase_infos:
+            test_case_instance, _ = self._instantiate_object(
+                testcase_info, testcase_info["testcase_name"], group_instance
+            )
+            test_case_instances.append(test_case_instance)
+
+        return group_instance, test_case_instances
+
+    def get_group_of_testcase(self, testcase_name):
+        """
+        :param testcase_name: Name or id of Test case
+        :type testcase_name: str
+        :return: name of the group the test case belongs to, None if the test case is unknown
+        :rtype: str
+        """
+        group_info, _ = self._find_testcase(testcase_name)
+        return group_info["group_name"] if group_info else None
+
+    def get_testcase_attributes(self, testcase_name):
+        """
+        :param testcase_name: Name or id of Test case
+        :type testcase_name: str
+        :return: discovered class attributes of the group and of the test case, (None, None) if the test case
+            is unknown
+        :rtype: dict, dict
+        """
+        group_info, testcase = self._find_testcase(testcase_name)
+        if group_info is None:
+            return None, None
+        return group_info["group_attributes"], testcase["attributes"]
 
-        return group_instance, [test_case_instance]
+    def get_group_testcase_ids(self, group):
+        """
+        :param group: Name or id of Test group
+        :type group: str
+        :return: test ids of the group in discovery order, empty if the group is unknown
+        :rtype: List[str]
+        """
+        group_info = self._find_group(group)
+        if group_info is None:
+            return []
+        return [testcase["attributes"].get("test_id") for testcase in group_info["test_cases"]]
 
-    def _parse_configure_interfaces(self, configure_interfaces_method):
+    def _parse_configure_interfaces(self, configure_interfaces_method, reuse_instances=False):
         """
         Pass in a configure_interfaces method from a TestGroup subclass
         ex: def configure_interfaces(self, hc_ifc: HealthCheckIfc):
@@ -486,6 +682,8 @@ class TestHierarchy:
 
         :param configure_interfaces_method: _description_
         :type configure_interfaces_method: _type_
+        :param reuse_instances: hand out one shared instance per interface class, defaults to False
+        :type reuse_instances: bool, optional
         :return: List of interface instances
         :rtype: List
         """
@@ -501,16 +699,18 @@ class TestHierarchy:
                         module_name = ifc_file_info["module_name"]
                         module_path = ifc_file_info["module_path"]
 
+                        if reuse_instances and class_name in self._ifc_instances:
+                            instances.append(self._ifc_instances[class_name])
+                            continue
+
                         try:
-                            spec = importlib.util.spec_from_file_location(
-                                module_name, module_path
-                            )
-                            module = importlib.util.module_from_spec(spec)
-                            spec.loader.exec_module(module)
+                            module = self._load_module(module_name, module_path)
 
                             if hasattr(module, class_name):
                                 class_instance = getattr(module, class_name)()
                                 instances.append(class_instance)
+                                if reuse_instances:
+                                    self._ifc_instances[class_name] = class_instance
                             else:
                                 print(
                                     f"Class {class_name} not found in module {module_name}."
@@ -528,4 +728,171 @@ class TestHierarchy:
         for group_name, group_info in self.test_groups.items():
             for testcase in group_info["test_cases"]:
                 all_tests.append(testcase["attributes"]["test_id"])
-        return all_tests
\ No newline at end of file
+        return all_tests
+
+
+def _parse_source(parse, file_path, source):
+    """
+    Parse a python file and build its discovery record. Module level so it can run in a worker process.
+
+    :param parse: TestHierarchy._parse_test_file or TestHierarchy._parse_ifc_file
+    :type parse: function
+    :param file_path: path of the file, used in syntax errors
+    :type file_path: str
+    :param source: content of the file
+    :type source: bytes
+    :return: discovery record
+    :rtype: dict
+    """
+    return parse(ast.parse(source, filename=file_path))
+
+
+class TestDirectoryFinder(importlib.abc.MetaPathFinder):
+    """
+    Import hook that makes the modules of the test group directories importable by their plain name.
+    This used to be done by appending every test directory to sys.path, which slows down every import
+    that is not found earlier on sys.path. The finder keeps an index of module name to directory instead
+    and is consulted after the regular sys.path search, same as the former sys.path entries.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self._modules = {}  # top level module name -> directory, first directory wins like on sys.path
+
+    @classmethod
+    def install(cls):
+        """
+        :return: the finder registered on sys.meta_path, registering it on first use
+        :rtype: TestDirectoryFinder
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+            sys.meta_path.append(cls._instance)
+        return cls._instance
+
+    def add_dir(self, directory, filenames):
+        """
+        :param directory: test directory to make importable
+        :type directory: str
+        :param filenames: content of the directory
+        :type filenames: List
+        """
+        for filename in filenames:
+            if filename.endswith(".py"):
+                self._modules.setdefault(filename[:-3], directory)
+            elif "." not in filename and os.path.isdir(os.path.join(directory, filename)):
+                self._modules.setdefault(filename, directory)
+
+    def find_spec(self, fullname, path=None, target=None):
+        # submodules are found through the __path__ of their package
+        if path is not None:
+            return None
+        directory = self._modules.get(fullname)
+        if directory is None:
+            return None
+        return importlib.machinery.PathFinder.find_spec(fullname, [directory])
+
+
+class DiscoveryManifest:
+    """
+    Persistent cache of the per file discovery records of TestHierarchy. Every entry is keyed by the file path and
+    remembers the file mtime, size and content hash, so only new or changed files are parsed again.
+    """
+
+    VERSION = 1
+
+    def __init__(self, manifest_file):
+        """
+        Loads the manifest if it exists. A missing, unreadable or outdated manifest is silently rebuilt.
+
+        :param manifest_file: path of the manifest json file
+        :type manifest_file: str
+        """
+        self.manifest_file = manifest_file
+        self.files = {}
+        self.dirty = False
+        if os.path.isfile(manifest_file):
+            try:
+                with open(manifest_file, "r") as f:
+                    manifest = json.load(f)
+                if manifest.get("version") == self.VERSION:
+                    self.files = manifest.get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"[WARNING]: Ignoring unreadable discovery manifest {manifest_file}: {e}")
+
+    @staticmethod
+    def default_manifest_file(workspace_dir=None):
+        """
+        :param workspace_dir: workspace directory, defaults to None (no workspace)
+        :type workspace_dir: str, optional
+        :return: default location of the discovery manifest, in the .cache directory of the workspace, or without
+            workspace in the ctam directory of XDG_CACHE_HOME (~/.cache by default)
+        :rtype: str
+        """
+        if workspace_dir:
+            return os.path.join(workspace_dir, ".cache", "discovery_manifest.json")
+        cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(cache_dir, "ctam", "discovery_manifest.json")
+
+    def get(self, file_path):
+        """
+        Looks up the cached record of a file. The file is only read when its mtime or size changed, and
+        the cached record is still used if the content hash is unchanged.
+
+        :param file_path: python file
+        :type file_path: str
+        :return: cached record or None, file content if it had to be read
+        :rtype: dict, bytes
+        """
+        stat = os.stat(file_path)
+        entry = self.files.get(file_path)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["record"], None
+        with open(file_path, "rb") as f:
+            source = f.read()
+        if entry and entry["sha256"] == hashlib.sha256(source).hexdigest():
+            entry["mtime_ns"] = stat.st_mtime_ns
+            entry["size"] = stat.st_size
+            self.dirty = True
+            return entry["record"], source
+        return None, source
+
+    def put(self, file_path, source, record):
+        """
+        Stores the record of a freshly parsed file
+
+        :param file_path: python file
+        :type file_path: str
+        :param source: file content the record was built from
+        :type source: bytes
+        :param record: discovery record
+        :type record: dict
+        """
+        stat = os.stat(file_path)
+        self.files[file_path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": hashlib.sha256(source).hexdigest(),
+            "record": record,
+        }
+        self.dirty = True
+
+    def save(self):
+        """
+        Drops entries of deleted files and atomically writes the manifest if anything changed
+        """
+        for file_path in [f for f in self.files if not os.path.isfile(f)]:
+            del self.files[file_path]
+            self.dirty = True
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.manifest_file)), exist_ok=True)
+            tmp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump({"version": self.VERSION, "files": self.files}, f)
+            os.replace(tmp_file, self.manifest_file)
+            self.dirty = False
+        except OSError as e:
+            print(f"[WARNING]: Unable to write discovery manifest {self.manifest_file}: {e}")
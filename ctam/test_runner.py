@@ -8,6 +8,7 @@ LICENSE file in the root directory of this source tree.
 """
 from pathlib import Path
 import os
+import hashlib
 import json
 import netrc
 import platform
@@ -18,13 +19,15 @@ import sys
 from ocptv.output import LogSeverity, StdoutWriter, Writer
 from datetime import datetime, timedelta
 from tests.test_case import TestCase
-from tests.test_group import TestGroup
-from interfaces.functional_ifc import FunctionalIfc
 from test_hierarchy import TestHierarchy
+from test_scheduler import TestScheduler
 
 from prettytable import PrettyTable
 import threading, time
-from alive_progress import alive_bar
+import contextlib
+import contextvars
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
 
 import ocptv.output as tv
 from ocptv.output import (
@@ -35,6 +38,19 @@ from ocptv.output import (
     TestStatus,
 )
 from interfaces.comptool_dut import CompToolDut
+from interfaces.functional_ifc import FunctionalIfc
+from utils.checkpoint import RunCheckpoint
+from utils.clock import Clock, VirtualClock
+from utils.duration_history import DurationHistory
+from utils.events import EventBus
+from utils.log_policy import ResponseLogPolicy
+from utils.profiler import TestProfiler
+from utils.progress import RunProgress
+from utils.prometheus import PrometheusExporter
+from utils.result_store import ResultStore
+from utils.scoring import ScoringEngine
+from utils.run_context import RunContext, set_run_context
+from utils.tracing import Tracer, end_span, start_span
 
 from version import __version__
 
@@ -59,6 +75,11 @@ class TestRunner:
         single_group_override=None,
         sequence_group_override=None,
         run_all_tests=None,
+        runs_dir="TestRuns",
+        resume_dir=None,
+        shard=None,
+        cassette=None,
+        profile=None,
     ):
         """
         Init function that handles test execution variations
@@ -81,21 +102,36 @@ class TestRunner:
         :type sequence_test_override: list, optional
         :param single_group_override: single group to run, defaults to None
         :type single_group_override: str, optional
+        :param runs_dir: directory below the output directory that receives the test run directories,
+            defaults to "TestRuns"
+        :type runs_dir: str, optional
+        :param resume_dir: output directory of an interrupted run to resume, its test selection replaces the
+            selection arguments, defaults to None
+        :type resume_dir: str, optional
+        :param shard: (index, count), run only the index-th (1 based) of count shards of the selected tests,
+            defaults to None
+        :type shard: tuple, optional
+        :param cassette: cassette the Redfish exchanges of the run are recorded to or replayed from, defaults to None
+        :type cassette: Cassette, optional
+        :param profile: profile the run of every test case, TestProfiler.CPU or TestProfiler.ALLOC,
+            defaults to None
+        :type profile: str, optional
         :raises Exception: no tests to run
         """
         self.active_run = None
         self.comp_tool_dut = None
+        self.run_context = None
         self.test_hierarchy = test_hierarchy
         self.test_cases = []
         self.test_sequence = []
         self.test_groups = []
         self.group_sequence = []
         self.test_result_data = []
-        self.total_cases = 0        
         self.output_dir = ""
         self.workspace_dir = workspace_dir
+        self.runs_dir = runs_dir
         self.response_check_name = None
-        self.compliance_data = {}
+        self.scoring = None
         self.include_tags_set = set()
         self.exclude_tags_set = set()
         self.weighted_scores = {}
@@ -105,6 +141,33 @@ class TestRunner:
         self.progress_bar = False
         self.package_config = package_info_json_file
         self.redfish_response_messages = {}
+        self.response_log_policy = None
+        self.reuse_group_instances = False
+        self.max_concurrent_tests = 1
+        self.reorder_tests = False
+        self.defer_ac_resets = False
+        self.test_scheduler = None
+        self.resume_dir = resume_dir
+        self.checkpoint = None
+        self.checkpoint_started = False
+        self.completed_tests = set()
+        self.shard = shard
+        self.shard_planned_tests = []
+        self.shard_plan_hash = ""
+        self.cassette = cassette
+        self.profile = profile
+        self.clock = Clock.REAL
+        self.profiler = None
+        self.store_results = True
+        self.result_store = None
+        self.trace_format = ""
+        self.tracer = None
+        self.metrics_port = 0
+        self.metrics_textfile = ""
+        self.metrics_interval = 15
+        self.metrics_exporter = None
+        self.events = EventBus()
+        self.run_plan = []
         self.single_test_override = single_test_override
         runner_config = self._get_test_runner_config(test_runner_json_file)
 
@@ -161,6 +224,14 @@ class TestRunner:
                     )
         elif run_all_tests:
             self.test_sequence = run_all_tests
+
+        if resume_dir:
+            self.checkpoint = RunCheckpoint(resume_dir)
+            if not self.checkpoint.exists:
+                raise Exception(f"No checkpoint of a test run found in {resume_dir}")
+            for key, value in self.checkpoint.selection.items():
+                setattr(self, key, value)
+            self.completed_tests = self.checkpoint.get_completed_test_ids()
         # else:
         #     raise Exception(
         #         "Specify test cases/groups with -t, -g command line options or use test_runner.json"
@@ -182,6 +253,21 @@ class TestRunner:
                 self.progress_bar = runner_config["progress_bar"]
                 self.weighted_scores = runner_config.get("weighted_score", None)
                 self.normalized_scores = runner_config.get("normalized_score", None)
+                self.response_log_policy = ResponseLogPolicy.from_config(runner_config.get("response_log_policy", None))
+                self.reuse_group_instances = runner_config.get("reuse_group_instances", False)
+                self.max_concurrent_tests = runner_config.get("max_concurrent_tests", 1)
+                self.reorder_tests = runner_config.get("reorder_tests", False)
+                self.defer_ac_resets = runner_config.get("defer_ac_resets", False)
+                self.store_results = runner_config.get("result_store", True)
+                self.trace_format = runner_config.get("trace_format", "")
+                self.clock = runner_config.get("clock", Clock.REAL)
+                if self.clock not in Clock.MODES:
+                    raise Exception(f"clock in test_runner.json must be one of {Clock.MODES}")
+                self.metrics_port = runner_config.get("metrics_port", 0)
+                self.metrics_textfile = runner_config.get("metrics_textfile", "")
+                self.metrics_interval = runner_config.get("metrics_interval", 15)
+                if self.trace_format and self.trace_format not in Tracer.FORMATS:
+                    raise Exception(f"trace_format in test_runner.json must be one of {Tracer.FORMATS} or empty")
                 if self.normalized_scores:
                     normalized_values = list(self.normalized_scores.values())
                     if sum(normalized_values) != 100:
@@ -248,10 +334,10 @@ class TestRunner:
         self.dt = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
         test_dir = f'Tags-{"-".join(self.include_tags_set)}' if self.include_tags_set  and not self.single_test_override else testrun_name+"_{}".format(self.dt)
 
-        if self.workspace_dir:
-            self.output_dir = os.path.join(self.workspace_dir, self.output_dir, "TestRuns", test_dir)
+        if self.resume_dir:
+            self.output_dir = self.resume_dir
         else:
-            self.output_dir = os.path.join("workspace", "TestRuns", test_dir)
+            self.output_dir = os.path.join(self._get_runs_root(), test_dir)
         print("Output Dir is : ", self.output_dir)
        
         self.cmd_output_dir = os.path.join(self.output_dir, "RedfishCommandDetails")
@@ -259,6 +345,10 @@ class TestRunner:
             os.makedirs(self.output_dir)
         if not os.path.exists(self.cmd_output_dir):
             os.makedirs(self.cmd_output_dir)
+        self._start_metrics_exporter()
+        self.events.publish(
+            EventBus.RUN_STARTED, output_dir=self.output_dir, planned=self.run_plan, restored=len(self.completed_tests)
+        )
         dut_logger = LoggingWriter(
             self.cmd_output_dir, self.console_log, "RedfishCommandDetails_"+testrun_name, "json", self.debug_mode
         )
@@ -269,6 +359,8 @@ class TestRunner:
             self.output_dir, self.console_log, "TestScore_"+testrun_name, "json", self.debug_mode
         )
         self.test_result_file = os.path.join(self.output_dir, "TestReport_{}.log".format(self.dt))
+        if self.profile:
+            self.profiler = TestProfiler(self.profile, os.path.join(self.output_dir, "Profiles"))
         self.test_uri_response_check = None
         if self.response_check_name:
             cwd = "" if self.cwd == "/tmp" else self.cwd
@@ -287,13 +379,24 @@ class TestRunner:
             test_uri_response_check=self.test_uri_response_check,
             redfish_response_messages=self.redfish_response_messages,
             logger_path=self.output_dir,
-            workspace_dir=self.workspace_dir
+            workspace_dir=self.workspace_dir,
+            response_log_policy=self.response_log_policy,
         )
         self.comp_tool_dut.current_test_name = "Initialization"
         
+        self.comp_tool_dut.event_bus = self.events
+        if self.metrics_exporter:
+            self.metrics_exporter.metrics = self.comp_tool_dut.metrics
+        self.comp_tool_dut.cassette = self.cassette
+        self.comp_tool_dut.clock = self._create_clock()
+        if self.store_results:
+            self.result_store = ResultStore.open(self.output_dir)
+        if self.result_store:
+            self.result_store.start_run(os.path.basename(self.output_dir), __version__, shard=self.shard)
+            self.result_store.subscribe(self.events)
 
         self.writer = LoggingWriter(
-            self.output_dir, self.console_log, "OCPTV_"+testrun_name, "json", self.debug_mode
+            self.output_dir, self.console_log, "OCPTV_"+testrun_name, "json", self.debug_mode, self._publish_step
         )
         tv.config(writer=self.writer)
 
@@ -303,9 +406,14 @@ class TestRunner:
         #     self.active_run.add_log(LogSeverity.INFO, "{}".format(self.system_details))
         # else:
         #     self.active_run.add_log(LogSeverity.FATAL, "{}".format(self.system_details))
-        TestCase.SetUpAssociations(self.active_run, self.comp_tool_dut)
-        TestGroup.SetUpAssociations(self.active_run, self.comp_tool_dut)
-        FunctionalIfc.SetUpAssociations(self.active_run, self.comp_tool_dut)
+        # test groups, test cases and interfaces find the dut and test run through the run context
+        self.run_context = RunContext(self.active_run, self.comp_tool_dut)
+        self.run_context.test_scheduler = self.test_scheduler
+        if self.trace_format:
+            self.tracer = Tracer(__version__)
+            self.tracer.subscribe(self.events)
+            self.run_context.tracer = self.tracer
+        set_run_context(self.run_context)
         
         self.comp_tool_dut.set_up_connection()
 
@@ -347,24 +455,32 @@ class TestRunner:
         :rtype: int, str 
         """
         try:
-            if self.progress_bar:
-                progress_thread = threading.Thread(target=self.display_progress_bar)
-                progress_thread.daemon = True
-            data = self.test_hierarchy.get_compliance_test_cases()
-            if self.normalized_scores:
-                self.comp_data = self.generate_normalized_compliance_data(data, "")
+            RunProgress(self.events, self.progress_bar and not self.console_log, __version__)
+            self._create_scoring_engine()
             group_status_set = set()
             group_result_set = set()
+            self.test_scheduler = TestScheduler(
+                self.test_hierarchy,
+                self.dut_config["properties"],
+                self.defer_ac_resets,
+                DurationHistory(self._get_runs_root()),
+            )
+            if self.test_sequence and self.reorder_tests:
+                self.test_sequence = self.test_scheduler.order(self.test_sequence)
+            if self.shard and not self.resume_dir:
+                self._select_shard_tests()
+            planned_tests = self._get_planned_tests()
+            remaining_tests = [
+                test for test in planned_tests if not self._is_completed(test) and self._is_selected(test)
+            ]
+            self.run_plan = self._get_run_plan(remaining_tests)
+            print(self.test_scheduler.get_plan_table(remaining_tests))
             if self.test_cases:
-                if self.progress_bar and self.console_log is False:
-                        self.total_cases = len(self.test_cases)
-                        progress_thread.start()
-
                 for test in self.test_cases:
                     (
                         group_instance,
                         test_case_instances,
-                    ) = self.test_hierarchy.instantiate_obj_for_testcase(test)
+                    ) = self.test_hierarchy.instantiate_obj_for_testcase(test, self.reuse_group_instances)
                     group_inc_tags = group_instance.tags
                     print("Group tags ", group_instance.tags)
                     # group_exc_tags = group_instance.exclude_tags
@@ -373,15 +489,11 @@ class TestRunner:
                     group_status_set.add(group_status)
                     group_result_set.add(group_result)
             elif self.test_sequence:
-                if self.progress_bar and self.console_log is False:
-                        self.total_cases = len(self.test_sequence)
-                        progress_thread.start()
-                        
-                for test in self.test_sequence:
+                for tests in self._get_test_sequence_batches():
                     (
                         group_instance,
                         test_case_instances,
-                    ) = self.test_hierarchy.instantiate_obj_for_testcase(test)
+                    ) = self.test_hierarchy.instantiate_obj_for_testcases(tests, self.reuse_group_instances)
                     
                     group_inc_tags = group_instance.tags
                     # group_exc_tags = group_instance.exclude_tags
@@ -395,10 +507,7 @@ class TestRunner:
                     (
                         group_instance,
                         test_case_instances,
-                    ) = self.test_hierarchy.instantiate_obj_for_group(group)
-                    if self.progress_bar and self.console_log is False:
-                        self.total_cases = len(test_case_instances)
-                        progress_thread.start()
+                    ) = self.test_hierarchy.instantiate_obj_for_group(group, self.reuse_group_instances)
                     group_inc_tags = group_instance.tags
                     # group_exc_tags = group_instance.exclude_tags
 
@@ -407,20 +516,11 @@ class TestRunner:
                     group_result_set.add(group_result)
                     
             elif self.group_sequence:
-                # get total cases in group sequence from test hierarchy
-                tc_group = []
-                for g in self.group_sequence:
-                    tc_group.append(self.test_hierarchy.get_total_group_cases(g))
-
-                self.total_cases = sum(tc_group)
-                if self.progress_bar and self.console_log is False:
-                    progress_thread.start()
-
                 for group in self.group_sequence:
                     (
                         group_instance,
                         test_case_instances,
-                    ) = self.test_hierarchy.instantiate_obj_for_group(group)
+                    ) = self.test_hierarchy.instantiate_obj_for_group(group, self.reuse_group_instances)
 
                     group_inc_tags = group_instance.tags
                     # group_exc_tags = group_instance.exclude_tags
@@ -428,37 +528,13 @@ class TestRunner:
                     group_status, group_result = self._run_group_test_cases(group_instance, test_case_instances)
                     group_status_set.add(group_status)
                     group_result_set.add(group_result)
-                    
-            grade = (
-                    TestCase.total_compliance_score / TestCase.max_compliance_score * 100
-                    if TestCase.max_compliance_score != 0
-                    else 0
-                )
-            
-            gtotal = round(grade, 2)
 
-            msg = {
-                    "TimeStamp": datetime.now().strftime("%m-%d-%YT%H:%M:%S"),
-                    "TotalExecutionTime": str(timedelta(seconds=TestCase.total_execution_time)),
-                    "TotalScore": TestCase.total_compliance_score,
-                    "MaxComplianceScore": TestCase.max_compliance_score,
-                    "Grade": "{}%".format(gtotal),
-                    }
-            self.score_logger.write(json.dumps(msg))
-            self.test_result_data.append(("Total", "", 
-                                        timedelta(seconds=TestCase.total_execution_time),
-                                        TestCase.total_compliance_score, 
-                                        TestCase.max_compliance_score,"{}%".format(gtotal)))
-            self.generate_domain_test_report()
-            if self.weighted_scores:
-                self.generate_compliance_level_test_report()
-            if self.normalized_scores:
-                self.normalized_compliance_level_table()
-            self.generate_test_report()
-            time.sleep(1)
-            if self.progress_bar and self.console_log is False:
-                while progress_thread.is_alive():
-                    progress_thread.join(10)
+            if self.run_context and self.run_context.ac_reset_pending:
+                # leave the dut reset at the end of the run
+                tv.config(writer=self.writer)  # the test run of the last group has ended
+                self._execute_deferred_ac_reset()
+                tv.config(writer=StdoutWriter())
+            self._generate_reports()
                     
             status_code = 1 if group_result_set - {TestResult.PASS} else 0 # if there is any result other than PASS, status code repots failure
             exit_string = "Test execution failed" if group_status_set - {TestStatus.COMPLETE} else "Test execution is complete"
@@ -474,9 +550,497 @@ class TestRunner:
         finally:
             if self.comp_tool_dut:
                 self.comp_tool_dut.clean_up()
+            self._close_cassette()
+            self.events.publish(EventBus.RUN_FINISHED, status_code=status_code, exit_string=exit_string)
+            self._write_trace()
+            if self.profiler:
+                self.profiler.close()
+            if self.metrics_exporter:
+                self.metrics_exporter.stop()
+            if self.result_store:
+                self.result_store.end_run(status_code, exit_string, self.run_context, self._get_compliance_scores())
+                self.result_store.close()
             return status_code, exit_string
         
         
+    def _create_clock(self):
+        """
+        :return: clock of the run, virtual when the clock knob says so or the run replays a cassette
+        :rtype: Clock
+        """
+        if self.clock == Clock.REAL and not (self.cassette and self.cassette.replaying):
+            return Clock()
+        if self.max_concurrent_tests > 1:
+            # concurrent test cases would advance each other's virtual time, see VirtualClock
+            print("[WARNING]: max_concurrent_tests is ignored with a virtual clock, test cases run one at a time")
+            self.max_concurrent_tests = 1
+        if self.clock == Clock.EMULATOR and not (self.cassette and self.cassette.replaying):
+            return VirtualClock(self.comp_tool_dut.advance_emulator_clock)
+        return VirtualClock()
+
+    def _start_metrics_exporter(self):
+        """
+        Serve the Prometheus metrics of the run on metrics_port and/or write them to metrics_textfile
+        """
+        if not self.metrics_port and not self.metrics_textfile:
+            return
+        self.metrics_exporter = PrometheusExporter(self.events, __version__)
+        if self.metrics_port:
+            port = self.metrics_exporter.start_server(self.metrics_port)
+            print(f"Metrics served on http://127.0.0.1:{port}/metrics")
+        if self.metrics_textfile:
+            self.metrics_exporter.start_textfile(self.metrics_textfile, self.metrics_interval)
+
+    def _write_trace(self):
+        """
+        Write the spans of a traced run to Trace_<dt>.json (Chrome trace events) or Trace_<dt>.otlp.json
+        """
+        if not self.tracer:
+            return
+        extension = ".otlp.json" if self.trace_format == Tracer.OTLP else ".json"
+        trace_file = os.path.join(self.output_dir, f"Trace_{self.dt}{extension}")
+        self.tracer.write(trace_file, self.trace_format)
+        print(f"Trace written to {trace_file}")
+
+    def _close_cassette(self):
+        """
+        Closes the cassette of the run, warns about exchanges that were not in the replayed cassette
+        """
+        if not self.cassette:
+            return
+        if self.cassette.replaying and self.cassette.missing:
+            print(f"[WARNING]: {self.cassette.missing} Redfish requests were not recorded in the cassette")
+        self.cassette.close()
+
+    def _generate_reports(self):
+        """
+        Write the run totals to the score log and generate the final reports
+        """
+        gtotal = round(self.run_context.grade, 2)
+
+        msg = {
+                "TimeStamp": datetime.now().strftime("%m-%d-%YT%H:%M:%S"),
+                "TotalExecutionTime": str(timedelta(seconds=self.run_context.total_execution_time)),
+                "TotalScore": self.run_context.total_compliance_score,
+                "MaxComplianceScore": self.run_context.max_compliance_score,
+                "Grade": "{}%".format(gtotal),
+                }
+        self.score_logger.write(json.dumps(msg))
+        self.test_result_data.append(("Total", "", 
+                                    timedelta(seconds=self.run_context.total_execution_time),
+                                    self.run_context.total_compliance_score, 
+                                    self.run_context.max_compliance_score,"{}%".format(gtotal)))
+        self.generate_domain_test_report()
+        if self.weighted_scores:
+            self.generate_compliance_level_test_report()
+        if self.normalized_scores:
+            self.normalized_compliance_level_table()
+        self.generate_redfish_latency_report()
+        self.generate_profile_report()
+        self.generate_idle_time_report()
+        self.generate_test_report()
+        self.scoring.write_reports(os.path.splitext(self.test_result_file)[0], __version__, complete=True)
+
+    def _get_test_domain(self, test_id):
+        """
+        :param test_id: test id
+        :type test_id: str
+        :return: domain_name of the group of the test case, None if the group has none
+        :rtype: str
+        """
+        group_attributes, _ = self.test_hierarchy.get_testcase_attributes(test_id)
+        return group_attributes.get("domain_name") if group_attributes else None
+
+    def _get_compliance_scores(self):
+        """
+        :return: (kind, domain or compliance level, score, max score, grade) of the domains and of the weighted and
+            normalized compliance levels
+        :rtype: List[tuple]
+        """
+        if self.scoring is None:
+            return []
+        scores = [("domain", row[0], row[5], row[4], row[6]) for row in self.scoring.get_domain_rows() if row[2]]
+        scores += [("weighted", c_level, row[6], row[5], row[7]) for c_level, row in self.scoring.weighted_levels.items()]
+        scores += [
+            ("normalized", c_level, data["Total Score"], data["Max Score"], data["Grade"])
+            for c_level, data in self.scoring.normalized_levels.items()
+        ]
+        return scores
+
+    def _create_scoring_engine(self):
+        """
+        Create the scoring engine of the run, with the available test cases per domain and compliance level
+        """
+        self.scoring = ScoringEngine(
+            self.test_hierarchy.get_compliance_test_cases(),
+            self.test_hierarchy.get_domains(),
+            self.weighted_scores,
+            self.normalized_scores,
+        )
+
+    def _get_runs_root(self):
+        """
+        :return: directory that receives the test run directories
+        :rtype: str
+        """
+        if self.workspace_dir:
+            return os.path.join(self.workspace_dir, self.output_dir, self.runs_dir)
+        return os.path.join("workspace", self.runs_dir)
+
+    def _select_shard_tests(self):
+        """
+        Replace the test selection by the test cases of this shard. The test cases are distributed over the shards
+        by their duration (longest first, each to the shard with the least total duration so far), measured in
+        previous runs or else estimated. Every shard keeps the order of the selection.
+
+        All shards need the same selection and duration history to compute the same distribution. Shards run one
+        after the other in the same workspace would see each other's durations, so the distribution is kept in
+        ShardPlan.json and reused until a shard of the same selection runs a second time. The hash of the
+        distribution is recorded in the checkpoint of the shard, merge_runs rejects shards of different plans.
+        """
+        index, count = self.shard
+        planned_tests = self._get_planned_tests()
+        plan_file = os.path.join(self._get_runs_root(), "ShardPlan.json")
+        plan_key = hashlib.sha256(json.dumps([planned_tests, count]).encode()).hexdigest()
+        plans = {}
+        if os.path.isfile(plan_file):
+            with open(plan_file) as f:
+                plans = json.load(f)
+        plan = plans.get(plan_key)
+        if plan is None or index in plan["started"]:
+            plan = dict(zip(("shards", "durations"), self._get_shard_distribution(planned_tests, count)), started=[])
+        plan["started"].append(index)
+        plans[plan_key] = plan
+        os.makedirs(os.path.dirname(plan_file), exist_ok=True)
+        with open(plan_file, "w") as f:
+            json.dump(plans, f, indent=4)
+
+        self.shard_planned_tests = planned_tests
+        self.shard_plan_hash = hashlib.sha256(json.dumps([planned_tests, plan["shards"]]).encode()).hexdigest()
+        self.test_sequence = [planned_tests[position] for position in plan["shards"][index - 1]]
+        self.test_cases = []
+        self.test_groups = []
+        self.group_sequence = []
+        estimates = ", ".join(str(timedelta(seconds=round(seconds))) for seconds in plan["durations"])
+        print(
+            f"Shard {index}/{count}: {len(self.test_sequence)} of {len(planned_tests)} tests. "
+            f"Estimated shard durations: {estimates}. Shard plan {self.shard_plan_hash[:12]}"
+        )
+
+    def _get_shard_distribution(self, planned_tests, count):
+        """
+        :param planned_tests: test cases of all shards
+        :type planned_tests: List[str]
+        :param count: number of shards
+        :type count: int
+        :return: positions in planned_tests of the test cases of every shard, estimated duration of every shard
+        :rtype: List[List[int]], List[float]
+        """
+        durations = [self.test_scheduler.estimate_duration(test) for test in planned_tests]
+        shard_durations = [0] * count
+        shard_positions = [[] for _ in range(count)]
+        for position in sorted(range(len(planned_tests)), key=lambda position: (-durations[position], position)):
+            shard = min(range(count), key=lambda shard: (shard_durations[shard], shard))
+            shard_durations[shard] += durations[position]
+            shard_positions[shard].append(position)
+        return [sorted(positions) for positions in shard_positions], shard_durations
+
+    def _get_planned_tests(self):
+        """
+        :return: test cases of the run in run order, names or ids as selected
+        :rtype: List[str]
+        """
+        if self.test_cases:
+            return list(self.test_cases)
+        if self.test_sequence:
+            return list(self.test_sequence)
+        groups = self.test_groups or self.group_sequence
+        return [test for group in groups for test in self.test_hierarchy.get_group_testcase_ids(group)]
+
+    def _is_selected(self, test):
+        """
+        :param test: Name or id of Test case
+        :type test: str
+        :return: False if the test case will be skipped due to the include/exclude tags of the test runner config
+        :rtype: bool
+        """
+        group_attributes, testcase_attributes = self.test_hierarchy.get_testcase_attributes(test)
+        if testcase_attributes is None or self.single_test_override:
+            return True
+        tags = set(testcase_attributes.get("tags") or []) | set(group_attributes.get("tags") or [])
+        return self._is_enabled(self.include_tags_set, tags, self.exclude_tags_set)
+
+    def _get_run_plan(self, tests):
+        """
+        :param tests: Names or ids of the Test cases to run
+        :type tests: List[str]
+        :return: test_id, test_name and estimated duration of every test case, see EventBus.RUN_STARTED
+        :rtype: List[dict]
+        """
+        run_plan = []
+        for test in tests:
+            _, testcase_attributes = self.test_hierarchy.get_testcase_attributes(test)
+            if testcase_attributes is not None:
+                run_plan.append(
+                    {
+                        "test_id": testcase_attributes.get("test_id"),
+                        "test_name": testcase_attributes.get("test_name"),
+                        "estimate": self.test_scheduler.estimate_duration(test),
+                    }
+                )
+        return run_plan
+
+    def _publish_step(self, buffer):
+        """
+        Publish the test step artifacts of the OCPTV output
+
+        :param buffer: OCPTV json artifact
+        :type buffer: str
+        """
+        if '"testStepArtifact"' in buffer:
+            artifact = json.loads(buffer)["testStepArtifact"]
+            self.events.publish(EventBus.STEP, test_id=self.comp_tool_dut.current_test_id, artifact=artifact)
+
+    def _is_completed(self, test):
+        """
+        :param test: Name or id of Test case
+        :type test: str
+        :return: True if the test case finished before the run was resumed
+        :rtype: bool
+        """
+        _, testcase_attributes = self.test_hierarchy.get_testcase_attributes(test)
+        return testcase_attributes is not None and testcase_attributes.get("test_id") in self.completed_tests
+
+    def _start_checkpoint(self):
+        """
+        Start the checkpoint of a new run, or restore the results of the test cases that finished before the run
+        was resumed. Those test cases are not run again.
+        """
+        self.checkpoint_started = True
+        if self.checkpoint is None:
+            self.checkpoint = RunCheckpoint(self.output_dir)
+            selection = {
+                key: getattr(self, key)
+                for key in ("test_cases", "test_sequence", "test_groups", "group_sequence", "single_test_override")
+            }
+            shard = None
+            if self.shard:
+                shard = {
+                    "index": self.shard[0],
+                    "count": self.shard[1],
+                    "tests": self.shard_planned_tests,
+                    "plan": self.shard_plan_hash,
+                }
+            self.checkpoint.start_run(selection, __version__, shard)
+            return
+
+        self.checkpoint.resume_run(__version__)
+        for record in self.checkpoint.test_results:
+            self._restore_test_result(record)
+        msg = f"Run resumed, {len(self.completed_tests)} completed tests restored from {self.checkpoint.checkpoint_file}"
+        self.active_run.add_log(severity=LogSeverity.INFO, message=msg)
+
+    def _restore_test_result(self, record):
+        """
+        Account a test case result recorded in a checkpoint as if the test case ran in this run
+
+        :param record: "test" record of a RunCheckpoint
+        :type record: dict
+        :return: the restored test case result
+        :rtype: SimpleNamespace
+        """
+        test_instance = SimpleNamespace(**record)
+        test_instance.execution_time = timedelta(seconds=record["execution_time"])
+        test_instance.result = TestResult[record["result"]]
+        self.run_context.add_test_score(
+            test_instance.result == TestResult.PASS, test_instance.score, test_instance.score_weight
+        )
+        self._record_test_result(test_instance)
+        return test_instance
+
+    def _execute_deferred_ac_reset(self):
+        """
+        Execute the AC reset deferred by a test case, see TestScheduler
+        """
+        self.run_context.ac_reset_pending = False
+        self.active_run.add_log(severity=LogSeverity.INFO, message="Executing deferred AC reset")
+        FunctionalIfc().NodeACReset()
+
+    def _get_test_sequence_batches(self):
+        """
+        Split test_sequence into the lists of tests that are run against one group instance.
+        Without reuse_group_instances every test gets its own group instance and test run, otherwise
+        consecutive tests of the same group share them.
+
+        :return: list of test lists
+        :rtype: list
+        """
+        if not self.reuse_group_instances:
+            return [[test] for test in self.test_sequence]
+
+        batches = []
+        last_group_name = None
+        for test in self.test_sequence:
+            group_name = self.test_hierarchy.get_group_of_testcase(test)
+            if batches and group_name is not None and group_name == last_group_name:
+                batches[-1].append(test)
+            else:
+                batches.append([test])
+            last_group_name = group_name
+        return batches
+
+    def _get_resource_profile(self, group_instance, test_instance):
+        """
+        :return: resource profile of the test case, falls back to the profile of the group and then "mutating"
+        :rtype: str
+        """
+        resource_profile = test_instance.resource_profile or group_instance.resource_profile or "mutating"
+        if resource_profile not in TestCase.RESOURCE_PROFILES:
+            raise Exception(
+                f"Invalid resource_profile '{resource_profile}' for {test_instance.__class__.__name__}. "
+                f"Supported profiles are {TestCase.RESOURCE_PROFILES}"
+            )
+        return resource_profile
+
+    def _get_concurrent_batches(self, group_instance, test_instances):
+        """
+        Split the test cases into batches that are run together. Consecutive read only test cases form one
+        batch if max_concurrent_tests allows concurrency, every other test case is a batch on its own so it
+        never overlaps with another test case.
+
+        :return: list of test case lists
+        :rtype: list
+        """
+        batches = []
+        concurrent_batch = False
+        for test_instance in test_instances:
+            read_only = (
+                self.max_concurrent_tests > 1
+                and self._get_resource_profile(group_instance, test_instance) == "read_only"
+            )
+            if read_only and concurrent_batch:
+                batches[-1].append(test_instance)
+            else:
+                batches.append([test_instance])
+            concurrent_batch = read_only
+        return batches
+
+    def _run_test_cases_concurrently(self, test_instances):
+        """
+        Run test cases on a bounded pool of worker threads. Each test case runs in a copy of the current
+        contextvars context, so its command logger and test name on the dut are not seen by the others.
+
+        :param test_instances: read only test cases
+        :type test_instances: List[TestCase]
+        :return: test results in the order of test_instances
+        :rtype: List[TestResult]
+        """
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_concurrent_tests, len(test_instances)), thread_name_prefix="ctam_test"
+        )
+        try:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._run_test_case, test_instance)
+                for test_instance in test_instances
+            ]
+            return [future.result() for future in futures]
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+    def _run_test_case(self, test_instance):
+        """
+        Run setup, run and teardown of a single test case with its own command log
+
+        :param test_instance: test case
+        :type test_instance: TestCase
+        :return: result of the test case run
+        :rtype: TestResult
+        """
+        test_result = None
+        test_span = None
+        # this exception block goal is to ensure test case teardown() is called even if setup() or run() fails
+        try:
+            test_starttime = time.perf_counter()
+            execution_starttime = test_starttime
+            self.comp_tool_dut.current_test_id = test_instance.test_id
+            test_span = start_span(
+                f"{test_instance.test_id} {test_instance.test_name}", "test", test_id=test_instance.test_id
+            )
+            self.events.publish(EventBus.TEST_STARTED, test_id=test_instance.test_id, test_name=test_instance.test_name)
+            test_instance.setup()
+            self.comp_tool_dut.current_test_name = test_instance.test_name
+            file_name = "RedfishCommandDetails_{}_{}".format(test_instance.test_id,
+                                                                test_instance.test_name)
+            logger = LoggingWriter(
+                self.cmd_output_dir, self.console_log, file_name, "json", self.debug_mode
+            )
+            self.comp_tool_dut.logger = logger
+            self.comp_tool_dut.response_log_policy = self.comp_tool_dut.response_log_policy.copy()
+            execution_starttime = time.perf_counter()
+            profile = (
+                self.profiler.profile(test_instance.test_id, test_instance.test_name)
+                if self.profiler
+                else contextlib.nullcontext()
+            )
+            with profile:
+                test_result = test_instance.run()
+        except:  
+            exception_details = traceback.format_exc()
+            self.active_run.add_log(
+                severity=LogSeverity.FATAL, message=exception_details
+            )
+            test_instance.result = TestResult.FAIL
+            test_result = TestResult.FAIL
+        finally:
+            # attempt test cleanup even if test exception raised
+            test_instance.teardown()
+            execution_endtime = time.perf_counter()
+            test_instance.run_time = round(execution_endtime - execution_starttime, 3)
+            test_instance.execution_time = timedelta(seconds=round(execution_endtime - test_starttime, 3))
+            self.comp_tool_dut.current_test_id = None
+            end_span(test_span, result=TestResult(test_instance.result).name)
+        return test_result
+
+    def _record_test_result(self, test_instance):
+        """
+        Add a finished test case to the score log, the result table and the compliance data
+
+        :param test_instance: test case after _run_test_case
+        :type test_instance: TestCase
+        """
+        self.run_context.add_execution_time(test_instance.execution_time.total_seconds())
+        msg = {
+            "TimeStamp": datetime.now().strftime("%m-%d-%YT%H:%M:%S"),
+            "ExecutionTime": f"{test_instance.run_time} seconds",
+            "TestID": test_instance.test_id,
+            "TestName": test_instance.test_name,
+            "TestCaseScoreWeight":test_instance.score_weight,
+            "TestCaseScore": test_instance.score,
+            "TestCaseResult": TestResult(test_instance.result).name
+        }
+        test_tuple = (test_instance.test_id,
+                                       test_instance.test_name,
+                                       test_instance.execution_time,
+                                       test_instance.score_weight,
+                                       test_instance.score,                                              
+                                       TestResult(test_instance.result).name)
+        self.test_result_data.append(test_tuple)
+        self.scoring.add_result(
+            test_instance.test_id,
+            test_instance.test_name,
+            getattr(test_instance, "compliance_level", ""),
+            test_instance.execution_time,
+            test_instance.score_weight,
+            test_instance.score,
+            TestResult(test_instance.result).name,
+            self._get_test_domain(test_instance.test_id),
+        )
+        self.scoring.write_reports(os.path.splitext(self.test_result_file)[0], __version__)
+        self.score_logger.write(json.dumps(msg))
+
     def _run_group_test_cases(self, group_instance, test_case_instances):
         """
         for now, create a separate test run for each group. In the event of failures
@@ -492,13 +1056,24 @@ class TestRunner:
 
         group_status = TestStatus.ERROR
         group_result = TestResult.PASS
+        reported_tests = set()
+        group_span = None
 
         try:
             if not self.comp_tool_dut:
                 self._start(group_instance.__class__.__name__)
-
+            group_span = start_span(group_instance.__class__.__name__, "group")
+            if not self.checkpoint_started:
+                self._start_checkpoint()
+
+            if self.run_context.ac_reset_pending and not all(
+                self.test_scheduler.accepts_reset_pending(test.test_id) for test in test_case_instances
+            ):
+                # the setup of the group must not see the dut before its pending reset
+                self._execute_deferred_ac_reset()
             group_instance.setup()
 
+            enabled_test_instances = []
             for test_instance in test_case_instances:
                 test_inc_tags = test_instance.tags
                 tags = list(set(test_inc_tags) | set(group_instance.tags))
@@ -510,71 +1085,51 @@ class TestRunner:
                 if not valid and not self.single_test_override:
                     msg = f"Test {test_instance.__class__.__name__} skipped due to tags. tags = {test_inc_tags}"
                     self.active_run.add_log(severity=LogSeverity.INFO, message=msg)
+                    self.events.publish(
+                        EventBus.TEST_SKIPPED,
+                        test_id=test_instance.test_id,
+                        test_name=test_instance.test_name,
+                        reason="tags",
+                    )
+                    reported_tests.add(test_instance.test_id)
+                    continue
+                if test_instance.test_id in self.completed_tests:
+                    msg = f"Test {test_instance.__class__.__name__} skipped, it completed before the run was resumed"
+                    self.active_run.add_log(severity=LogSeverity.INFO, message=msg)
                     continue
                 if self.weighted_scores:
                     self.__compliance_level_score(testcase=test_instance)
-                # this exception block goal is to ensure test case teardown() is called even if setup() or run() fails
-                try:
-                    test_starttime = time.perf_counter()
-                    test_instance.setup()
-                    self.comp_tool_dut.current_test_name = test_instance.test_name
-                    file_name = "RedfishCommandDetails_{}_{}".format(test_instance.test_id,
-                                                                        test_instance.test_name)
-                    logger = LoggingWriter(
-                        self.cmd_output_dir, self.console_log, file_name, "json", self.debug_mode
-                    )
-                    self.comp_tool_dut.logger = logger
-                    execution_starttime = time.perf_counter()
-                    test_result = test_instance.run()
-                    if (
-                        test_result == TestResult.FAIL
-                    ):  # if any test fails, the group fails
+                enabled_test_instances.append(test_instance)
+
+            for test_batch in self._get_concurrent_batches(group_instance, enabled_test_instances):
+                # test cases accepting a pending reset run after it, or AC cycle the dut themselves and clear it
+                if self.run_context.ac_reset_pending and not all(
+                    self.test_scheduler.accepts_reset_pending(test_instance.test_id) for test_instance in test_batch
+                ):
+                    self._execute_deferred_ac_reset()
+                if len(test_batch) > 1:
+                    test_results = self._run_test_cases_concurrently(test_batch)
+                else:
+                    test_results = [self._run_test_case(test_batch[0])]
+                # results are recorded in test order, however the test cases were scheduled
+                for test_instance, test_result in zip(test_batch, test_results):
+                    if test_result == TestResult.FAIL:  # if any test fails, the group fails
                         group_result = TestResult.FAIL
-                except:  
-                    exception_details = traceback.format_exc()
-                    self.active_run.add_log(
-                        severity=LogSeverity.FATAL, message=exception_details
+                    self._record_test_result(test_instance)
+                    self.checkpoint.add_test_result(test_instance)
+                    reported_tests.add(test_instance.test_id)
+                    self.events.publish(
+                        EventBus.TEST_FINISHED,
+                        test_id=test_instance.test_id,
+                        test_name=test_instance.test_name,
+                        result=TestResult(test_instance.result).name,
+                        run_time=test_instance.run_time,
+                        test=test_instance,
                     )
-                    test_instance.result = TestResult.FAIL
-                    group_result = TestResult.FAIL
-                finally:
-                    # attempt test cleanup even if test exception raised
-                    test_instance.teardown()
-                    execution_endtime = time.perf_counter()
-                    execution_time = round(execution_endtime - execution_starttime, 3)
-                    test_instance.execution_time = timedelta(seconds=round(execution_endtime - test_starttime, 3))
-                    TestCase.total_execution_time += round(execution_endtime - test_starttime, 3)
-                    msg = {
-                        "TimeStamp": datetime.now().strftime("%m-%d-%YT%H:%M:%S"),
-                        "ExecutionTime": f"{execution_time} seconds",
-                        "TestID": test_instance.test_id,
-                        "TestName": test_instance.test_name,
-                        "TestCaseScoreWeight":test_instance.score_weight,
-                        "TestCaseScore": test_instance.score,
-                        "TestCaseResult": TestResult(test_instance.result).name
-                    }
-                    test_tuple = (test_instance.test_id,
-                                                   test_instance.test_name,
-                                                   test_instance.execution_time,
-                                                   test_instance.score_weight,
-                                                   test_instance.score,                                              
-                                                   TestResult(test_instance.result).name)
-                    self.test_result_data.append(test_tuple)
-                    if self.weighted_scores:
-                        self.update_weighted_data(test_instance)
-                    if self.normalized_scores:
-                        self.update_normalized_compliance_data(test_instance)
-                    self.score_logger.write(json.dumps(msg))
-
-            grade = (
-                TestCase.total_compliance_score / TestCase.max_compliance_score * 100
-                if TestCase.max_compliance_score != 0
-                else 0
-            )
 
-            grt = round(grade, 2)
+            grt = round(self.run_context.grade, 2)
 
-            msg = f"Compliance Run completed. Total Score = {TestCase.total_compliance_score:0.2f} out of {TestCase.max_compliance_score:0.2f}, Grade = {grt:0.2f}%"
+            msg = f"Compliance Run completed. Total Score = {self.run_context.total_compliance_score:0.2f} out of {self.run_context.max_compliance_score:0.2f}, Grade = {grt:0.2f}%"
             self.active_run.add_log(severity=LogSeverity.INFO, message=msg)
            
             group_status = TestStatus.COMPLETE
@@ -596,11 +1151,103 @@ class TestRunner:
             group_result = TestResult.FAIL
 
         finally:
+            for test_instance in test_case_instances:
+                if test_instance.test_id not in reported_tests:
+                    # completed before the run was resumed, or not run because the group failed
+                    self.events.publish(
+                        EventBus.TEST_SKIPPED,
+                        test_id=test_instance.test_id,
+                        test_name=test_instance.test_name,
+                        reason="not run",
+                    )
             # attempt group cleanup even if test exception raised
             group_instance.teardown()
+            end_span(group_span, result=TestResult(group_result).name)
             self._end(group_status, group_result)
             return group_status, group_result
 
+    def merge_runs(self, run_dirs):
+        """
+        Merge the results of the shards of a sharded run into one set of reports, as if all test cases had run in a
+        single run. The results are read from the checkpoints of the run directories.
+
+        :param run_dirs: output directories of the shards
+        :type run_dirs: List[str]
+        :return: status_code, exit_string
+        :rtype: int, str
+        """
+        checkpoints = []
+        for run_dir in run_dirs:
+            checkpoint = RunCheckpoint(run_dir)
+            if not checkpoint.exists:
+                raise Exception(f"No checkpoint of a test run found in {run_dir}")
+            checkpoints.append(checkpoint)
+        self._check_shards(checkpoints)
+
+        self.dt = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
+        self.output_dir = os.path.join(self._get_runs_root(), f"Merged_{self.dt}")
+        os.makedirs(self.output_dir, exist_ok=True)
+        print("Output Dir is : ", self.output_dir)
+        self.score_logger = LoggingWriter(self.output_dir, self.console_log, "TestScore_Merged", "json", self.debug_mode)
+        self.test_result_file = os.path.join(self.output_dir, "TestReport_{}.log".format(self.dt))
+        self.run_context = RunContext()
+        self._create_scoring_engine()
+        if self.store_results:
+            self.result_store = ResultStore.open(self.output_dir)
+        if self.result_store:
+            self.result_store.start_run(os.path.basename(self.output_dir), __version__, kind="merged")
+
+        merged_tests = set()
+        for checkpoint in checkpoints:
+            for record in checkpoint.test_results:
+                if record["test_id"] in merged_tests:
+                    print(f"[WARNING]: {record['test_id']} has results in more than one run, using the first result")
+                    continue
+                merged_tests.add(record["test_id"])
+                test_instance = self._restore_test_result(record)
+                if self.result_store:
+                    self.result_store.add_test_result(test_instance)
+        self._generate_reports()
+
+        status_code = 1 if any(test[5] != TestResult.PASS.name for test in self.test_result_data[:-1]) else 0
+        exit_string = f"Merged the results of {len(merged_tests)} tests from {len(run_dirs)} runs"
+        if self.result_store:
+            self.result_store.end_run(status_code, exit_string, self.run_context, self._get_compliance_scores())
+            self.result_store.close()
+        return status_code, exit_string
+
+    def _check_shards(self, checkpoints):
+        """
+        Warn if shards of the sharded run are missing or did not finish all their test cases
+
+        :param checkpoints: checkpoints of the runs to merge
+        :type checkpoints: List[RunCheckpoint]
+        :raises Exception: the shards were distributed by different plans, e.g. from different duration histories
+        """
+        shards = [checkpoint.shard for checkpoint in checkpoints if checkpoint.shard]
+        if not shards:
+            return
+        plans = {shard.get("plan") for shard in shards}
+        if len(plans) > 1:
+            shard_plans = ", ".join(
+                f"{checkpoint.checkpoint_file}: {(checkpoint.shard.get('plan') or 'none')[:12]}"
+                for checkpoint in checkpoints
+                if checkpoint.shard
+            )
+            raise Exception(f"The shards to merge were run with different shard plans: {shard_plans}")
+        count = shards[0]["count"]
+        indexes = sorted(shard["index"] for shard in shards)
+        if indexes != list(range(1, count + 1)) or any(shard["count"] != count for shard in shards):
+            print(f"[WARNING]: Merging shards {indexes}, but the run was split into {count} shards")
+        planned_tests = set()
+        for test in shards[0]["tests"]:
+            _, testcase_attributes = self.test_hierarchy.get_testcase_attributes(test)
+            planned_tests.add(testcase_attributes.get("test_id") if testcase_attributes else test)
+        finished_tests = set().union(*(checkpoint.get_completed_test_ids() for checkpoint in checkpoints))
+        missing_tests = planned_tests - finished_tests
+        if missing_tests:
+            print(f"[WARNING]: No results for {len(missing_tests)} tests: {' '.join(sorted(missing_tests))}")
+
     def get_system_details(self):
         """
         Method to perform System Discovery
@@ -622,102 +1269,23 @@ class TestRunner:
         finally:
             if self.comp_tool_dut:
                 self.comp_tool_dut.clean_up()
+            self._close_cassette()
+            if self.result_store:
+                self.result_store.end_run(status_code, exit_string, self.run_context)
+                self.result_store.close()
             return status_code, exit_string
             
 
-    def update_weighted_data(self, test_instance):
-        c_level = test_instance.compliance_level
-        w_score = self.weighted_scores.get(test_instance.compliance_level, 10)
-        execution_time = test_instance.execution_time
-        total_test = 1
-        test_passed = 1 if TestResult(test_instance.result).name == TestResult.PASS.name else 0
-        score_weight = test_instance.score_weight
-        score = test_instance.score
-        available_testcases = self.test_hierarchy.get_compliance_test_cases()
-        grade = 0
-        if test_instance.compliance_level in self.weighted_scores:
-            self.generate_compliance_data(test_instance, c_level, w_score, available_testcases[c_level], total_test, test_passed, score_weight, score, grade, execution_time)
-            
-        else:   
-            self.generate_compliance_data(test_instance, "L3", self.weighted_scores["L3"], available_testcases["L3"], total_test, test_passed, 0, 0, 0, execution_time)
+    def _write_report_table(self, table):
+        """
+        Append a report table to the test report log and print it
 
-    def generate_compliance_data(self, test_instance, c_level, l_weight, a_testcases, t_test, t_pass, s_weight, score, grade, e_time):
-        
-        if c_level not in self.compliance_data:
-            
-            if s_weight == 0:
-                grade = 0
-            else:
-                grade = round((test_instance.score / test_instance.score_weight * 100), 2)
-            self.compliance_data[c_level] = [c_level,
-                                            l_weight,
-                                            a_testcases,
-                                            t_test,
-                                            t_pass,
-                                            s_weight,
-                                            score,
-                                            grade,
-                                            e_time
-                                            ]
-        else:
-            data = self.compliance_data[c_level]
-            sw = data[5] + test_instance.score_weight
-            s = data[6] + test_instance.score
-            if s_weight == 0:
-                grade = 0
-            else:
-                grade = round((s / sw * 100), 2)
-            self.compliance_data[c_level] = [c_level,
-                                                l_weight,
-                                                a_testcases,
-                                                data[3] + t_test,
-                                                data[4] + t_pass,
-                                                data[5] + s_weight,
-                                                data[6]+ score,
-                                                grade,
-                                                data[8] + e_time
-                                                ]
-
-    def generate_normalized_compliance_data(self,  c_data, test_instance):
-        comp_data = {}
-        for key, value in c_data.items():
-            w_score = self.normalized_scores[key]
-            d_score = round(w_score/value, 2)
-
-            comp_data[key] = {"Compliance Level":key,
-                "Normalized Weight":w_score,
-                "TestCases Available":value,
-                "Normalized Score":d_score,
-                "TestCases Executed":0,
-                "TestCases Passed":0,
-                "Total Score":0,
-                "Max Score":0,
-                "Grade":0,
-                "Execution Time":timedelta(seconds=0)}
-        return comp_data
-
-    def update_normalized_compliance_data(self, test_instance):
-        c_level = test_instance.compliance_level
-        if c_level in self.comp_data:
-            data = self.comp_data[c_level]
-            data["TestCases Executed"] += 1
-            data["TestCases Passed"] += 1 if TestResult(test_instance.result).name == TestResult.PASS.name else 0
-            data["Total Score"] = data["Normalized Score"] * data["TestCases Passed"]
-            data["Max Score"] = data["Normalized Score"] * data["TestCases Executed"]
-            grade = round(data["TestCases Passed"] / data["TestCases Executed"] * 100, 2)
-            data["Execution Time"] += test_instance.execution_time
-            data["Grade"] = grade
-            self.comp_data[c_level] = data
-        else:
-            data = self.comp_data["L3"]
-            data["TestCases Executed"] += 1
-            data["TestCases Passed"] += 1 if TestResult(test_instance.result).name == TestResult.PASS.name else 0
-            data["Total Score"] = data["Normalized Score"] * data["TestCases Passed"]
-            data["Max Score"] = data["Normalized Score"] * data["TestCases Executed"]
-            # grade = round(data["TestCases Passed"] / data["TestCases Executed"] * 100, 2)
-            data["Execution Time"] += test_instance.execution_time
-            data["Grade"] = 0
-            self.comp_data["L3"] = data
+        :param table: report table
+        :type table: PrettyTable
+        """
+        with open(self.test_result_file, 'a') as f:
+            f.write("\n" + str(table))
+        print(table)
 
     def generate_test_report(self):
         """
@@ -725,198 +1293,55 @@ class TestRunner:
         It will have TestID, TestName, Test Score, Test Result, Test Weight and total
 
         """
-        t = PrettyTable(["Test ID", "Test Name", "Execution Time", "TestCase Weight", "Test Score", "Test Result"])
-        t.title = f"Test Result -  V {__version__}"
-        t.add_rows(self.test_result_data[:len(self.test_result_data) - 1:])
-        t.add_row(["", "", "", "", "", ""], divider=True)
-        t.add_row(self.test_result_data[-1], divider=True)
-        t.align["TestName"] = "l"
-        
-        with open(self.test_result_file, 'a') as f:
-            f.write("\n" + str(t))
-        print(t)
+        self._write_report_table(self.scoring.get_test_table(__version__))
 
     def generate_compliance_level_test_report(self):
         """
         This method is used for creating a tabula format for compliance level test result.
         It will have ComplianceID, ComplianceScore, GroupID, TestCaseID, TestCaseName, WeightedScore, TestScore and TestResult.
         """
-        
         if self.weighted_scores:
-        
-            c_data = dict(sorted(self.compliance_data.items()))
-            compliance_values = c_data.values()
-            total_test_cases = sum([x[3] for x in compliance_values])
-            total_passed_test_cases = sum([x[4] for x in compliance_values])
-            total_weight = sum([x[5] for x in compliance_values])
-            total_score = sum([x[6] for x in compliance_values])
-            total_execution = sum([x[8].total_seconds() for x in compliance_values])
-            total_available_testcases = sum([x[2] for x in compliance_values])
-            grade = round((total_score / total_weight * 100), 2) if total_weight else 0
-
-            ct = PrettyTable(["Compliance Level", "Level Weight", "TestCases Available", "TestCases Executed", "TestCases Passed", "Total Weight", "Total Score", "Grade", "Total Execution Time"])
-            ct.title = "Compliance Level Weighted Report"
-            ct.add_rows(c_data.values())
-            
-            ct.add_row(["","","","","","","","",""], divider=True)
-            ct.add_row(["Total", "", total_available_testcases, total_test_cases, total_passed_test_cases, total_weight, total_score, f"{grade}%", timedelta(seconds=total_execution)])
-            
-            with open(self.test_result_file, 'a') as f:
-                f.write("\n" + str(ct))
-            print(ct)
+            self._write_report_table(self.scoring.get_weighted_table())
 
     def normalized_compliance_level_table(self):
-        data = next(iter(self.comp_data))
-        sorted_data = dict(sorted(self.comp_data.items()))
-        total_normalized_weight = 0
-        total_test_cases_available = 0
-        total_normalized_score = 0
-        total_test_cases_executed = 0
-        total_test_cases_passed = 0
-        total_score = 0
-        sum_max_score = 0
-        total_execution_time = timedelta(seconds=0)
-
-        for key, value in self.comp_data.items():
-            total_normalized_weight += value['Normalized Weight']
-            total_test_cases_available += value['TestCases Available']
-            total_normalized_score += value['Normalized Score']
-            total_test_cases_executed += value['TestCases Executed']
-            total_test_cases_passed += value['TestCases Passed']
-            total_score += value['Total Score']
-            sum_max_score += value['Max Score']
-            total_execution_time += value['Execution Time']
-
-        grade = round((total_score / sum_max_score * 100), 2) if sum_max_score else 0
-        normalized_grade = round((total_test_cases_passed / total_test_cases_available * 100), 2)
-        dt = PrettyTable(list(self.comp_data[data].keys()))
-        dt.title = "Compliance Level Normalized Weighted Report"
-        vals = [d.values() for _,d in sorted_data.items()]
-        dt.add_rows(vals)
-        dt.add_row(["","","","","","","","", "", ""], divider=True)
-        dt.add_row(["Total", total_normalized_weight, total_test_cases_available, total_normalized_score, total_test_cases_executed, total_test_cases_passed, total_score, sum_max_score, f"{grade}%", total_execution_time])
-        dt2 = PrettyTable(["TestCases Available", "TestCases Passed", "Grade"])
-        dt2.title = "Compliance Level Normalized Weight Overall Report"
-        # dt2.add_row(["","", "", ""], divider=True)
-        dt2.add_row([total_test_cases_available, total_test_cases_passed, normalized_grade])
-
-        print(dt)
-        with open(self.test_result_file, 'a') as f:
-            f.write("\n" + str(dt))
-        with open(self.test_result_file, 'a') as f:
-            f.write("\n" + str(dt2))
-        print(dt2)
+        for table in self.scoring.get_normalized_tables():
+            self._write_report_table(table)
 
-    def generate_domain_test_report(self):
+    def generate_redfish_latency_report(self):
         """
-        This method is used for creating a tabula format for test result for Domain level.
-        It will have DomainID, Domain, TComplianceWeight, ComplianceScore, Grade and total
-
+        This method is used for creating a tabula format for the Redfish latency of the run.
+        It has a row per endpoint (method, URI template, status class) with its p50/p95/p99 latency, bytes, retries
+        and timeouts, slowest first. The endpoints and their latency histograms are written to RedfishLatency_<>.json
         """
-        dt = PrettyTable(["Domain ID", "Domain", "TestCases Available","TestCases Executed", "Testcases Passed", "Total Weight", "Total Score", "Grade", "Total Execution Time"])
-        dt.title = "Domain-wise Test Report"
-
-        domain_count = self.test_hierarchy.get_domains()
-
-        executionTimes = [0, 0, 0, 0]
-        testCases = [0, 0, 0, 0]
-        passedTests = [0, 0, 0, 0]
-        compScore = [0, 0, 0, 0]
-        compWeight = [0, 0, 0, 0]
-        
-        for i in range(len(self.test_result_data)-1):
-            testID = self.test_result_data[i][0]
-            testExecTime = self.test_result_data[i][2].total_seconds()
-            testWeight = self.test_result_data[i][3]
-            testScore = self.test_result_data[i][4]
-
-            # check for telemetry cases
-            if testID.startswith("T"):
-                executionTimes[0] += testExecTime
-                testCases[0] += 1
-                if testScore == testWeight:
-                    passedTests[0] += 1
-                compWeight[0] += testWeight
-                compScore[0] += testScore
-
-            # check for RAS cases
-            elif testID.startswith("R"):
-                executionTimes[1] += testExecTime
-                testCases[1] += 1
-                if testScore == testWeight:
-                    passedTests[1] += 1
-                compWeight[1] += testWeight   
-                compScore[1] += testScore
-
-            # check for health check cases
-            elif testID.startswith("H"):
-                executionTimes[2] += testExecTime
-                testCases[2] += 1
-                if testScore == testWeight:
-                    passedTests[2] += 1
-                compWeight[2] += testWeight    
-                compScore[2] += testScore
-
-            # check for fw update cases
-            elif testID.startswith("F"):
-                executionTimes[3] += testExecTime
-                testCases[3] += 1
-                if testScore == testWeight:
-                    passedTests[3] += 1
-                compWeight[3] += testWeight    
-                compScore[3] += testScore
-
-        grade = [0, 0, 0, 0]
-        for j in range(len(compScore)):
-            if compWeight[j] != 0:
-                grade[j] = compScore[j]/compWeight[j]*100
-                grade[j] = round(grade[j], 2)
-
-        dt.add_row(["T", "Telemetry", domain_count["Telemetry"],testCases[0], passedTests[0], 
-                    compWeight[0], compScore[0], "{}%".format(grade[0]), timedelta(seconds=executionTimes[0])])
-        dt.add_row(["R", "RAS", domain_count["Ras"],testCases[1], passedTests[1], 
-                    compWeight[1], compScore[1], "{}%".format(grade[1]), timedelta(seconds=executionTimes[1])])
-        dt.add_row(["H", "Health Check", domain_count["HealthCheck"],testCases[2], passedTests[2], 
-                    compWeight[2], compScore[2], "{}%".format(grade[2]), timedelta(seconds=executionTimes[2])])
-        dt.add_row(["F", "FW Update", domain_count["FWUpdate"],testCases[3], passedTests[3], 
-                    compWeight[3], compScore[3], "{}%".format(grade[3]), timedelta(seconds=executionTimes[3])], divider=True)
-
-        executionTimetotal = sum(executionTimes)
-        testCasesTotal = sum(testCases)
-        passedTestsTotal = sum(passedTests)
-        compWeightTotal = sum(compWeight)
-        compScoreTotal = sum(compScore)
-        gradeTotal = (
-                compScoreTotal/ compWeightTotal * 100
-                if compWeightTotal != 0
-                else 0
-            )
-        
-        gt = round(gradeTotal, 2)
+        if not self.comp_tool_dut or not self.comp_tool_dut.metrics.endpoints:
+            return
+        self._write_report_table(self.comp_tool_dut.metrics.get_table())
+        self.comp_tool_dut.metrics.write_report(
+            os.path.join(self.output_dir, "RedfishLatency_{}.json".format(self.dt)), __version__
+        )
 
-        dt.add_row(["Total", "", "",testCasesTotal, passedTestsTotal,
-                   compWeightTotal, compScoreTotal, "{}%".format(gt), timedelta(seconds=executionTimetotal)], divider=True)
-        with open(self.test_result_file, 'a') as f:
-            f.write("\n" + str(dt))
-        print(dt)
+    def generate_profile_report(self):
+        """
+        This method is used for creating a tabula format for the profile hotspots of the test cases, when the run
+        is profiled. The profiles of every test case are in the Profiles directory of the run
+        """
+        if self.profiler and self.profiler.hotspots:
+            self._write_report_table(self.profiler.get_hotspot_table())
 
+    def generate_idle_time_report(self):
+        """
+        This method is used for creating a tabula format for the time the test cases waited, by test case and reason
+        """
+        if self.comp_tool_dut and self.comp_tool_dut.clock.idle:
+            self._write_report_table(self.comp_tool_dut.clock.get_table())
 
-    def display_progress_bar(self):
+    def generate_domain_test_report(self):
         """
-        shows a real-time progress bar in the console displaying the percentage of test cases completed.
+        This method is used for creating a tabula format for test result for Domain level.
+        It has a row per domain (domain_name of the test groups) with its test cases, weight, score, grade and total
+
         """
-        with alive_bar(self.total_cases, title= "Progress:", spinner="arrow") as bar:
-            count = 0
-            while count < self.total_cases:
-                temp = count
-                count = len(self.test_result_data)
-                time.sleep(0.002)
-                while temp < count:
-                    bar()
-                    temp += 1 
-                            
-                if count == self.total_cases:
-                    break
+        self._write_report_table(self.scoring.get_domain_table())
 
 
 class LoggingWriter(Writer):
@@ -927,7 +1352,7 @@ class LoggingWriter(Writer):
     :type Writer:
     """
 
-    def __init__(self, output_dir, console_log, testrun_name,extension_name,  debug):
+    def __init__(self, output_dir, console_log, testrun_name,extension_name,  debug, listener=None):
         """
         Initialize file logging parameters
 
@@ -939,7 +1364,10 @@ class LoggingWriter(Writer):
         :type testrun_name: str
         :param debug: if true, log LogSeverity.DEBUG messages
         :type debug: bool
+        :param listener: called with every message written, e.g. to record OCPTV artifacts, defaults to None
+        :type listener: callable, optional
         """
+        self.listener = listener
         # Create a logger
         self.logger = logging.getLogger(testrun_name)
         self.debug = debug
@@ -980,6 +1408,8 @@ class LoggingWriter(Writer):
                 return
 
         self.logger.info(buffer)
+        if self.listener:
+            self.listener(buffer)
         
     def log(self, msg: str):
         """
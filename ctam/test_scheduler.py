@@ -0,0 +1,250 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+"""
+from datetime import timedelta
+
+from prettytable import PrettyTable
+
+
+class TestScheduler:
+    """
+    Plans a test run around the AC cycles of its test cases. Test cases and groups declare the dut state they need
+    (preconditions), the state they leave behind (postconditions) and how many AC cycles with activation they perform
+    (ac_cycles), see TestCase. From these the scheduler
+
+    - estimates the duration of the run from the durations measured in previous runs, or else from the power and
+      idle wait times of the dut config,
+    - optionally reorders a test sequence, so test cases that do not need a clean dut run while a reset is pending
+      and test cases whose conditions are met run first,
+    - tells the test runner when a deferred reset must be executed. With defer_resets, a test case that only AC
+      cycles the dut to reset it and declares the postcondition "reset_pending" does not reset at the end of the
+      test case. The reset is dropped if the next test case AC cycles the dut anyway or runs after it
+      (precondition "reset_pending"), otherwise it is executed before the next test case.
+    """
+
+    CLEAN_STATE = "clean_state"
+    RESET_PENDING = "reset_pending"
+    DEFAULT_TEST_DURATION = 60  # seconds, estimated run time of a test case without its AC cycles
+
+    def __init__(self, test_hierarchy, dut_config, defer_resets=False, durations=None):
+        """
+        :param test_hierarchy: discovered list of test groups and associated test cases
+        :type test_hierarchy: TestHierarchy
+        :param dut_config: "properties" of the dut info json file
+        :type dut_config: dict
+        :param defer_resets: defer reset only AC cycles until a test case needs a clean dut, defaults to False
+        :type defer_resets: bool, optional
+        :param durations: measured durations of test cases (e.g. DurationHistory), used instead of the estimate
+            from the declarations, defaults to None
+        :type durations: DurationHistory, optional
+        """
+        self.test_hierarchy = test_hierarchy
+        self.defer_resets = defer_resets
+        self.durations = durations
+
+        def wait_time(name, default):
+            return dut_config.get(name, {}).get("value", default)
+
+        # same defaults as PowerDriver.set_power, the longest a reset waits when power states are confirmed
+        self.reset_duration = wait_time("PowerOffWaitTime", 60) + wait_time("PowerOnWaitTime", 300)
+        self.ac_cycle_duration = self.reset_duration + wait_time("IdleWaitTimeAfterFirmwareUpdate", 300)
+
+    def _get_declaration(self, test, name):
+        """
+        :param test: Name or id of Test case
+        :type test: str
+        :param name: attribute name
+        :type name: str
+        :return: value of the attribute declared by the test case, or else by its group, None if neither declares it
+        """
+        group_attributes, testcase_attributes = self.test_hierarchy.get_testcase_attributes(test)
+        if testcase_attributes is None:
+            return None
+        value = testcase_attributes.get(name)
+        return value if value is not None else group_attributes.get(name)
+
+    def get_preconditions(self, test):
+        """
+        :return: conditions the test case needs before it runs. A test case that declares none needs a clean dut,
+            unless it is read only.
+        :rtype: set
+        """
+        preconditions = self._get_declaration(test, "preconditions")
+        if preconditions is None:
+            return set() if self._get_declaration(test, "resource_profile") == "read_only" else {self.CLEAN_STATE}
+        return set(preconditions)
+
+    def accepts_reset_pending(self, test):
+        """
+        :param test: Name or id of Test case
+        :type test: str
+        :return: True if the test case runs while a reset is pending, because it declares the precondition
+            "reset_pending" or its own AC cycle resets the dut anyway. Otherwise a pending reset must be executed
+            before it.
+        :rtype: bool
+        """
+        return self.RESET_PENDING in self.get_preconditions(test) or self.get_ac_cycles(test) > 0
+
+    def may_defer_reset(self, test):
+        """
+        :param test: Name or id of Test case
+        :type test: str
+        :return: True if the reset only AC cycle of the test case may be left pending, i.e. resets are deferred and
+            the test case declares the postcondition "reset_pending"
+        :rtype: bool
+        """
+        return self.defer_resets and self.RESET_PENDING in self._next_state(test, set())
+
+    def get_ac_cycles(self, test):
+        """
+        :return: number of AC cycles with activation the test case performs, 0 if not declared
+        :rtype: int
+        """
+        return self._get_declaration(test, "ac_cycles") or 0
+
+    def _get_measured_duration(self, test_id):
+        return self.durations.get(test_id) if self.durations is not None else None
+
+    def estimate_duration(self, test):
+        """
+        :param test: Name or id of Test case
+        :type test: str
+        :return: measured duration of the test case in seconds, or else the estimate from its AC cycles
+        :rtype: float
+        """
+        _, testcase_attributes = self.test_hierarchy.get_testcase_attributes(test)
+        if testcase_attributes is None:
+            return self.DEFAULT_TEST_DURATION
+        measured = self._get_measured_duration(testcase_attributes.get("test_id"))
+        if measured is not None:
+            return measured
+        ac_cycle_time = self.get_ac_cycles(test) * self.ac_cycle_duration
+        if self.RESET_PENDING in self._next_state(test, set()):
+            ac_cycle_time += self.reset_duration
+        return self.DEFAULT_TEST_DURATION + ac_cycle_time
+
+    def _next_state(self, test, state):
+        """
+        :param test: Name or id of Test case
+        :type test: str
+        :param state: dut conditions before the test case
+        :type state: set
+        :return: dut conditions after the test case. A read only test case keeps the state, other test cases without
+            declared postconditions leave an unknown state.
+        :rtype: set
+        """
+        postconditions = self._get_declaration(test, "postconditions")
+        if postconditions is not None:
+            return set(postconditions)
+        if self._get_declaration(test, "resource_profile") == "read_only":
+            return set(state)
+        return set()
+
+    def _get_rank(self, test, state):
+        """
+        Rank of a test case as the next test case to run, lower is better: test cases whose conditions are met
+        come first, then test cases that do not need a clean dut while the dut is not clean, and while a reset is
+        pending, test cases that accept it.
+
+        :rtype: tuple
+        """
+        preconditions = self.get_preconditions(test)
+        unmet = len(preconditions - {self.CLEAN_STATE, self.RESET_PENDING} - state)
+        needs_reset = self.CLEAN_STATE in preconditions and self.CLEAN_STATE not in state
+        forces_reset = self.RESET_PENDING in state and not self.accepts_reset_pending(test)
+        return unmet, needs_reset, forces_reset
+
+    def order(self, tests):
+        """
+        Reorder a test sequence. The order is kept wherever it makes no difference, so test cases only move
+        ahead of test cases that would otherwise need a reset first or run with unmet preconditions.
+
+        :param tests: Names or ids of Test cases
+        :type tests: List[str]
+        :return: reordered test cases
+        :rtype: List[str]
+        """
+        remaining = list(tests)
+        ordered = []
+        state = {self.CLEAN_STATE}
+        while remaining:
+            test = min(remaining, key=lambda test: self._get_rank(test, state))
+            remaining.remove(test)
+            ordered.append(test)
+            state = self._simulate_test(test, state)[0]
+        return ordered
+
+    def _simulate_test(self, test, state):
+        """
+        :return: dut conditions after the test case, resets executed before it, AC cycles and resets of the test
+            case itself
+        :rtype: set, int, int, int
+        """
+        reset_pending = self.RESET_PENDING in state
+        resets_before = 0
+        if reset_pending and not self.accepts_reset_pending(test):
+            resets_before, reset_pending, state = 1, False, {self.CLEAN_STATE}
+        ac_cycles = self.get_ac_cycles(test)
+        if ac_cycles:
+            # an AC cycle resets the dut, including a pending reset
+            reset_pending, state = False, {self.CLEAN_STATE}
+        next_state = self._next_state(test, state)
+        resets = 0
+        if self.RESET_PENDING in next_state and not self.defer_resets:
+            resets = 1
+            next_state = next_state - {self.RESET_PENDING} | {self.CLEAN_STATE}
+        elif reset_pending:
+            next_state.add(self.RESET_PENDING)
+        return next_state, resets_before, ac_cycles, resets
+
+    def plan(self, tests):
+        """
+        :param tests: Names or ids of Test cases in run order
+        :type tests: List[str]
+        :return: plan rows (test id, test name, AC cycles, resets, estimated seconds), total AC cycles, total
+            resets, estimated seconds of the run
+        :rtype: List[tuple], int, int, int
+        """
+        rows = []
+        total_ac_cycles = total_resets = 0
+        state = {self.CLEAN_STATE}
+        for test in tests:
+            _, testcase_attributes = self.test_hierarchy.get_testcase_attributes(test)
+            if testcase_attributes is None:
+                continue
+            state, resets_before, ac_cycles, resets = self._simulate_test(test, state)
+            if resets_before:
+                rows.append(("", "Deferred AC reset", 0, resets_before, resets_before * self.reset_duration))
+            seconds = self._get_measured_duration(testcase_attributes.get("test_id"))
+            if seconds is None:
+                seconds = self.DEFAULT_TEST_DURATION + ac_cycles * self.ac_cycle_duration + resets * self.reset_duration
+            rows.append(
+                (testcase_attributes.get("test_id"), testcase_attributes.get("test_name"), ac_cycles, resets, seconds)
+            )
+            total_ac_cycles += ac_cycles
+            total_resets += resets_before + resets
+        if self.RESET_PENDING in state:
+            rows.append(("", "Deferred AC reset", 0, 1, self.reset_duration))
+            total_resets += 1
+        return rows, total_ac_cycles, total_resets, sum(row[4] for row in rows)
+
+    def get_plan_table(self, tests):
+        """
+        :param tests: Names or ids of Test cases in run order
+        :type tests: List[str]
+        :return: table of the planned test cases and the estimated duration of the run
+        :rtype: PrettyTable
+        """
+        rows, total_ac_cycles, total_resets, total_seconds = self.plan(tests)
+        t = PrettyTable(["Test ID", "Test Name", "AC Cycles", "AC Resets", "Estimated Time"])
+        t.title = "Test Schedule"
+        for test_id, test_name, ac_cycles, resets, seconds in rows:
+            t.add_row([test_id, test_name, ac_cycles, resets, timedelta(seconds=seconds)])
+        t.add_row(["", "", "", "", ""], divider=True)
+        t.add_row(["Total", "", total_ac_cycles, total_resets, timedelta(seconds=total_seconds)])
+        t.align["Test Name"] = "l"
+        return t
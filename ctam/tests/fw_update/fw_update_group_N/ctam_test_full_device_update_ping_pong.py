@@ -41,6 +41,7 @@ class CTAMTestFullDeviceUpdatePingPong(TestCase):
     score_weight: int = 10
     tags: List[str] = ["Compliance", "L1"]
     compliance_level: str = "L1"
+    ac_cycles: int = 2
 
     def __init__(self, group: FWUpdateTestGroupN):
         """
@@ -50,6 +50,7 @@ class CTAMTestFullDeviceUpdateWithSelfTest(TestCase):
     score_weight: int = 10
     tags: List[str] = ["L3"]
     compliance_level: str = "L3"
+    ac_cycles: int = 0
 
     def __init__(self, group: FWUpdateTestGroupN):
         """
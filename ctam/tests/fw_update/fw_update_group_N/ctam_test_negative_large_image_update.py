@@ -42,6 +42,10 @@ class CTAMTestNegativeLargeImageUpdate(TestCase):
     score_weight: int = 10
     tags: List[str] = ["Negative", "L2"]
     compliance_level: str = "L2"
+    # nothing is staged, a reset pending from a previous test case does not matter
+    preconditions: List[str] = ["clean_state", "reset_pending"]
+    postconditions: List[str] = ["reset_pending"]
+    ac_cycles: int = 0
 
     def __init__(self, group: FWUpdateTestGroupN):
         """
@@ -44,6 +44,10 @@ class CTAMTestNegativeUnsignedBundleUpdate(TestCase):
     score_weight: int = 10
     tags: List[str] = ["Negative", "L3"]
     compliance_level: str = "L3"
+    # nothing is staged, a reset pending from a previous test case does not matter
+    preconditions: List[str] = ["clean_state", "reset_pending"]
+    postconditions: List[str] = ["reset_pending"]
+    ac_cycles: int = 0
 
     def __init__(self, group: FWUpdateTestGroupN):
         """
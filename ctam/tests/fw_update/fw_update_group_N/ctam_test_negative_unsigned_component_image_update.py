@@ -43,6 +43,8 @@ class CTAMTestNegativeUnsignedImageUpdate(TestCase):
     score_weight: int = 10
     tags: List[str] = ["Negative", "L2"]
     compliance_level: str = "L2"
+    postconditions: List[str] = []
+    ac_cycles: int = 0
 
     def __init__(self, group: FWUpdateTestGroupN):
         """
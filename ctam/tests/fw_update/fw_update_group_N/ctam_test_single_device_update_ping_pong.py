@@ -42,6 +42,7 @@ class CTAMTestSingleDeviceUpdatePingPong(TestCase):
     score_weight: int = 10
     tags: List[str] = ["L3"]
     compliance_level: str = "L3"
+    ac_cycles: int = 2
 
     def __init__(self, group: FWUpdateTestGroupN):
         """
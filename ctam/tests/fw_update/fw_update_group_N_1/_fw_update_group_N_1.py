@@ -21,6 +21,10 @@ class FWUpdateTestGroupNMinus1(TestGroup):
     tags: List[str] = []
     group_id : str = "GFW2"
     domain_name: str = "FWUpdate"
+    resource_profile: str = "power_cycling"
+    preconditions: List[str] = ["clean_state"]
+    postconditions: List[str] = ["clean_state"]
+    ac_cycles: int = 1
     # exclude_tags: List[str] = []
 
     def __init__(self):
@@ -21,6 +21,7 @@ class BasicHealthCheckTestGroup(TestGroup):
     tags: List[str] = []
     group_id : str = "GH1"
     domain_name: str = "HealthCheck"
+    resource_profile: str = "read_only"
     # exclude_tags: List[str] = []
 
     def __init__(self):
@@ -41,6 +41,7 @@ class CTAMTestRedfishEventServiceCreateSubscription(TestCase):
     score_weight: int = 10
     tags: List[str] = ["HCheck"]
     compliance_level: str =""
+    resource_profile: str = "mutating"
 
     # exclude_tags: List[str] = ["NotCheck"]
 
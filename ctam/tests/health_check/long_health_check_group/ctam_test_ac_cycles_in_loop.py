@@ -39,6 +39,10 @@ class CTAMTestAcCyclesInLoop(TestCase):
     score_weight:int = 10
     tags: List[str] = []
     compliance_level: str = ""
+    resource_profile: str = "power_cycling"
+    preconditions: List[str] = []
+    postconditions: List[str] = ["clean_state"]
+    ac_cycles: int = 1
 
     def __init__(self, group: LongHealthCheckTestGroup):
         """
@@ -21,6 +21,7 @@ class BasicTelemetryTestGroup(TestGroup):
     tags: List[str] = []
     group_id : str = "GT1"
     domain_name: str = "Telemetry"
+    resource_profile: str = "read_only"
     # exclude_tags: List[str] = []
 
     def __init__(self):
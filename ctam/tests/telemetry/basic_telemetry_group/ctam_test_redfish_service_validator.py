@@ -41,6 +41,7 @@ class CTAMTestServiceValidator(TestCase):
     score_weight: int = 10
     tags: List[str] = []
     compliance_level: str = ""
+    resource_profile: str = "mutating"  # clones, installs and removes the validator in the working directory
 
     # exclude_tags: List[str] = ["NotCheck"]
 
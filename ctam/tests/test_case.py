@@ -17,6 +17,7 @@ from ocptv.output import (
     TestStatus,
 )
 from interfaces.comptool_dut import CompToolDut
+from utils.run_context import RunContext, get_run_context, set_run_context
 
 
 class TestCase(ABC):
@@ -29,28 +30,32 @@ class TestCase(ABC):
     :raises NotImplementedError: checks for required attributes in the derived test cases
     """
 
-    # use class attributes so they are available to all subclassed TestCase objects
-    _test_run: Optional[tv.TestRun] = None  # OCP TestRun
-    _dut: Optional[CompToolDut]  # dut object
-    total_compliance_score = 0  # accumulative
-    max_compliance_score = 0
-    total_execution_time = 0 # seconds
+    # How the test case affects the dut, one of RESOURCE_PROFILES. None uses the profile of the group,
+    # and "mutating" if the group does not declare one either. Only "read_only" test cases run concurrently.
+    RESOURCE_PROFILES = ("read_only", "mutating", "power_cycling")
+    resource_profile: Optional[str] = None
+
+    # Dut state the test case needs before it runs and leaves behind, e.g. ["clean_state"], and the number of AC
+    # cycles with activation it performs. None uses the declaration of the group. A test case that only AC cycles
+    # the dut to reset it at the end declares the postcondition "reset_pending", the test runner may defer and
+    # merge that reset (see TestScheduler). Only test cases declaring the precondition "reset_pending" or AC
+    # cycling the dut themselves run while such a reset is pending.
+    preconditions: Optional[List[str]] = None
+    postconditions: Optional[List[str]] = None
+    ac_cycles: Optional[int] = None
 
     @staticmethod
     def SetUpAssociations(testrun: tv.TestRun, dut: CompToolDut):
         """
-        These class attributes are available to all subclasses
+        Start a new run context for testrun and dut in the current context. The test runner creates the
+        run context itself, this is kept for callers driving test cases directly.
 
         :param testrun: OCP TestRun
         :type testrun: tv.TestRun
         :param dut: Comp Tool Dut interface
         :type dut: CompToolDut
         """
-        TestCase._test_run = testrun
-        TestCase._dut = dut
-        TestCase.total_compliance_score = 0
-        TestCase.max_compliance_score = 0
-        TestCase.total_execution_time = 0
+        set_run_context(RunContext(testrun, dut))
 
     def __init__(self):
         """
@@ -84,10 +89,7 @@ class TestCase(ABC):
         :return: active test run
         :rtype: tv.TestRun
         """
-        if TestCase._test_run:
-            return TestCase._test_run
-        else:
-            raise NotImplementedError(f"need to call TestCase.SetUpAssociations")
+        return get_run_context("TestCase").test_run
 
     @staticmethod
     def dut() -> CompToolDut:
@@ -98,10 +100,7 @@ class TestCase(ABC):
         :return: active dut
         :rtype: CompToolDut
         """
-        if TestCase._dut:
-            return TestCase._dut
-        else:
-            raise NotImplementedError(f"need to call TestCase.SetUpAssociations")
+        return get_run_context("TestCase").dut
 
     @abstractmethod
     def setup(self):
@@ -129,6 +128,4 @@ class TestCase(ABC):
         """
         step1 = self.test_run().add_step("TestCase.teardown()...")
         with step1.scope():
-            if self.result == TestResult.PASS:
-                TestCase.total_compliance_score += self.score
-            TestCase.max_compliance_score += self.score_weight
+            get_run_context("TestCase").add_test_score(self.result == TestResult.PASS, self.score, self.score_weight)
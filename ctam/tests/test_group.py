@@ -16,6 +16,7 @@ from ocptv.output import (
     TestStatus,
 )
 from interfaces.comptool_dut import CompToolDut
+from utils.run_context import RunContext, get_run_context, set_run_context
 
 
 class TestGroup(ABC):
@@ -28,21 +29,24 @@ class TestGroup(ABC):
     :raises NotImplementedError: checks for required attributes in the derived test groups
     """
 
-    _test_run: Optional[tv.TestRun] = None  # OCP TestRun
-    _dut: Optional[CompToolDut]  # dut object
+    resource_profile: Optional[str] = None  # default TestCase.resource_profile of the test cases in this group
+    # defaults of TestCase.preconditions, TestCase.postconditions and TestCase.ac_cycles of the test cases in this group
+    preconditions: Optional[List[str]] = None
+    postconditions: Optional[List[str]] = None
+    ac_cycles: Optional[int] = None
 
     @staticmethod
     def SetUpAssociations(testrun: tv.TestRun, dut: CompToolDut):
         """
-        These class attributes are available to all subclasses
+        Start a new run context for testrun and dut in the current context. The test runner creates the
+        run context itself, this is kept for callers driving test groups directly.
 
         :param testrun: OCP TestRun
         :type testrun: tv.TestRun
         :param dut: Comp Tool Dut interface
         :type dut: CompToolDut
         """
-        TestGroup._test_run = testrun
-        TestGroup._dut = dut
+        set_run_context(RunContext(testrun, dut))
 
     def __init__(self):
         """
@@ -73,10 +77,7 @@ class TestGroup(ABC):
         :return: active test run
         :rtype: tv.TestRun
         """
-        if TestGroup._test_run:
-            return TestGroup._test_run
-        else:
-            raise NotImplementedError(f"need to call TestGroup.SetUpAssociations")
+        return get_run_context("TestGroup").test_run
 
     @staticmethod
     def dut() -> CompToolDut:
@@ -87,10 +88,7 @@ class TestGroup(ABC):
         :return: active dut
         :rtype: CompToolDut
         """
-        if TestGroup._dut:
-            return TestGroup._dut
-        else:
-            raise NotImplementedError(f"need to call TestGroup.SetUpAssociations")
+        return get_run_context("TestGroup").dut
 
     @abstractmethod
     def setup(self):
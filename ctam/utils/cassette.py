@@ -0,0 +1,218 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Record and replay of the Redfish exchanges of a test run (cassettes).
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class Cassette:
+    """
+    Redfish exchanges (method, URI, request body hash, status, response headers and body, latency) of CompToolDut,
+    recorded to a cassette file and served from it again in replay mode, so test logic can be re-run and the
+    overhead of CTAM itself profiled against the captured behaviour of a DUT, without the DUT.
+
+    The file starts with MAGIC, followed by one record per exchange: the length of the record header (4 bytes,
+    big endian), the record header (json) and the response body, zlib compressed when that makes it smaller.
+
+    In replay mode the file is memory mapped. Only the record headers are read when the cassette is opened, a
+    response body is read from the mapping when its exchange is replayed. Exchanges with the same method, URI and
+    request body are replayed in recording order, e.g. the polls of a task, the last one is repeated once all
+    were replayed. Exchanges missing in the cassette get a 404 response. Replayed responses are delayed by their
+    recorded latency divided by speed (0 for no delay).
+    """
+
+    MAGIC = b"CTAMCAS1"
+    HEADER_LENGTH = struct.Struct(">I")
+    COMPRESS_MIN_BYTES = 256
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, cassette_file, mode, speed=1.0):
+        """
+        :param cassette_file: cassette file, created (or appended to) in record mode
+        :type cassette_file: str
+        :param mode: Cassette.RECORD or Cassette.REPLAY
+        :type mode: str
+        :param speed: replay speed, e.g. 100 replays 100 times faster than recorded, 0 without delay, defaults to 1.0
+        :type speed: float, optional
+        :raises Exception: unknown mode, or the file to replay is missing or not a cassette
+        """
+        self.cassette_file = cassette_file
+        self.mode = mode
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.index = {}  # (method, uri, request hash): [record header]
+        self.cursors = {}  # (method, uri, request hash): number of replayed records
+        self.missing = 0
+        self._file = None
+        self._mmap = None
+        if mode == self.RECORD:
+            new_file = not os.path.exists(cassette_file) or os.path.getsize(cassette_file) == 0
+            self._file = open(cassette_file, "ab")
+            if new_file:
+                self._file.write(self.MAGIC)
+                self._file.flush()
+        elif mode == self.REPLAY:
+            if not os.path.isfile(cassette_file):
+                raise Exception(f"Cassette {cassette_file} not found")
+            self._file = open(cassette_file, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mmap[: len(self.MAGIC)] != self.MAGIC:
+                raise Exception(f"{cassette_file} is not a cassette")
+            self._load_index()
+        else:
+            raise Exception(f"Unknown cassette mode {mode}, expected {self.RECORD} or {self.REPLAY}")
+
+    @property
+    def replaying(self):
+        return self.mode == self.REPLAY
+
+    @property
+    def recording(self):
+        return self.mode == self.RECORD
+
+    @staticmethod
+    def request_hash(body=None, files=None):
+        """
+        :param body: request body, bytes, str or json serializable data
+        :param files: files of a multipart request, see requests.post
+        :return: hash identifying the request body, "" without body. Open files in the body are identified by name.
+        :rtype: str
+        """
+        if body in (None, "", b"", {}) and not files:
+            return ""
+        if isinstance(body, (bytes, bytearray)):
+            data = bytes(body)
+        elif isinstance(body, str):
+            data = body.encode()
+        else:
+            data = json.dumps(body, sort_keys=True, default=lambda value: getattr(value, "name", repr(value))).encode()
+        if files:
+            data += json.dumps(files, default=lambda value: getattr(value, "name", repr(value))).encode()
+        return hashlib.sha256(data).hexdigest()[:16]
+
+    def _load_index(self):
+        position = len(self.MAGIC)
+        size = len(self._mmap)
+        while position + self.HEADER_LENGTH.size <= size:
+            (header_length,) = self.HEADER_LENGTH.unpack_from(self._mmap, position)
+            position += self.HEADER_LENGTH.size
+            if position + header_length > size:
+                break  # partial record of an interrupted recording
+            header = json.loads(self._mmap[position : position + header_length])
+            position += header_length
+            if position + header["length"] > size:
+                break
+            header["offset"] = position
+            position += header["length"]
+            key = (header["method"], header["uri"], header["request_hash"])
+            self.index.setdefault(key, []).append(header)
+
+    def record(self, method, uri, request_hash, status, headers, body, latency):
+        """
+        :param method: HTTP method
+        :type method: str
+        :param uri: request URI
+        :type uri: str
+        :param request_hash: see request_hash
+        :type request_hash: str
+        :param status: response status code
+        :type status: int
+        :param headers: response headers
+        :type headers: dict
+        :param body: response body
+        :type body: bytes
+        :param latency: response time in seconds
+        :type latency: float
+        """
+        body = body or b""
+        if isinstance(body, str):
+            body = body.encode()
+        compressed = zlib.compress(body) if len(body) >= self.COMPRESS_MIN_BYTES else body
+        use_zlib = len(compressed) < len(body)
+        if use_zlib:
+            body = compressed
+        header = json.dumps(
+            {
+                "method": method,
+                "uri": uri,
+                "request_hash": request_hash,
+                "status": status,
+                "headers": dict(headers or {}),
+                "latency": round(latency or 0, 6),
+                "length": len(body),
+                "zlib": use_zlib,
+            },
+            separators=(",", ":"),
+        ).encode()
+        with self.lock:
+            self._file.write(self.HEADER_LENGTH.pack(len(header)) + header + body)
+            self._file.flush()
+
+    def replay(self, method, uri, request_hash):
+        """
+        :param method: HTTP method
+        :type method: str
+        :param uri: request URI
+        :type uri: str
+        :param request_hash: see request_hash
+        :type request_hash: str
+        :return: recorded response, after its scaled latency
+        :rtype: requests.Response
+        """
+        key = (method, uri, request_hash)
+        with self.lock:
+            records = self.index.get(key)
+            if not records:
+                self.missing += 1
+                header = None
+            else:
+                replayed = self.cursors.get(key, 0)
+                header = records[min(replayed, len(records) - 1)]
+                self.cursors[key] = replayed + 1
+        if header is None:
+            error = {"error": {"code": "Cassette.NotRecorded", "message": f"{method} {uri} is not in the cassette"}}
+            return self._response(uri, 404, {"Content-Type": "application/json"}, json.dumps(error).encode())
+
+        body = self._mmap[header["offset"] : header["offset"] + header["length"]]
+        if header["zlib"]:
+            body = zlib.decompress(body)
+        if self.speed:
+            time.sleep(header["latency"] / self.speed)
+        return self._response(uri, header["status"], header["headers"], body)
+
+    @staticmethod
+    def _response(uri, status, headers, body):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = "utf-8"
+        response.url = uri
+        return response
+
+    def close(self):
+        with self.lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,129 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Append only checkpoint of a test run, used to resume an interrupted run.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import json
+import os
+from datetime import datetime
+
+
+class RunCheckpoint:
+    """
+    Records the test selection of a run and the result of every finished test case in a JSON lines file in the
+    output directory of the run. Every record is flushed to disk when it is written, so the file survives a killed
+    process or a host reboot. A truncated last line (the process died while writing it) is ignored when loading.
+
+    Record types:
+        - "run":     test selection of the run and the shard it runs, written when the run starts
+        - "resume":  the run was resumed
+        - "test":    result of a finished test case
+    """
+
+    FILE_NAME = "Checkpoint.jsonl"
+
+    def __init__(self, run_dir):
+        """
+        :param run_dir: output directory of the run
+        :type run_dir: str
+        """
+        self.checkpoint_file = os.path.join(run_dir, self.FILE_NAME)
+        self.selection = None
+        self.shard = None
+        self.test_results = []
+        if os.path.isfile(self.checkpoint_file):
+            self._load()
+
+    def _load(self):
+        with open(self.checkpoint_file) as f:
+            content = f.read()
+        lines = content.splitlines()
+        complete = content.endswith("\n") or not content
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if line_number != len(lines):
+                    raise Exception(f"Corrupt record in line {line_number} of {self.checkpoint_file}")
+                print(f"[WARNING]: Ignoring incomplete last record of {self.checkpoint_file}")
+                lines.pop()
+                complete = False
+                break
+            if record["record"] == "run":
+                self.selection = record["selection"]
+                self.shard = record.get("shard")
+            elif record["record"] == "test":
+                self.test_results.append(record)
+        if not complete:
+            # rewrite without the incomplete record, so records appended on resume start on a new line
+            with open(self.checkpoint_file, "w") as f:
+                f.write("".join(line + "\n" for line in lines))
+
+    @property
+    def exists(self):
+        """
+        :return: True if a run was checkpointed in the run directory
+        :rtype: bool
+        """
+        return self.selection is not None
+
+    def get_completed_test_ids(self):
+        """
+        :return: test ids of the test cases with a recorded result
+        :rtype: set
+        """
+        return {record["test_id"] for record in self.test_results}
+
+    def _append(self, record):
+        record["timestamp"] = datetime.now().strftime("%m-%d-%YT%H:%M:%S")
+        with open(self.checkpoint_file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start_run(self, selection, version, shard=None):
+        """
+        :param selection: TestRunner test selection attributes, e.g. {"test_sequence": ["H4", "H5"]}
+        :type selection: dict
+        :param version: ctam version
+        :type version: str
+        :param shard: {"index": int, "count": int, "tests": test selection of all shards, "plan": hash of the
+            distribution of the tests over the shards}, defaults to None
+        :type shard: dict, optional
+        """
+        self.selection = selection
+        self.shard = shard
+        self._append({"record": "run", "version": version, "selection": selection, "shard": shard})
+
+    def resume_run(self, version):
+        """
+        :param version: ctam version
+        :type version: str
+        """
+        self._append({"record": "resume", "version": version})
+
+    def add_test_result(self, test_instance):
+        """
+        :param test_instance: test case after teardown
+        :type test_instance: TestCase
+        """
+        record = {
+            "record": "test",
+            "test_id": test_instance.test_id,
+            "test_name": test_instance.test_name,
+            "compliance_level": getattr(test_instance, "compliance_level", ""),
+            "run_time": test_instance.run_time,
+            "execution_time": test_instance.execution_time.total_seconds(),
+            "score_weight": test_instance.score_weight,
+            "score": test_instance.score,
+            "result": test_instance.result.name,
+        }
+        self.test_results.append(record)
+        self._append(record)
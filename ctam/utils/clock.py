@@ -0,0 +1,140 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Clock the waits of a test run go through, with the idle time of every test case by reason.
+                     The virtual clock lets waits take no wall time, e.g. when replaying a cassette.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import threading
+import time
+
+from prettytable import PrettyTable
+
+
+class Clock:
+    """
+    Wall clock. Every wait is accounted to the test case it ran in and its reason, e.g. "PowerOnWaitTime".
+    """
+
+    REAL = "real"
+    VIRTUAL = "virtual"
+    EMULATOR = "emulator"  # virtual, and the clock of the Redfish emulator is advanced with it
+    MODES = (REAL, VIRTUAL, EMULATOR)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = {}  # (test_id, reason): [waits, seconds]
+
+    def time(self):
+        """
+        :return: seconds since the epoch, use it to measure durations that include waits
+        :rtype: float
+        """
+        return time.time()
+
+    def _wait(self, seconds, event=None):
+        """
+        :return: seconds waited, less than seconds if event was set meanwhile
+        :rtype: float
+        """
+        if event is None:
+            time.sleep(seconds)
+            return seconds
+        start = time.time()
+        event.wait(seconds)
+        return time.time() - start
+
+    def sleep(self, seconds, reason, test_id=None, until=None, poll_interval=1):
+        """
+        :param seconds: seconds to wait, None to wait until until is met
+        :type seconds: float
+        :param reason: reason of the wait, e.g. "Task poll"
+        :type reason: str
+        :param test_id: test case the wait belongs to, defaults to None (outside of test cases)
+        :type test_id: str, optional
+        :param until: ends the wait early once it is set (threading.Event) or returns True (callable, e.g. polling
+            a task), checked before the wait and then every poll_interval seconds, defaults to None
+        :type until: threading.Event or callable, optional
+        :param poll_interval: seconds between the checks of until, defaults to 1
+        :type poll_interval: float, optional
+        :return: True if until ended the wait early
+        :rtype: bool
+        """
+        if until is None:
+            seconds = max(seconds, 0)
+            self._wait(seconds)
+            ended_early = False
+        else:
+            event = until if isinstance(until, threading.Event) else None
+            is_met = until.is_set if event else until
+            deadline = None if seconds is None else self.time() + seconds
+            seconds = 0
+            while True:
+                ended_early = bool(is_met())
+                remaining = None if deadline is None else deadline - self.time()
+                if ended_early or (remaining is not None and remaining <= 0):
+                    break
+                seconds += self._wait(poll_interval if remaining is None else min(poll_interval, remaining), event)
+        if not seconds and ended_early:
+            return True  # met without waiting
+        key = (test_id, reason)
+        with self.lock:
+            waits, total = self.idle.get(key, (0, 0))
+            self.idle[key] = [waits + 1, total + seconds]
+        return ended_early
+
+    def get_idle_rows(self):
+        """
+        :return: (test_id, reason, waits, seconds) of every test case and reason, by test case and longest first
+        :rtype: List[tuple]
+        """
+        with self.lock:
+            rows = [(test_id, reason, waits, seconds) for (test_id, reason), (waits, seconds) in self.idle.items()]
+        return sorted(rows, key=lambda row: (row[0] or "", -row[3]))
+
+    def get_table(self):
+        """
+        :return: table of the idle time of every test case by reason
+        :rtype: PrettyTable
+        """
+        table = PrettyTable()
+        table.title = "Idle Time" + ("" if type(self) is Clock else " (virtual)")
+        table.field_names = ["Test ID", "Reason", "Waits", "Seconds"]
+        table.align["Reason"] = "l"
+        for test_id, reason, waits, seconds in self.get_idle_rows():
+            table.add_row([test_id or "-", reason, waits, round(seconds, 3)])
+        return table
+
+
+class VirtualClock(Clock):
+    """
+    Clock whose waits advance the time instantly instead of sleeping. Starts at the current wall time.
+
+    The time of the clock is shared by all test cases of the run, like the clock of the emulator it advances, so
+    concurrent test cases would advance each other's time. The test runner runs the test cases one at a time with
+    a virtual clock, whatever max_concurrent_tests is set to.
+    """
+
+    def __init__(self, on_advance=None):
+        """
+        :param on_advance: called with the seconds of every wait, e.g. to advance the clock of an emulator,
+            defaults to None
+        :type on_advance: callable, optional
+        """
+        super().__init__()
+        self.offset = 0
+        self.on_advance = on_advance
+
+    def time(self):
+        return time.time() + self.offset
+
+    def _wait(self, seconds, event=None):
+        with self.lock:
+            self.offset += seconds
+        if self.on_advance:
+            self.on_advance(seconds)
+        return seconds
@@ -0,0 +1,97 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Test case durations of previous test runs, read from their result stores or TestScore logs.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import glob
+import json
+import os
+
+from utils.result_store import ResultStore, read_results, sqlite3
+
+
+class DurationHistory:
+    """
+    Average execution time of every test case over the runs found below a directory, e.g. the TestRuns directory
+    of a workspace. The durations of a run are read from its result store (Results.db), or from its TestScore_*.json
+    logs for runs without one. Test cases without history have no duration.
+
+    A test case counts once per run directory, since a resumed run logs the restored results again. Directories of
+    merged shard results (Merged_*) are skipped, their results are already counted in the shard directories.
+    """
+
+    def __init__(self, runs_dir):
+        """
+        :param runs_dir: directory searched recursively for result stores and TestScore logs
+        :type runs_dir: str
+        """
+        self.runs_dir = runs_dir
+        run_durations = {}
+        if sqlite3 is not None:
+            for db_file in sorted(glob.glob(os.path.join(runs_dir, "**", ResultStore.FILE_NAME), recursive=True)):
+                run_durations[os.path.dirname(db_file)] = self._read_result_store(db_file)
+        store_dirs = set(run_durations)
+        for score_file in sorted(glob.glob(os.path.join(runs_dir, "**", "TestScore_*.json"), recursive=True)):
+            run_dir = os.path.dirname(score_file)
+            if os.path.basename(run_dir).startswith("Merged_") or run_dir in store_dirs:
+                continue
+            for record in self._read_score_file(score_file):
+                test_id = record.get("TestID")
+                execution_time = record.get("ExecutionTime", "")
+                if test_id and execution_time.endswith(" seconds"):
+                    run_durations.setdefault(run_dir, {})[test_id] = float(execution_time.split()[0])
+
+        totals = {}
+        for durations in run_durations.values():
+            for test_id, seconds in durations.items():
+                total, count = totals.get(test_id, (0, 0))
+                totals[test_id] = (total + seconds, count + 1)
+        self.durations = {test_id: total / count for test_id, (total, count) in totals.items()}
+
+    @staticmethod
+    def _read_result_store(db_file):
+        """
+        :param db_file: result store of a run
+        :type db_file: str
+        :return: {test_id: run time in seconds}, empty for merged runs or if the database can not be read
+        :rtype: dict
+        """
+        try:
+            kind, tests, _ = read_results(db_file)
+        except sqlite3.Error:
+            return {}
+        if kind == "merged":
+            return {}
+        return {test_id: test["run_time"] for test_id, test in tests.items() if test["run_time"] is not None}
+
+    @staticmethod
+    def _read_score_file(score_file):
+        """
+        :param score_file: TestScore log, json records separated by "," as written by LoggingWriter
+        :type score_file: str
+        :return: records of the log, empty if the log can not be parsed (e.g. the run was killed while writing)
+        :rtype: List[dict]
+        """
+        with open(score_file) as f:
+            content = f.read().strip().rstrip(",")
+        try:
+            return json.loads(f"[{content}]")
+        except json.JSONDecodeError:
+            return []
+
+    def get(self, test_id):
+        """
+        :param test_id: test id
+        :type test_id: str
+        :return: average execution time of the test case in seconds, None without history
+        :rtype: float
+        """
+        return self.durations.get(test_id)
+
+    def __len__(self):
+        return len(self.durations)
@@ -0,0 +1,83 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Event bus the test runner publishes the progress of a test run to.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import threading
+import time
+
+
+class EventBus:
+    """
+    Publish/subscribe of test run events. Subscribers are called synchronously in the thread that publishes
+    the event, so subscribers of events published by concurrently running test cases must be thread safe.
+    A subscriber that raises is unsubscribed, it can not break the test run.
+
+    Every event is a dict with the event type ("event"), the publish time ("timestamp", seconds since the epoch)
+    and the data of the event type:
+
+        - run_started:    output_dir, planned (test_id, test_name, estimate in seconds of every test to run),
+                          restored (number of tests restored from a checkpoint)
+        - test_started:   test_id, test_name
+        - test_skipped:   test_id, test_name, reason
+        - step:           test_id, artifact (OCPTV testStepArtifact of a step start, end, log etc.)
+        - redfish_call:   test_id, method, uri, status, latency (seconds), bytes, bytes_sent
+        - operation:      test_id, name, category ("sleep" or "power"), duration (seconds), attributes,
+                          published when an operation traced with utils.tracing.trace_span finished
+        - test_finished:  test_id, test_name, result, run_time, test (the test case)
+        - run_finished:   status_code, exit_string
+    """
+
+    RUN_STARTED = "run_started"
+    TEST_STARTED = "test_started"
+    TEST_SKIPPED = "test_skipped"
+    STEP = "step"
+    REDFISH_CALL = "redfish_call"
+    OPERATION = "operation"
+    TEST_FINISHED = "test_finished"
+    RUN_FINISHED = "run_finished"
+
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback, event_types=None):
+        """
+        :param callback: called with every published event of event_types
+        :type callback: callable
+        :param event_types: event types to receive, defaults to None (all)
+        :type event_types: List[str], optional
+        """
+        with self.lock:
+            self.subscribers.append((callback, set(event_types) if event_types else None))
+
+    def unsubscribe(self, callback):
+        """
+        :param callback: subscribed callback
+        :type callback: callable
+        """
+        with self.lock:
+            self.subscribers = [subscriber for subscriber in self.subscribers if subscriber[0] != callback]
+
+    def publish(self, event_type, **data):
+        """
+        :param event_type: type of the event, e.g. EventBus.TEST_STARTED
+        :type event_type: str
+        :param data: data of the event
+        """
+        event = dict(data, event=event_type, timestamp=time.time())
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback, event_types in subscribers:
+            if event_types is not None and event_type not in event_types:
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"[WARNING]: Event subscriber {callback} failed on {event_type} and is unsubscribed: {e!r}")
+                self.unsubscribe(callback)
@@ -0,0 +1,195 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Logging policy for Redfish response bodies written to the RedfishCommandDetails logs.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import copy
+import hashlib
+import json
+import re
+
+
+class ResponseLogPolicy:
+    """
+    Decides how much of a Redfish response body goes into the command log.
+
+    Supported modes:
+        - "full":   log every body as is (previous behaviour)
+        - "dedup":  a body identical to one already logged is replaced by a reference to the earlier entry
+        - "diff":   like "dedup", and a changed body for an already seen URI is logged as a field level
+                    diff against the previous response of that URI
+
+    Independently of the mode, bodies larger than max_body_bytes (0 = unlimited) are truncated.
+    Settings can be overridden per URI with regular expressions in uri_overrides.
+    """
+
+    MODES = ("full", "dedup", "diff")
+
+    def __init__(self, mode="full", max_body_bytes=0, uri_overrides=None):
+        """
+        :param mode: default logging mode, one of MODES
+        :type mode: str
+        :param max_body_bytes: default maximum size of a logged body in bytes, 0 for unlimited
+        :type max_body_bytes: int
+        :param uri_overrides: {uri regex: {"mode": str, "max_body_bytes": int}}, first match wins
+        :type uri_overrides: dict, optional
+        """
+        self.mode = self._check_mode(mode)
+        self.max_body_bytes = max_body_bytes
+        self.uri_overrides = []
+        for pattern, settings in (uri_overrides or {}).items():
+            self.uri_overrides.append(
+                (
+                    re.compile(pattern),
+                    self._check_mode(settings.get("mode", mode)),
+                    settings.get("max_body_bytes", max_body_bytes),
+                )
+            )
+        self._uri_settings = {}
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build the policy from the "response_log_policy" section of test_runner.json
+
+        :param config: policy section, None or empty for the default "full" policy
+        :type config: dict
+        :return: policy
+        :rtype: ResponseLogPolicy
+        """
+        config = config or {}
+        return cls(
+            mode=config.get("mode", "full"),
+            max_body_bytes=config.get("max_body_bytes", 0),
+            uri_overrides=config.get("uri_overrides", {}),
+        )
+
+    @classmethod
+    def _check_mode(cls, mode):
+        if mode not in cls.MODES:
+            raise Exception(f"Invalid response_log_policy mode '{mode}'. Supported modes are {cls.MODES}")
+        return mode
+
+    def reset(self):
+        """
+        Forget previously logged bodies. Called whenever the command log file changes so that references
+        never point into another file.
+        """
+        self._seen = {}  # body hash -> {"FirstLoggedAt": ..., "FirstURI": ...} of the entry that logged it in full
+        self._last = {}  # uri -> (body hash, flattened body) of the last response for that uri
+
+    def copy(self):
+        """
+        Same settings without any logged bodies, for a command log file written alongside the current one
+
+        :return: policy
+        :rtype: ResponseLogPolicy
+        """
+        policy = copy.copy(self)
+        policy.reset()
+        return policy
+
+    def settings_for(self, uri):
+        """
+        :return: (mode, max_body_bytes) applicable to the uri
+        :rtype: tuple
+        """
+        settings = self._uri_settings.get(uri)
+        if settings is None:
+            settings = (self.mode, self.max_body_bytes)
+            for pattern, mode, max_body_bytes in self.uri_overrides:
+                if pattern.search(uri):
+                    settings = (mode, max_body_bytes)
+                    break
+            self._uri_settings[uri] = settings
+        return settings
+
+    def render(self, uri, body, timestamp=""):
+        """
+        Build the response fields of a command log entry. Only bodies logged in full, neither as diff nor
+        truncated, are referenced by later identical bodies.
+
+        :param uri: uri of the request
+        :type uri: str
+        :param body: decoded response body
+        :type body: dict or list
+        :param timestamp: TimeStamp of the log entry, referenced as FirstLoggedAt, defaults to ""
+        :type timestamp: str, optional
+        :return: fields to be merged into the log message
+        :rtype: dict
+        """
+        mode, max_body_bytes = self.settings_for(uri)
+        if mode == "full" and not max_body_bytes:
+            return {"Response": body}
+
+        serialized = json.dumps(body, sort_keys=True, separators=(",", ":"))
+        body_hash = hashlib.blake2b(serialized.encode(), digest_size=8).hexdigest()
+        fields = {"ResponseHash": body_hash}
+
+        if mode != "full":
+            previous = self._last.get(uri)
+            flat_body = self._flatten(body) if mode == "diff" else None
+            self._last[uri] = (body_hash, flat_body)
+
+            if body_hash in self._seen:
+                fields["Response"] = {"SameAs": body_hash, **self._seen[body_hash]}
+                return fields
+
+            if previous and previous[1] is not None:
+                diff = self._diff(previous[1], flat_body)
+                diff_size = len(json.dumps(diff, default=str))
+                if diff_size < len(serialized) and (not max_body_bytes or diff_size <= max_body_bytes):
+                    fields["Response"] = {"DiffFrom": previous[0], **diff}
+                    return fields
+
+        if max_body_bytes and len(serialized) > max_body_bytes:
+            fields["Response"] = {
+                "Truncated": True,
+                "Size": len(serialized),
+                "Head": serialized[:max_body_bytes],
+            }
+        else:
+            fields["Response"] = body
+            if mode != "full":
+                self._seen[body_hash] = {"FirstLoggedAt": timestamp, "FirstURI": uri}
+        return fields
+
+    @classmethod
+    def _flatten(cls, data, prefix="", flat=None):
+        """
+        Flatten nested dicts/lists into {"a.b[0].c": value}
+        """
+        if flat is None:
+            flat = {}
+        if isinstance(data, dict) and data:
+            for key, value in data.items():
+                cls._flatten(value, f"{prefix}.{key}" if prefix else str(key), flat)
+        elif isinstance(data, list) and data:
+            for index, value in enumerate(data):
+                cls._flatten(value, f"{prefix}[{index}]", flat)
+        else:
+            flat[prefix] = data
+        return flat
+
+    @staticmethod
+    def _diff(old, new):
+        """
+        Field level difference between two flattened bodies
+        """
+        diff = {}
+        changed = {k: [old[k], v] for k, v in new.items() if k in old and old[k] != v}
+        added = {k: v for k, v in new.items() if k not in old}
+        removed = [k for k in old if k not in new]
+        if changed:
+            diff["Changed"] = changed
+        if added:
+            diff["Added"] = added
+        if removed:
+            diff["Removed"] = removed
+        return diff
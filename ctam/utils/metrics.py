@@ -0,0 +1,279 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Latency histograms and counters of the Redfish calls of a test run, per endpoint.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import json
+import math
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+from prettytable import PrettyTable
+
+
+class LatencyHistogram:
+    """
+    HDR style histogram of latencies in microseconds. Values are counted in buckets whose width grows with the value,
+    so every recorded value is known to SIGNIFICANT_DIGITS significant digits, with a bounded number of buckets for
+    any latency from microseconds to hours. Only used buckets are stored.
+
+    A value v is counted in bucket (exponent, mantissa), with exponent = max(bits(v) - SUB_BUCKET_BITS, 0) and
+    mantissa = v >> exponent, i.e. the SUB_BUCKET_BITS most significant bits of v.
+    """
+
+    SIGNIFICANT_DIGITS = 2
+    SUB_BUCKET_BITS = math.ceil(math.log2(2 * 10**SIGNIFICANT_DIGITS))
+
+    def __init__(self):
+        self.counts = {}  # bucket key: count
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _get_key(self, value):
+        exponent = max(value.bit_length() - self.SUB_BUCKET_BITS, 0)
+        return (exponent << self.SUB_BUCKET_BITS) | (value >> exponent)
+
+    def _get_highest_value(self, key):
+        exponent = key >> self.SUB_BUCKET_BITS
+        mantissa = key & ((1 << self.SUB_BUCKET_BITS) - 1)
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, seconds):
+        """
+        :param seconds: latency in seconds
+        :type seconds: float
+        """
+        value = max(int(round(seconds * 1_000_000)), 0)
+        key = self._get_key(value)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """
+        :param other: histogram to add to this one
+        :type other: LatencyHistogram
+        """
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def get_percentile(self, percentile):
+        """
+        :param percentile: percentile, e.g. 99
+        :type percentile: float
+        :return: latency in microseconds that percentile of the values are at or below (upper bound of its bucket),
+            0 without values
+        :rtype: int
+        """
+        if not self.count:
+            return 0
+        target = max(math.ceil(percentile / 100 * self.count), 1)
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= target:
+                return min(self._get_highest_value(key), self.max)
+        return self.max
+
+    def get_mean(self):
+        """
+        :return: mean latency in microseconds, 0 without values
+        :rtype: float
+        """
+        return self.total / self.count if self.count else 0
+
+    def get_buckets(self):
+        """
+        :return: (upper bound in microseconds, count) of the used buckets, ascending
+        :rtype: List[tuple]
+        """
+        return [(self._get_highest_value(key), self.counts[key]) for key in sorted(self.counts)]
+
+
+class EndpointMetrics:
+    """
+    Latency histogram and counters of the calls of one endpoint (method, URI template, status class)
+    """
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self.timeouts = 0
+
+
+class MetricsRegistry:
+    """
+    Metrics of the Redfish calls of a test run, by endpoint: the method, the URI template (URI without ids, see
+    get_uri_template) and the status class ("2xx", "4xx", ..., "error" for calls without response).
+    Thread safe, calls of concurrently running test cases are recorded into the same registry.
+    """
+
+    PERCENTILES = (50, 95, 99)
+    # path segments with digits are ids, e.g. GPU_SXM_1 or task 12, except versions like v1
+    ID_SEGMENT = re.compile(r"^(?!v\d+$).*\d")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}  # (method, uri template, status class): EndpointMetrics
+
+    @classmethod
+    def get_uri_template(cls, uri):
+        """
+        :param uri: requested URI, e.g. /redfish/v1/Systems/HGX_Baseboard_0/Processors/GPU_SXM_1?$expand=.
+        :type uri: str
+        :return: URI with ids replaced by {id} and the query reduced to its parameter names,
+            e.g. /redfish/v1/Systems/{id}/Processors/{id}?$expand
+        :rtype: str
+        """
+        parts = urlsplit(uri)
+        template = "/".join("{id}" if cls.ID_SEGMENT.match(segment) else segment for segment in parts.path.split("/"))
+        if parts.query:
+            template += "?" + "&".join(sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)}))
+        return template
+
+    @staticmethod
+    def get_status_class(status):
+        """
+        :param status: HTTP status, None if the call got no response
+        :type status: int
+        :return: e.g. "2xx", "error" without status
+        :rtype: str
+        """
+        return f"{status // 100}xx" if status else "error"
+
+    @staticmethod
+    def get_request_size(body, files=None):
+        """
+        :param body: request body, dict, str or bytes
+        :param files: files of a multipart request, dict or list of (name, file) tuples, see requests.post
+        :type files: dict, optional
+        :return: bytes sent in the request body, as far as they are known before sending
+        :rtype: int
+        """
+        if body is None:
+            size = 0
+        elif isinstance(body, (bytes, bytearray)):
+            size = len(body)
+        elif isinstance(body, str):
+            size = len(body.encode())
+        else:
+            size = len(json.dumps(body, default=str).encode())
+        for file in files.values() if isinstance(files, dict) else [file for _, file in files or []]:
+            content = file[1] if isinstance(file, tuple) else file
+            if isinstance(content, (bytes, bytearray)):
+                size += len(content)
+            elif hasattr(content, "fileno"):
+                size += os.fstat(content.fileno()).st_size
+        return size
+
+    def record(self, method, uri, status, latency, bytes_in=0, bytes_out=0, retries=0, timeouts=0):
+        """
+        :param method: HTTP method
+        :type method: str
+        :param uri: requested URI
+        :type uri: str
+        :param status: HTTP status, None if the call got no response
+        :type status: int
+        :param latency: response time in seconds
+        :type latency: float
+        :param bytes_in: bytes of the response body, defaults to 0
+        :type bytes_in: int, optional
+        :param bytes_out: bytes of the request body, defaults to 0
+        :type bytes_out: int, optional
+        :param retries: requests sent again after a failed attempt, defaults to 0
+        :type retries: int, optional
+        :param timeouts: attempts that timed out, defaults to 0
+        :type timeouts: int, optional
+        """
+        key = (method, self.get_uri_template(uri), self.get_status_class(status))
+        with self.lock:
+            endpoint = self.endpoints.get(key)
+            if endpoint is None:
+                endpoint = self.endpoints[key] = EndpointMetrics()
+            endpoint.latency.record(latency or 0)
+            endpoint.bytes_in += bytes_in
+            endpoint.bytes_out += bytes_out
+            endpoint.retries += retries
+            endpoint.timeouts += timeouts
+
+    def get_endpoint_rows(self):
+        """
+        :return: one dict per endpoint with its call count, latencies in ms (min, mean, percentiles, max), bytes,
+            retries, timeouts and histogram buckets, slowest p99 first
+        :rtype: List[dict]
+        """
+        rows = []
+        with self.lock:
+            for (method, uri, status_class), endpoint in self.endpoints.items():
+                latency = endpoint.latency
+                row = {"method": method, "uri": uri, "status": status_class, "calls": latency.count}
+                row["min_ms"] = latency.min / 1000
+                row["mean_ms"] = round(latency.get_mean() / 1000, 3)
+                for percentile in self.PERCENTILES:
+                    row[f"p{percentile}_ms"] = latency.get_percentile(percentile) / 1000
+                row["max_ms"] = latency.max / 1000
+                row.update(
+                    bytes_in=endpoint.bytes_in,
+                    bytes_out=endpoint.bytes_out,
+                    retries=endpoint.retries,
+                    timeouts=endpoint.timeouts,
+                    histogram_us=latency.get_buckets(),
+                )
+                rows.append(row)
+        return sorted(rows, key=lambda row: (-row["p99_ms"], row["uri"], row["method"]))
+
+    def get_table(self):
+        """
+        :return: table of the endpoints with their percentiles, slowest p99 first
+        :rtype: PrettyTable
+        """
+        table = PrettyTable()
+        table.title = "Redfish Endpoint Latency"
+        columns = {
+            "Method": "method",
+            "URI": "uri",
+            "Status": "status",
+            "Calls": "calls",
+            "p50 ms": "p50_ms",
+            "p95 ms": "p95_ms",
+            "p99 ms": "p99_ms",
+            "Max ms": "max_ms",
+            "Bytes In": "bytes_in",
+            "Bytes Out": "bytes_out",
+            "Retries": "retries",
+            "Timeouts": "timeouts",
+        }
+        table.field_names = list(columns)
+        table.align["URI"] = "l"
+        for row in self.get_endpoint_rows():
+            table.add_row([row[key] for key in columns.values()])
+        return table
+
+    def write_report(self, report_file, version=""):
+        """
+        :param report_file: json file to write the endpoint metrics to
+        :type report_file: str
+        :param version: ctam version, defaults to ""
+        :type version: str, optional
+        """
+        with open(report_file, "w") as f:
+            json.dump({"version": version, "endpoints": self.get_endpoint_rows()}, f, indent=4)
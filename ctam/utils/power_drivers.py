@@ -0,0 +1,354 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Power control of a DUT for AC resets: shell commands (e.g. of a PDU), the Reset action of a Redfish
+                     ComputerSystem or Chassis, or IPMI over LAN with a local ipmitool. Power changes are confirmed by
+                     polling the power state instead of waiting fixed times.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import abc
+import contextlib
+import importlib
+import os
+import re
+import shlex
+import subprocess
+import tempfile
+import threading
+import time
+
+from utils.tracing import trace_span
+
+try:
+    import fcntl
+except ImportError:  # windows, power domains are limited within the process only
+    fcntl = None
+
+
+class PowerDomain:
+    """
+    Limits the concurrent power commands of the DUTs sharing a power domain, e.g. a PDU, to a number of slots.
+    Slots are locked files in the temp directory, so the worker processes of a fleet run share them. Only the power
+    commands hold a slot, the DUTs of a domain wait for their power state concurrently.
+    """
+
+    POLL_INTERVAL = 0.1  # seconds between attempts to take a slot
+    _semaphores = {}  # name: threading.Semaphore, without fcntl
+    _semaphores_lock = threading.Lock()
+
+    def __init__(self, name, slots=1):
+        """
+        :param name: name of the power domain, "" for none
+        :type name: str
+        :param slots: power commands of the domain that may run at the same time, defaults to 1
+        :type slots: int, optional
+        """
+        self.name = name
+        self.slots = max(int(slots or 1), 1)
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """
+        Hold a slot of the power domain while the enclosed code runs, no slot is needed without a domain
+        """
+        if not self.name:
+            yield
+            return
+        if fcntl is None:
+            with self._semaphores_lock:
+                semaphore = self._semaphores.setdefault(self.name, threading.Semaphore(self.slots))
+            with semaphore:
+                yield
+            return
+        file_name = "ctam_power_domain_" + re.sub(r"[^\w.-]", "_", self.name)
+        with trace_span("PowerDomain", "wait", domain=self.name):  # not time of the power command
+            lock_file = self._lock_slot(os.path.join(tempfile.gettempdir(), file_name))
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _lock_slot(self, path):
+        while True:
+            for slot in range(self.slots):
+                lock_file = open(f"{path}_{slot}.lock", "a")
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return lock_file
+                except BlockingIOError:
+                    lock_file.close()
+            time.sleep(self.POLL_INTERVAL)  # other processes hold the slots, not time of the test
+
+
+class PowerDriver(abc.ABC):
+    """
+    Powers a DUT off and on. Subclasses implement power and, if they can, get_power_state. Power changes are
+    confirmed by polling the power state every PowerStatePollInterval seconds, at most PowerOffWaitTime or
+    PowerOnWaitTime seconds. Power on is only confirmed once the Redfish service answers as well. Without a readable
+    power state, power off waits PowerOffWaitTime and power on is only confirmed by the Redfish service coming up
+    after it was seen down. Every poll is bounded by the wait time left, every power command by PowerCommandTimeout.
+
+    Drivers are selected by the PowerDriver property of dut_info.json, a name of DRIVERS or the dotted path of a
+    PowerDriver subclass, e.g. "my_package.power.PduDriver".
+    """
+
+    OFF = "Off"
+    ON = "On"
+    MIN_POLL_TIMEOUT = 1  # seconds, a poll at the end of the wait time still gets this long
+
+    def __init__(self, dut):
+        """
+        :param dut: device under test
+        :type dut: CompToolDut
+        """
+        self.dut = dut
+        self.properties = dut.dut_config
+        self.poll_interval = self._get_property("PowerStatePollInterval", 5)
+        self.command_timeout = self._get_property("PowerCommandTimeout", 60)
+        self.domain = PowerDomain(
+            self._get_property("PowerDomain", ""), self._get_property("PowerDomainMaxConcurrent", 1)
+        )
+        self.service_was_down = False
+
+    def _get_property(self, name, default=None):
+        return self.properties.get(name, {}).get("value", default)
+
+    def get_missing_config(self):
+        """
+        :return: message naming the dut_info properties the driver needs and misses, "" if it is configured
+        :rtype: str
+        """
+        return ""
+
+    def describe(self, state):
+        """
+        :param state: PowerDriver.OFF or PowerDriver.ON
+        :type state: str
+        :return: how the driver powers the DUT to state, for the test log
+        :rtype: str
+        """
+        return f"{type(self).__name__} {state}"
+
+    @abc.abstractmethod
+    def power(self, state, timeout=None):
+        """
+        :param state: PowerDriver.OFF or PowerDriver.ON
+        :type state: str
+        :param timeout: seconds the power command may take, defaults to None (no limit)
+        :type timeout: float, optional
+        :raises subprocess.TimeoutExpired: the power command took longer than timeout
+        :raises Exception: the power command failed
+        """
+
+    def get_power_state(self, timeout=None):
+        """
+        :param timeout: seconds the query may take, defaults to None (no limit)
+        :type timeout: float, optional
+        :raises subprocess.TimeoutExpired: a command querying the state took longer than timeout
+        :return: power state, e.g. "On", "Off" or "PoweringOn", None if the driver can not read it
+        :rtype: str
+        """
+        return None
+
+    def is_service_up(self, timeout=None):
+        """
+        :param timeout: seconds the request may take, without retries, defaults to None (client timeout)
+        :type timeout: float, optional
+        :return: True if the Redfish service of the DUT answers
+        :rtype: bool
+        """
+        response = self.dut.run_redfish_command(
+            uri=self.dut.default_prefix or "/redfish/v1", timeout=timeout, max_retry=0
+        )
+        return response is not None and response.status == 200
+
+    def _is_confirmed(self, state, deadline):
+        clock = self.dut.clock
+        try:
+            power_state = self.get_power_state(max(deadline - clock.time(), self.MIN_POLL_TIMEOUT))
+        except subprocess.TimeoutExpired:
+            return False
+        if state == self.OFF:
+            return power_state == self.OFF
+        if power_state not in (None, self.ON):
+            return False
+        service_up = self.is_service_up(max(deadline - clock.time(), self.MIN_POLL_TIMEOUT))
+        if power_state is None:
+            # the service may still be up from before the power command took effect
+            self.service_was_down = self.service_was_down or not service_up
+            return service_up and self.service_was_down
+        return service_up
+
+    def set_power(self, state):
+        """
+        Power the DUT to state and wait until the state is confirmed or its wait time is over
+
+        :param state: PowerDriver.OFF or PowerDriver.ON
+        :type state: str
+        :raises Exception: the power command failed or took longer than PowerCommandTimeout
+        :return: True if the state was confirmed, False if the wait time is over
+        :rtype: bool
+        """
+        # the slot of the power domain is released as well when the command times out
+        with self.domain.acquire(), trace_span(f"Power{state}Command", "power", driver=type(self).__name__):
+            try:
+                self.power(state, self.command_timeout)
+            except subprocess.TimeoutExpired:
+                raise Exception(
+                    f"{self.describe(state)} did not finish within PowerCommandTimeout ({self.command_timeout} s)"
+                )
+        reason = f"Power{state}WaitTime"
+        clock = self.dut.clock
+        deadline = clock.time() + self._get_property(reason, 60 if state == self.OFF else 300)
+        self.service_was_down = False
+        while True:
+            if self._is_confirmed(state, deadline):
+                return True
+            remaining = deadline - clock.time()
+            if remaining <= 0:
+                return False
+            self.dut.sleep(min(self.poll_interval, remaining), reason)
+
+
+class ShellPowerDriver(PowerDriver):
+    """
+    PowerOffCommand and PowerOnCommand of dut_info.json, e.g. commands of a PDU. The optional PowerStateCommand
+    prints the power state, its first word "on" or "off" is the state.
+    """
+
+    def __init__(self, dut):
+        super().__init__(dut)
+        self.commands = {
+            self.OFF: self._get_property("PowerOffCommand", ""),
+            self.ON: self._get_property("PowerOnCommand", ""),
+        }
+        self.state_command = self._get_property("PowerStateCommand", "")
+        cwd_path = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        self.cwd_path = None if cwd_path == "/tmp" else cwd_path
+
+    def get_missing_config(self):
+        if not all(self.commands.values()):
+            return "Please provide both power on and power off command in dut config!"
+        return ""
+
+    def describe(self, state):
+        return self.commands[state]
+
+    def power(self, state, timeout=None):
+        subprocess.check_output(shlex.split(self.commands[state]), cwd=self.cwd_path, timeout=timeout)
+
+    def get_power_state(self, timeout=None):
+        if not self.state_command:
+            return None
+        output = subprocess.check_output(
+            shlex.split(self.state_command), cwd=self.cwd_path, text=True, timeout=timeout
+        )
+        return get_power_state_from_text(output)
+
+
+class RedfishPowerDriver(PowerDriver):
+    """
+    Reset action of the Redfish ComputerSystem or Chassis at PowerResetURI, e.g. {BaseURI}/Systems/HGX_Baseboard_0,
+    for DUTs whose Redfish service stays up while the system is powered off
+    """
+
+    RESET_TYPES = {PowerDriver.OFF: "ForceOff", PowerDriver.ON: "On"}
+
+    def __init__(self, dut):
+        super().__init__(dut)
+        uri = self._get_property("PowerResetURI", "")
+        self.uri = uri and dut.uri_builder.format_uri(redfish_str=uri, component_type="GPU")
+        self.action = "Chassis.Reset" if "/Chassis/" in (self.uri or "") else "ComputerSystem.Reset"
+
+    def get_missing_config(self):
+        return "" if self.uri else "Please provide PowerResetURI in dut config for the redfish power driver!"
+
+    def describe(self, state):
+        return f"POST {self.uri}/Actions/{self.action} ResetType {self.RESET_TYPES[state]}"
+
+    def power(self, state, timeout=None):
+        response = self.dut.run_redfish_command(
+            uri=f"{self.uri}/Actions/{self.action}",
+            mode="POST",
+            body={"ResetType": self.RESET_TYPES[state]},
+            timeout=timeout,
+        )
+        if response is None or response.status not in (200, 202, 204):
+            raise Exception(f"{self.action} {self.RESET_TYPES[state]} of {self.uri} failed: {response and response.text}")
+
+    def get_power_state(self, timeout=None):
+        response = self.dut.run_redfish_command(uri=self.uri, timeout=timeout, max_retry=0)
+        if response is None or response.status != 200:
+            return None
+        return response.dict.get("PowerState")
+
+
+class IpmiPowerDriver(PowerDriver):
+    """
+    Chassis power of the BMC at IpmiAddress over IPMI (lanplus) with IpmiTool, ipmitool by default. The credentials
+    are the .netrc entry of IpmiAddress, the password is passed in the environment.
+    """
+
+    def __init__(self, dut):
+        super().__init__(dut)
+        self.address = self._get_property("IpmiAddress", "")
+        self.tool = self._get_property("IpmiTool", "") or "ipmitool"
+
+    def get_missing_config(self):
+        return "" if self.address else "Please provide IpmiAddress in dut config for the ipmi power driver!"
+
+    def describe(self, state):
+        return f"{self.tool} -H {self.address} chassis power {state.lower()}"
+
+    def _run(self, *arguments, timeout=None):
+        user_name, _, password = self.dut.net_rc.authenticators(self.address) or ("", None, "")
+        return subprocess.check_output(
+            [self.tool, "-I", "lanplus", "-H", self.address, "-U", user_name, "-E", *arguments],
+            env=dict(os.environ, IPMI_PASSWORD=password or ""),
+            text=True,
+            timeout=timeout,
+        )
+
+    def power(self, state, timeout=None):
+        self._run("chassis", "power", state.lower(), timeout=timeout)
+
+    def get_power_state(self, timeout=None):
+        return get_power_state_from_text(self._run("chassis", "power", "status", timeout=timeout))
+
+
+DRIVERS = {"shell": ShellPowerDriver, "redfish": RedfishPowerDriver, "ipmi": IpmiPowerDriver}
+
+
+def get_power_state_from_text(text):
+    """
+    :param text: output of a power state command, e.g. "Chassis Power is on"
+    :type text: str
+    :return: PowerDriver.ON or PowerDriver.OFF, None if the text names neither
+    :rtype: str
+    """
+    match = re.search(r"\b(on|off)\b", text, re.IGNORECASE)
+    return match.group(1).capitalize() if match else None
+
+
+def get_power_driver(dut):
+    """
+    :param dut: device under test
+    :type dut: CompToolDut
+    :raises Exception: unknown power driver
+    :return: power driver selected by the PowerDriver property of dut_info.json, shell by default
+    :rtype: PowerDriver
+    """
+    name = dut.dut_config.get("PowerDriver", {}).get("value", "") or "shell"
+    if name in DRIVERS:
+        return DRIVERS[name](dut)
+    module_name, _, class_name = name.rpartition(".")
+    try:
+        driver_class = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise Exception(f"Unknown PowerDriver {name}, expected one of {list(DRIVERS)} or a class path: {e}")
+    return driver_class(dut)
@@ -0,0 +1,208 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        CPU (cProfile) and allocation (tracemalloc) profiles of the test cases of a test run.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import tracemalloc
+
+from prettytable import PrettyTable
+
+
+class TestProfiler:
+    """
+    Profiles the run() of every test case and keeps its hotspots for the test report. Files written to the output
+    directory per test case:
+
+        - cpu:   <test_id>_<test_name>.prof, cProfile statistics (pstats, snakeviz) and
+                 <test_id>_<test_name>.speedscope.json, the same profile as flame graph for https://www.speedscope.app
+        - alloc: <test_id>_<test_name>.alloc.txt, top TOP_N allocation sites by the memory the test case allocated
+                 and still held at its end, and the largest allocation sites at its end (tracemalloc)
+
+    cProfile profiles the thread of the test case only. tracemalloc traces the whole process, allocations of
+    concurrently running test cases show up in each other's profiles.
+    """
+
+    CPU = "cpu"
+    ALLOC = "alloc"
+    MODES = (CPU, ALLOC)
+    TOP_N = 25
+    HOTSPOTS = 3  # per test case in the report
+    TRACEMALLOC_FRAMES = 10
+
+    def __init__(self, mode, output_dir):
+        """
+        :param mode: TestProfiler.CPU or TestProfiler.ALLOC
+        :type mode: str
+        :param output_dir: directory to write the profiles to, created if it does not exist
+        :type output_dir: str
+        """
+        if mode not in self.MODES:
+            raise Exception(f"Invalid profile mode {mode}, expected one of {self.MODES}")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.hotspots = []  # rows of the hotspot table
+        self.started_tracemalloc = False
+        os.makedirs(output_dir, exist_ok=True)
+
+    @contextlib.contextmanager
+    def profile(self, test_id, test_name):
+        """
+        Profile the enclosed code as the run of a test case
+
+        :param test_id: test id
+        :type test_id: str
+        :param test_name: test name
+        :type test_name: str
+        """
+        file_name = os.path.join(self.output_dir, f"{test_id}_{test_name}")
+        profile = self._profile_cpu if self.mode == self.CPU else self._profile_alloc
+        with profile(test_id, file_name):
+            yield
+
+    @contextlib.contextmanager
+    def _profile_cpu(self, test_id, file_name):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:  # python 3.12+ allows one active profiler per process
+            print(f"[WARNING]: {test_id} is not profiled: {e}")
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{file_name}.prof")
+            stats = {
+                function: function_stats
+                for function, function_stats in pstats.Stats(profiler).stats.items()
+                if "_lsprof.Profiler" not in function[2]
+            }
+            with open(f"{file_name}.speedscope.json", "w") as f:
+                json.dump(self.get_speedscope(stats, os.path.basename(file_name)), f)
+            by_self_time = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+            for function, (_, calls, self_time, cumulative_time, _) in by_self_time[: self.HOTSPOTS]:
+                self.hotspots.append(
+                    [test_id, pstats.func_std_string(function), round(self_time, 3), round(cumulative_time, 3), calls]
+                )
+
+    @contextlib.contextmanager
+    def _profile_alloc(self, test_id, file_name):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.TRACEMALLOC_FRAMES)
+            self.started_tracemalloc = True
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(filters)
+            allocated = [stat for stat in after.compare_to(before, "lineno") if stat.size_diff > 0][: self.TOP_N]
+            with open(f"{file_name}.alloc.txt", "w") as f:
+                f.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n\n")
+                f.write(f"Top {self.TOP_N} allocation sites by memory allocated during the test case:\n")
+                f.writelines(f"{stat}\n" for stat in allocated)
+                f.write(f"\nTop {self.TOP_N} allocation sites at the end of the test case:\n")
+                f.writelines(f"{stat}\n" for stat in after.statistics("lineno")[: self.TOP_N])
+            for stat in allocated[: self.HOTSPOTS]:
+                frame = stat.traceback[0]
+                self.hotspots.append(
+                    [test_id, f"{frame.filename}:{frame.lineno}", round(stat.size_diff / 1024, 1), stat.count_diff]
+                )
+
+    @staticmethod
+    def get_speedscope(stats, name, min_share=1e-4):
+        """
+        Flame graph of cProfile statistics in the speedscope file format. cProfile keeps the time of every caller
+        and callee pair only, not full stacks, so the time of a function is split over its callers in proportion
+        to the time it spent being called by each of them.
+
+        :param stats: cProfile statistics, see pstats.Stats.stats
+        :type stats: dict
+        :param name: name of the profile
+        :type name: str
+        :param min_share: stacks taking less than this share of the total time are left out, defaults to 1e-4
+        :type min_share: float, optional
+        :return: speedscope file content
+        :rtype: dict
+        """
+        frames = []
+        frame_indexes = {}
+        callees = {}  # caller: [(callee, cumulative time of the callee when called by caller)]
+        for function, (_, _, _, _, callers) in stats.items():
+            frame_indexes[function] = len(frames)
+            frames.append({"name": function[2], "file": function[0], "line": function[1]})
+            for caller, caller_stats in callers.items():
+                callees.setdefault(caller, []).append((function, caller_stats[3]))
+        roots = [function for function, function_stats in stats.items() if not function_stats[4]]
+        total_time = sum(stats[function][3] for function in roots)
+        samples = []
+        weights = []
+        pending = [(function, (), stats[function][3]) for function in roots]
+        while pending:
+            function, stack, time_on_stack = pending.pop()
+            _, _, self_time, cumulative_time, _ = stats[function]
+            if time_on_stack < total_time * min_share or function in stack:
+                continue  # negligible, or recursion whose time is already accounted to its first call
+            stack += (function,)
+            share = min(time_on_stack / cumulative_time, 1) if cumulative_time else 0
+            if self_time * share:
+                samples.append([frame_indexes[frame] for frame in stack])
+                weights.append(self_time * share)
+            for callee, callee_time in callees.get(function, []):
+                if callee in stats:
+                    pending.append((callee, stack, callee_time * share))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": name,
+            "exporter": "ctam",
+        }
+
+    def get_hotspot_table(self):
+        """
+        :return: table of the top HOTSPOTS functions by self time (cpu) or allocation sites by allocated memory
+            (alloc) of every profiled test case
+        :rtype: PrettyTable
+        """
+        table = PrettyTable()
+        if self.mode == self.CPU:
+            table.title = "Profile Hotspots (CPU)"
+            table.field_names = ["Test ID", "Function", "Self s", "Cumulative s", "Calls"]
+        else:
+            table.title = "Profile Hotspots (Allocations)"
+            table.field_names = ["Test ID", "Allocation Site", "Allocated KiB", "Blocks"]
+        table.align["Function" if self.mode == self.CPU else "Allocation Site"] = "l"
+        table.add_rows(self.hotspots)
+        return table
+
+    def close(self):
+        """
+        Stop tracing allocations if the profiler started it
+        """
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
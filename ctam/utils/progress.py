@@ -0,0 +1,216 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Progress of a test run with its ETA, shown as progress bar and written to a status file.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from alive_progress import alive_bar
+
+from utils.events import EventBus
+
+
+class RunProgress:
+    """
+    Follows the events of a test run (see EventBus) and keeps the machine readable status of the run in
+    Status.json of the run directory, e.g. for dashboards. Optionally shows a progress bar with the ETA.
+
+    The ETA is the sum of the estimated durations (measured in previous runs, see TestScheduler.estimate_duration)
+    of the tests that did not run yet, plus what is left of the estimates of the running tests.
+
+    The status file is replaced atomically, readers never see a partial file. It is rewritten on every test event
+    and step start, other events update it at most every WRITE_INTERVAL seconds.
+    """
+
+    STATUS_FILE = "Status.json"
+    WRITE_INTERVAL = 1  # seconds
+
+    def __init__(self, event_bus, show_bar=False, version=""):
+        """
+        :param event_bus: event bus of the run
+        :type event_bus: EventBus
+        :param show_bar: show a progress bar on the console, defaults to False
+        :type show_bar: bool, optional
+        :param version: ctam version, written to the status file, defaults to ""
+        :type version: str, optional
+        """
+        self.show_bar = show_bar
+        self.version = version
+        self.lock = threading.Lock()
+        self.status_file = None
+        self.started = None
+        self.planned = {}  # test_id: estimate in seconds
+        self.running = {}  # test_id: {"test_name", "started", "step"}
+        self.finished = {}  # test_id: result
+        self.skipped = set()
+        self.restored = 0
+        self.redfish_calls = 0
+        self.state = "pending"
+        self.exit = {}
+        self.last_write = 0
+        self._bar_context = None
+        self._bar = None
+        self.handlers = {
+            EventBus.RUN_STARTED: self._on_run_started,
+            EventBus.TEST_STARTED: self._on_test_started,
+            EventBus.TEST_SKIPPED: self._on_test_skipped,
+            EventBus.STEP: self._on_step,
+            EventBus.REDFISH_CALL: self._on_redfish_call,
+            EventBus.TEST_FINISHED: self._on_test_finished,
+            EventBus.RUN_FINISHED: self._on_run_finished,
+        }
+        event_bus.subscribe(self.on_event, list(self.handlers))
+
+    def on_event(self, event):
+        """
+        :param event: test run event
+        :type event: dict
+        """
+        with self.lock:
+            write = self.handlers[event["event"]](event)
+            if write or event["timestamp"] - self.last_write >= self.WRITE_INTERVAL:
+                self._write_status(event["timestamp"])
+
+    def _on_run_started(self, event):
+        self.started = event["timestamp"]
+        self.status_file = os.path.join(event["output_dir"], self.STATUS_FILE)
+        for test in event["planned"]:
+            self.planned[test["test_id"]] = test["estimate"]
+        self.restored = event.get("restored", 0)
+        self.state = "running"
+        if self.show_bar and self.planned:
+            self._bar_context = alive_bar(
+                len(self.planned), title="Progress:", spinner="arrow", stats=False, enrich_print=False
+            )
+            self._bar = self._bar_context.__enter__()
+            self._update_bar(event["timestamp"])
+        return True
+
+    def _on_test_started(self, event):
+        self.running[event["test_id"]] = {"test_name": event["test_name"], "started": event["timestamp"], "step": None}
+        return True
+
+    def _on_test_skipped(self, event):
+        if event["test_id"] not in self.planned or event["test_id"] in self.skipped:
+            return False
+        self.running.pop(event["test_id"], None)
+        self.skipped.add(event["test_id"])
+        if self._bar:
+            self._bar(skipped=True)
+            self._update_bar(event["timestamp"])
+            self._close_bar_when_done()
+        return True
+
+    def _on_step(self, event):
+        step_start = event["artifact"].get("testStepStart")
+        if step_start and event["test_id"] in self.running:
+            self.running[event["test_id"]]["step"] = step_start.get("name")
+            return True
+        return False
+
+    def _on_redfish_call(self, event):
+        self.redfish_calls += 1
+        return False
+
+    def _on_test_finished(self, event):
+        self.running.pop(event["test_id"], None)
+        self.finished[event["test_id"]] = event["result"]
+        if self._bar:
+            self._bar()
+            self._update_bar(event["timestamp"])
+            self._close_bar_when_done()
+        return True
+
+    def _on_run_finished(self, event):
+        self.state = "finished"
+        self.exit = {"status_code": event["status_code"], "exit_string": event["exit_string"]}
+        self.running.clear()
+        self._close_bar()
+        return True
+
+    def get_eta(self, now=None):
+        """
+        :param now: time to compute the ETA for, defaults to None (current time)
+        :type now: float, optional
+        :return: estimated seconds until all planned tests finished
+        :rtype: float
+        """
+        now = now if now is not None else time.time()
+        eta = 0
+        for test_id, estimate in self.planned.items():
+            if test_id in self.finished or test_id in self.skipped:
+                continue
+            if test_id in self.running:
+                estimate = max(estimate - (now - self.running[test_id]["started"]), 0)
+            eta += estimate
+        return eta
+
+    def _update_bar(self, now):
+        self._bar.text(f"ETA {timedelta(seconds=round(self.get_eta(now)))}")
+
+    def _close_bar_when_done(self):
+        if len(self.finished) + len(self.skipped) >= len(self.planned):
+            self._close_bar()
+
+    def _close_bar(self):
+        if self._bar_context:
+            self._bar_context.__exit__(None, None, None)
+            self._bar_context = self._bar = None
+
+    def get_status(self, now=None):
+        """
+        :param now: time of the status, defaults to None (current time)
+        :type now: float, optional
+        :return: status of the run as written to the status file
+        :rtype: dict
+        """
+        now = now if now is not None else time.time()
+        eta = 0 if self.state == "finished" else self.get_eta(now)
+        results = list(self.finished.values())
+        status = {
+            "version": self.version,
+            "state": self.state,
+            "started": datetime.fromtimestamp(self.started).isoformat() if self.started else None,
+            "updated": datetime.fromtimestamp(now).isoformat(),
+            "elapsed_seconds": round(now - self.started, 3) if self.started else 0,
+            "eta_seconds": round(eta, 3),
+            "estimated_end": datetime.fromtimestamp(now + eta).isoformat(),
+            "tests": {
+                "planned": len(self.planned),
+                "restored": self.restored,
+                "finished": len(results),
+                "passed": results.count("PASS"),
+                "failed": len(results) - results.count("PASS"),
+                "skipped": len(self.skipped),
+            },
+            "running": [
+                {
+                    "test_id": test_id,
+                    "test_name": test["test_name"],
+                    "started": datetime.fromtimestamp(test["started"]).isoformat(),
+                    "step": test["step"],
+                }
+                for test_id, test in self.running.items()
+            ],
+            "redfish_calls": self.redfish_calls,
+        }
+        status.update(self.exit)
+        return status
+
+    def _write_status(self, now):
+        if not self.status_file:
+            return
+        temp_file = self.status_file + ".tmp"
+        with open(temp_file, "w") as f:
+            json.dump(self.get_status(now), f, indent=4)
+        os.replace(temp_file, self.status_file)
+        self.last_write = now
@@ -0,0 +1,309 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Prometheus metrics of a running test run, served on a local HTTP endpoint and/or written to a
+                     textfile for the node exporter textfile collector.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.events import EventBus
+from utils.run_context import start_thread
+
+
+class PrometheusExporter:
+    """
+    Counters and gauges of a test run in the Prometheus text format: test results, running tests, Redfish requests
+    with their latency histogram, upload throughput, task polls, AC cycles and time spent sleeping.
+
+    Test and operation counters are fed by the events of the run. Redfish request counters and latencies are read
+    from the metrics registry of the DUT when the metrics are rendered, so Redfish calls only take the lock of the
+    exporter when they upload (send at least UPLOAD_MIN_BYTES).
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # seconds
+    UPLOAD_MIN_BYTES = 64 * 1024  # Redfish json bodies are smaller, firmware packages larger
+    TASK_URI = "/TaskService/Tasks/{id}"
+
+    def __init__(self, event_bus, version=""):
+        """
+        :param event_bus: event bus of the run
+        :type event_bus: EventBus
+        :param version: ctam version, defaults to ""
+        :type version: str, optional
+        """
+        self.version = version
+        self.metrics = None  # MetricsRegistry of the dut, set once the dut is created
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.planned = 0
+        self.results = {}  # result: count
+        self.skipped = 0
+        self.running = {}  # test_id: test_name
+        self.operations = {}  # (category, name): [count, seconds]
+        self.upload_bytes = 0
+        self.upload_seconds = 0
+        self.last_upload_throughput = 0
+        self.server = None
+        self.textfile = None
+        self.interval = 15
+        self.stopped = threading.Event()
+        self.textfile_thread = None
+        self.handlers = {
+            EventBus.RUN_STARTED: self._on_run_started,
+            EventBus.TEST_STARTED: self._on_test_started,
+            EventBus.TEST_SKIPPED: self._on_test_skipped,
+            EventBus.TEST_FINISHED: self._on_test_finished,
+            EventBus.REDFISH_CALL: self._on_redfish_call,
+            EventBus.OPERATION: self._on_operation,
+        }
+        event_bus.subscribe(self.on_event, list(self.handlers))
+
+    def on_event(self, event):
+        """
+        :param event: event of the run, see EventBus
+        :type event: dict
+        """
+        self.handlers[event["event"]](event)
+
+    def _on_run_started(self, event):
+        with self.lock:
+            self.planned = len(event["planned"]) + event["restored"]
+
+    def _on_test_started(self, event):
+        with self.lock:
+            self.running[event["test_id"]] = event["test_name"]
+
+    def _on_test_skipped(self, event):
+        with self.lock:
+            self.running.pop(event["test_id"], None)
+            self.skipped += 1
+
+    def _on_test_finished(self, event):
+        with self.lock:
+            self.running.pop(event["test_id"], None)
+            self.results[event["result"]] = self.results.get(event["result"], 0) + 1
+        if self.textfile:
+            self.write_textfile(self.textfile)
+
+    def _on_redfish_call(self, event):
+        if event["bytes_sent"] < self.UPLOAD_MIN_BYTES or not event["latency"]:
+            return
+        with self.lock:
+            self.upload_bytes += event["bytes_sent"]
+            self.upload_seconds += event["latency"]
+            self.last_upload_throughput = event["bytes_sent"] / event["latency"]
+
+    def _on_operation(self, event):
+        key = (event["category"], event["name"])
+        with self.lock:
+            count, seconds = self.operations.get(key, (0, 0))
+            self.operations[key] = [count + 1, seconds + event["duration"]]
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        escaped = (
+            (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for name, value in labels.items()
+        )
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+    def _add_metric(self, lines, name, metric_type, help_text, samples):
+        """
+        :param lines: lines of the exposition to add the metric to
+        :type lines: List[str]
+        :param samples: (name suffix, labels, value) of the samples
+        :type samples: List[tuple]
+        """
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{self._format_labels(labels)} {value}")
+
+    def _get_redfish_samples(self):
+        """
+        :return: samples of the Redfish request metrics by name, from the metrics registry
+        :rtype: dict
+        """
+        samples = {"requests": [], "latency": [], "received": [], "sent": [], "retries": [], "timeouts": []}
+        task_polls = 0
+        for row in self.metrics.get_endpoint_rows() if self.metrics else []:
+            labels = {"method": row["method"], "uri": row["uri"], "status": row["status"]}
+            samples["requests"].append(("", labels, row["calls"]))
+            samples["received"].append(("", labels, row["bytes_in"]))
+            samples["sent"].append(("", labels, row["bytes_out"]))
+            samples["retries"].append(("", labels, row["retries"]))
+            samples["timeouts"].append(("", labels, row["timeouts"]))
+            buckets = row["histogram_us"]
+            for bucket in self.LATENCY_BUCKETS:
+                count = sum(bucket_count for highest, bucket_count in buckets if highest <= bucket * 1_000_000)
+                samples["latency"].append(("_bucket", dict(labels, le=str(bucket)), count))
+            samples["latency"].append(("_bucket", dict(labels, le="+Inf"), row["calls"]))
+            samples["latency"].append(("_sum", labels, round(row["mean_ms"] * row["calls"] / 1000, 6)))
+            samples["latency"].append(("_count", labels, row["calls"]))
+            if row["method"] == "GET" and row["uri"].endswith(self.TASK_URI):
+                task_polls += row["calls"]
+        samples["task_polls"] = [("", {}, task_polls)]
+        return samples
+
+    def render(self):
+        """
+        :return: metrics in the Prometheus text exposition format
+        :rtype: str
+        """
+        lines = []
+        with self.lock:
+            results = dict(self.results)
+            running = dict(self.running)
+            operations = {key: list(value) for key, value in self.operations.items()}
+            planned, skipped = self.planned, self.skipped
+            upload = (self.upload_bytes, self.upload_seconds, self.last_upload_throughput)
+        self._add_metric(lines, "ctam_info", "gauge", "CTAM version", [("", {"version": self.version}, 1)])
+        self._add_metric(
+            lines, "ctam_run_start_time_seconds", "gauge", "Start of the test run", [("", {}, self.start_time)]
+        )
+        self._add_metric(lines, "ctam_tests_planned", "gauge", "Test cases of the run", [("", {}, planned)])
+        self._add_metric(
+            lines,
+            "ctam_tests_total",
+            "counter",
+            "Finished test cases by result",
+            [("", {"result": result}, count) for result, count in sorted(results.items())],
+        )
+        self._add_metric(lines, "ctam_tests_skipped_total", "counter", "Skipped test cases", [("", {}, skipped)])
+        self._add_metric(
+            lines,
+            "ctam_test_running",
+            "gauge",
+            "Running test cases",
+            [("", {"test_id": test_id, "test_name": test_name}, 1) for test_id, test_name in running.items()],
+        )
+
+        redfish = self._get_redfish_samples()
+        for name, metric_type, help_text, key in (
+            ("ctam_redfish_requests_total", "counter", "Redfish requests", "requests"),
+            ("ctam_redfish_request_duration_seconds", "histogram", "Redfish request latency", "latency"),
+            ("ctam_redfish_received_bytes_total", "counter", "Bytes of the Redfish responses", "received"),
+            ("ctam_redfish_sent_bytes_total", "counter", "Bytes of the Redfish request bodies", "sent"),
+            ("ctam_redfish_retries_total", "counter", "Redfish requests sent again", "retries"),
+            ("ctam_redfish_timeouts_total", "counter", "Redfish request attempts that timed out", "timeouts"),
+            ("ctam_task_polls_total", "counter", "Redfish task monitor requests", "task_polls"),
+        ):
+            self._add_metric(lines, name, metric_type, help_text, redfish[key])
+
+        upload_bytes, upload_seconds, last_upload_throughput = upload
+        self._add_metric(lines, "ctam_upload_bytes_total", "counter", "Bytes uploaded", [("", {}, upload_bytes)])
+        self._add_metric(
+            lines, "ctam_upload_seconds_total", "counter", "Time spent uploading", [("", {}, round(upload_seconds, 6))]
+        )
+        self._add_metric(
+            lines,
+            "ctam_last_upload_throughput_bytes_per_second",
+            "gauge",
+            "Throughput of the last upload",
+            [("", {}, round(last_upload_throughput, 3))],
+        )
+        ac_cycles = operations.get(("power", "PowerOnCommand"), [0, 0])[0]
+        self._add_metric(lines, "ctam_ac_cycles_total", "counter", "AC cycles performed", [("", {}, ac_cycles)])
+        for category, name, help_text in (
+            ("sleep", "ctam_sleep_seconds_total", "Time spent sleeping"),
+            ("power", "ctam_power_command_seconds_total", "Time spent in power commands"),
+        ):
+            self._add_metric(
+                lines,
+                name,
+                "counter",
+                help_text,
+                [
+                    ("", {"name": operation}, round(seconds, 6))
+                    for (operation_category, operation), (count, seconds) in sorted(operations.items())
+                    if operation_category == category
+                ],
+            )
+        return "\n".join(lines) + "\n"
+
+    def start_server(self, port, address="127.0.0.1"):
+        """
+        Serve the metrics on http://address:port/metrics in a background thread
+
+        :param port: port to listen on, 0 for any free port
+        :type port: int
+        :param address: address to listen on, defaults to "127.0.0.1"
+        :type address: str, optional
+        :return: the port the metrics are served on
+        :rtype: int
+        """
+        exporter = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", exporter.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((address, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        start_thread(self.server.serve_forever, name="ctam_metrics")
+        return self.server.server_address[1]
+
+    def write_textfile(self, textfile):
+        """
+        Write the metrics to a .prom file, replaced atomically so the textfile collector never reads a partial file
+
+        :param textfile: file to write
+        :type textfile: str
+        """
+        temp_file = f"{textfile}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_file, "w") as f:
+            f.write(self.render())
+        os.replace(temp_file, textfile)
+
+    def start_textfile(self, textfile, interval=15):
+        """
+        Write the metrics to textfile every interval seconds and after every test case in a background thread
+
+        :param textfile: file to write
+        :type textfile: str
+        :param interval: seconds between writes, defaults to 15
+        :type interval: float, optional
+        """
+        self.textfile = textfile
+        self.interval = interval
+        os.makedirs(os.path.dirname(os.path.abspath(textfile)), exist_ok=True)
+
+        def write_periodically():
+            while not self.stopped.wait(self.interval):
+                self.write_textfile(self.textfile)
+
+        self.write_textfile(textfile)
+        self.textfile_thread = start_thread(write_periodically, name="ctam_metrics_textfile")
+
+    def stop(self):
+        """
+        Write the final metrics to the textfile and stop serving them
+        """
+        self.stopped.set()
+        if self.textfile:
+            self.write_textfile(self.textfile)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,435 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        SQLite result store of a test run and comparison of the results of two runs.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import os
+import threading
+from datetime import datetime
+
+from prettytable import PrettyTable
+
+from utils.events import EventBus
+
+try:
+    import sqlite3
+except ImportError:  # python built without sqlite support
+    sqlite3 = None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    name TEXT,
+    kind TEXT,
+    version TEXT,
+    shard TEXT,
+    started TEXT,
+    ended TEXT,
+    status_code INTEGER,
+    exit_string TEXT,
+    total_score REAL,
+    max_score REAL,
+    grade REAL,
+    execution_time REAL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    run_id INTEGER,
+    test_id TEXT,
+    test_name TEXT,
+    compliance_level TEXT,
+    result TEXT,
+    score REAL,
+    score_weight REAL,
+    run_time REAL,
+    execution_time REAL,
+    finished TEXT,
+    PRIMARY KEY (run_id, test_id)
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER,
+    step_id TEXT,
+    test_id TEXT,
+    name TEXT,
+    status TEXT,
+    errors INTEGER,
+    started TEXT,
+    ended TEXT
+);
+CREATE TABLE IF NOT EXISTS redfish_calls (
+    run_id INTEGER,
+    test_id TEXT,
+    method TEXT,
+    uri TEXT,
+    status INTEGER,
+    latency_ms REAL,
+    bytes INTEGER,
+    timestamp TEXT
+);
+CREATE TABLE IF NOT EXISTS scores (
+    run_id INTEGER,
+    kind TEXT,
+    scope TEXT,
+    score REAL,
+    max_score REAL,
+    grade REAL
+);
+"""
+
+
+class ResultStore:
+    """
+    Structured results of a test run in a SQLite database in the output directory of the run:
+
+        - runs:           the run, its version, shard, exit status and totals
+        - tests:          result, score and duration of every finished test case
+        - steps:          OCPTV test steps with their status and number of errors
+        - redfish_calls:  method, URI, status, latency and response size of every Redfish call
+        - scores:         total, compliance level (weighted/normalized) scores of the run
+
+    Test results, steps and Redfish calls are received as events of the run (see subscribe). A resumed run
+    continues the run of its database. Test results are committed as soon as a test case finishes, steps and
+    Redfish calls with the next test result.
+    """
+
+    FILE_NAME = "Results.db"
+
+    def __init__(self, db_file):
+        """
+        :param db_file: database file, created if it does not exist
+        :type db_file: str
+        """
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        row = self.connection.execute("SELECT run_id FROM runs ORDER BY run_id LIMIT 1").fetchone()
+        self.run_id = row[0] if row else None
+        self.open_steps = {}
+
+    @classmethod
+    def open(cls, run_dir):
+        """
+        :param run_dir: output directory of the run
+        :type run_dir: str
+        :return: result store of the run, None if sqlite is not available
+        :rtype: ResultStore
+        """
+        if sqlite3 is None:
+            print("[WARNING]: sqlite3 is not available, the results of the run are not stored in a database")
+            return None
+        return cls(os.path.join(run_dir, cls.FILE_NAME))
+
+    @staticmethod
+    def _now():
+        return datetime.now().strftime("%m-%d-%YT%H:%M:%S")
+
+    def _execute(self, statement, parameters=(), commit=False):
+        with self.lock:
+            self.connection.execute(statement, parameters)
+            if commit:
+                self.connection.commit()
+
+    def start_run(self, name, version, kind="run", shard=None):
+        """
+        Record the start of the run, a resumed run keeps its run
+
+        :param name: name of the run, i.e. its directory name
+        :type name: str
+        :param version: ctam version
+        :type version: str
+        :param kind: "run" or "merged", defaults to "run"
+        :type kind: str, optional
+        :param shard: (index, count) of a sharded run, defaults to None
+        :type shard: tuple, optional
+        """
+        if self.run_id is not None:
+            return
+        shard = f"{shard[0]}/{shard[1]}" if shard else None
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (name, kind, version, shard, started) VALUES (?, ?, ?, ?, ?)",
+                (name, kind, version, shard, self._now()),
+            )
+            self.run_id = cursor.lastrowid
+            self.connection.commit()
+
+    def subscribe(self, event_bus):
+        """
+        Record the tests, steps and Redfish calls published on the event bus of the run
+
+        :param event_bus: event bus of the run
+        :type event_bus: EventBus
+        """
+        event_bus.subscribe(self.on_event, [EventBus.TEST_FINISHED, EventBus.STEP, EventBus.REDFISH_CALL])
+
+    def on_event(self, event):
+        """
+        :param event: test_finished, step or redfish_call event
+        :type event: dict
+        """
+        if event["event"] == EventBus.TEST_FINISHED:
+            self.add_test_result(event["test"])
+        elif event["event"] == EventBus.STEP:
+            self.add_step_artifact(event["artifact"], event["test_id"], event["timestamp"])
+        elif event["event"] == EventBus.REDFISH_CALL:
+            self.add_redfish_call(
+                event["test_id"], event["method"], event["uri"], event["status"], event["latency"], event["bytes"]
+            )
+
+    def add_test_result(self, test_instance):
+        """
+        :param test_instance: test case after teardown, or a restored test result
+        :type test_instance: TestCase
+        """
+        self._execute(
+            "INSERT OR REPLACE INTO tests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.run_id,
+                test_instance.test_id,
+                test_instance.test_name,
+                getattr(test_instance, "compliance_level", ""),
+                test_instance.result.name,
+                test_instance.score,
+                test_instance.score_weight,
+                test_instance.run_time,
+                test_instance.execution_time.total_seconds(),
+                self._now(),
+            ),
+            commit=True,
+        )
+
+    def add_redfish_call(self, test_id, method, uri, status, latency, size):
+        """
+        :param test_id: id of the running test case, None outside of test cases
+        :type test_id: str
+        :param method: HTTP method
+        :type method: str
+        :param uri: requested URI
+        :type uri: str
+        :param status: HTTP status, None if the request failed
+        :type status: int
+        :param latency: response time in seconds
+        :type latency: float
+        :param size: size of the response body in bytes
+        :type size: int
+        """
+        self._execute(
+            "INSERT INTO redfish_calls VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.run_id, test_id, method, uri, status, round(latency * 1000, 3), size, self._now()),
+        )
+
+    def add_step_artifact(self, step, test_id, timestamp):
+        """
+        Record the test steps of the OCPTV output
+
+        :param step: OCPTV testStepArtifact
+        :type step: dict
+        :param test_id: id of the running test case, None outside of test cases
+        :type test_id: str
+        :param timestamp: time of the artifact, seconds since the epoch
+        :type timestamp: float
+        """
+        timestamp = datetime.fromtimestamp(timestamp).strftime("%m-%d-%YT%H:%M:%S.%f")
+        step_id = step.get("testStepId")
+        if "testStepStart" in step:
+            self.open_steps[step_id] = [test_id, step["testStepStart"].get("name"), 0, timestamp]
+        elif "error" in step or step.get("diagnosis", {}).get("type") == "FAIL":
+            if step_id in self.open_steps:
+                self.open_steps[step_id][2] += 1
+        elif "testStepEnd" in step and step_id in self.open_steps:
+            test_id, name, errors, started = self.open_steps.pop(step_id)
+            self._execute(
+                "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.run_id,
+                    step_id,
+                    test_id,
+                    name,
+                    step["testStepEnd"].get("status"),
+                    errors,
+                    started,
+                    timestamp,
+                ),
+            )
+
+    def end_run(self, status_code, exit_string, run_context, scores=None):
+        """
+        :param status_code: exit status of the run
+        :type status_code: int
+        :param exit_string: exit message of the run
+        :type exit_string: str
+        :param run_context: score accumulators of the run, None if the run did not start
+        :type run_context: RunContext
+        :param scores: (kind, scope, score, max score, grade) of the compliance levels, defaults to None
+        :type scores: List[tuple], optional
+        """
+        totals = (None, None, None, None)
+        if run_context:
+            totals = (
+                run_context.total_compliance_score,
+                run_context.max_compliance_score,
+                round(run_context.grade, 2),
+                run_context.total_execution_time,
+            )
+        with self.lock:
+            self.connection.execute(
+                "UPDATE runs SET ended = ?, status_code = ?, exit_string = ?, total_score = ?, max_score = ?, "
+                "grade = ?, execution_time = ? WHERE run_id = ?",
+                (self._now(), status_code, exit_string, *totals, self.run_id),
+            )
+            self.connection.execute("DELETE FROM scores WHERE run_id = ?", (self.run_id,))
+            rows = [("total", "Total", *totals[:3])] if run_context else []
+            self.connection.executemany(
+                "INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.run_id, *row) for row in rows + list(scores or [])],
+            )
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+
+def read_results(db_file):
+    """
+    :param db_file: result store database
+    :type db_file: str
+    :return: kind of the run, {test_id: test row as dict}, {(method, uri): (calls, mean latency ms, error calls)}
+    :rtype: str, dict, dict
+    """
+    connection = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    try:
+        connection.row_factory = sqlite3.Row
+        run = connection.execute("SELECT kind FROM runs ORDER BY run_id LIMIT 1").fetchone()
+        tests = {row["test_id"]: dict(row) for row in connection.execute("SELECT * FROM tests")}
+        calls = {
+            (row["method"], row["uri"]): (row["calls"], row["latency"], row["errors"])
+            for row in connection.execute(
+                "SELECT method, uri, COUNT(*) AS calls, AVG(latency_ms) AS latency, "
+                "SUM(status IS NULL OR status >= 400) AS errors FROM redfish_calls GROUP BY method, uri"
+            )
+        }
+    finally:
+        connection.close()
+    return run["kind"] if run else None, tests, calls
+
+
+class RunComparison:
+    """
+    Compares the results of two runs (a: baseline, b: new run) from their result stores. Regressions are
+    test cases that passed in a and did not pass (or did not run) in b, test cases and Redfish URIs that got
+    slower by more than SLOWDOWN and the minimum absolute difference, and Redfish URIs that returned errors in b
+    only.
+    """
+
+    SLOWDOWN = 0.2  # relative increase of a duration or latency counted as a regression
+    MIN_TEST_SLOWDOWN = 1  # seconds
+    MIN_LATENCY_SLOWDOWN = 10  # ms
+
+    def __init__(self, run_dir_a, run_dir_b):
+        """
+        :param run_dir_a: output directory of the baseline run
+        :type run_dir_a: str
+        :param run_dir_b: output directory of the new run
+        :type run_dir_b: str
+        :raises Exception: a run has no result store
+        """
+        if sqlite3 is None:
+            raise Exception("sqlite3 is not available, runs can not be compared")
+        self.run_dirs = (run_dir_a, run_dir_b)
+        results = []
+        for run_dir in self.run_dirs:
+            db_file = os.path.join(run_dir, ResultStore.FILE_NAME)
+            if not os.path.isfile(db_file):
+                raise Exception(f"No {ResultStore.FILE_NAME} found in {run_dir}")
+            results.append(read_results(db_file))
+        (_, self.tests_a, self.calls_a), (_, self.tests_b, self.calls_b) = results
+
+    def _is_slower(self, a, b, min_difference):
+        return a is not None and b is not None and b - a > min_difference and b > a * (1 + self.SLOWDOWN)
+
+    def compare_tests(self):
+        """
+        :return: rows (test id, test name, result a, result b, run time a, run time b, change, regression)
+        :rtype: List[tuple]
+        """
+        rows = []
+        for test_id in sorted(set(self.tests_a) | set(self.tests_b)):
+            test_a, test_b = self.tests_a.get(test_id, {}), self.tests_b.get(test_id, {})
+            result_a, result_b = test_a.get("result"), test_b.get("result")
+            time_a, time_b = test_a.get("run_time"), test_b.get("run_time")
+            change, regression = "", False
+            if result_a == "PASS" and result_b != "PASS":
+                change, regression = f"Result regression ({result_b or 'not run'})", True
+            elif result_a not in (None, "PASS") and result_b == "PASS":
+                change = "Fixed"
+            elif self._is_slower(time_a, time_b, self.MIN_TEST_SLOWDOWN):
+                change, regression = f"Slower +{(time_b - time_a) / time_a:.0%}", True
+            rows.append(
+                (
+                    test_id,
+                    test_b.get("test_name") or test_a.get("test_name"),
+                    result_a or "-",
+                    result_b or "-",
+                    "-" if time_a is None else time_a,
+                    "-" if time_b is None else time_b,
+                    change,
+                    regression,
+                )
+            )
+        return rows
+
+    def compare_redfish_calls(self):
+        """
+        :return: regression rows (method, uri, calls a, calls b, mean latency ms a, mean latency ms b, change)
+        :rtype: List[tuple]
+        """
+        rows = []
+        for method, uri in sorted(set(self.calls_a) & set(self.calls_b), key=lambda key: (key[1], key[0])):
+            calls_a, latency_a, errors_a = self.calls_a[(method, uri)]
+            calls_b, latency_b, errors_b = self.calls_b[(method, uri)]
+            if errors_b and not errors_a:
+                change = f"{errors_b} error responses"
+            elif self._is_slower(latency_a, latency_b, self.MIN_LATENCY_SLOWDOWN):
+                change = f"Slower +{(latency_b - latency_a) / latency_a:.0%}"
+            else:
+                continue
+            rows.append((method, uri, calls_a, calls_b, round(latency_a, 1), round(latency_b, 1), change))
+        return rows
+
+    def run(self):
+        """
+        Print the comparison tables
+
+        :return: status_code (1 if there are regressions), exit_string
+        :rtype: int, str
+        """
+        test_rows = self.compare_tests()
+        t = PrettyTable(["Test ID", "Test Name", "Result A", "Result B", "Run Time A", "Run Time B", "Change"])
+        t.title = "Test Comparison"
+        t.add_rows([row[:-1] for row in test_rows])
+        t.align["Test Name"] = "l"
+        t.align["Change"] = "l"
+        print(f"A: {self.run_dirs[0]}\nB: {self.run_dirs[1]}")
+        print(t)
+
+        call_rows = self.compare_redfish_calls()
+        if call_rows:
+            ct = PrettyTable(["Method", "URI", "Calls A", "Calls B", "Mean Latency A (ms)", "Mean Latency B (ms)", "Change"])
+            ct.title = "Redfish Call Regressions"
+            ct.add_rows(call_rows)
+            ct.align["URI"] = "l"
+            ct.align["Change"] = "l"
+            print(ct)
+
+        test_regressions = sum(1 for row in test_rows if row[-1])
+        if test_regressions or call_rows:
+            return 1, f"{test_regressions} test and {len(call_rows)} Redfish call regressions"
+        return 0, "No regressions"
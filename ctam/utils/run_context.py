@@ -0,0 +1,122 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Context scoped state of a test run: the DUT, the OCPTV test run and the score accumulators.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import contextvars
+import threading
+
+
+class RunContext:
+    """
+    State shared by the test groups, test cases and interfaces of one test run. The active run context is held
+    in a context variable instead of class attributes, so several runs (e.g. one thread per DUT) or concurrently
+    running test cases of one run can execute in the same process without interfering. Code running in a copy of
+    the context (see contextvars.copy_context) sees the run context of the code that started it.
+    """
+
+    def __init__(self, test_run=None, dut=None):
+        """
+        :param test_run: OCP TestRun
+        :type test_run: tv.TestRun
+        :param dut: Comp Tool Dut interface
+        :type dut: CompToolDut
+        """
+        self.test_run = test_run
+        self.dut = dut
+        self.total_compliance_score = 0  # accumulative
+        self.max_compliance_score = 0
+        self.total_execution_time = 0  # seconds
+        self.test_scheduler = None  # TestScheduler of the run, decides which AC resets are deferred
+        self.ac_reset_pending = False
+        self.tracer = None  # Tracer of the run if it is traced, see utils.tracing
+        self.lock = threading.Lock()
+
+    def add_test_score(self, passed, score, score_weight):
+        """
+        Account the score of a finished test case
+
+        :param passed: True if the test case passed, only then its score counts
+        :type passed: bool
+        :param score: score of the test case
+        :type score: int
+        :param score_weight: maximum score of the test case
+        :type score_weight: int
+        """
+        with self.lock:
+            if passed:
+                self.total_compliance_score += score
+            self.max_compliance_score += score_weight
+
+    def add_execution_time(self, seconds):
+        """
+        :param seconds: execution time of a finished test case
+        :type seconds: float
+        """
+        with self.lock:
+            self.total_execution_time += seconds
+
+    @property
+    def grade(self):
+        """
+        :return: total score in percent of the maximum score
+        :rtype: float
+        """
+        if not self.max_compliance_score:
+            return 0
+        return self.total_compliance_score / self.max_compliance_score * 100
+
+
+_run_context = contextvars.ContextVar("ctam_run_context", default=None)
+
+
+def set_run_context(run_context):
+    """
+    Make run_context the active run context of the current context
+
+    :param run_context: run context
+    :type run_context: RunContext
+    :return: token to restore the previous run context with contextvars.ContextVar.reset
+    :rtype: contextvars.Token
+    """
+    return _run_context.set(run_context)
+
+
+def get_run_context(owner="RunContext"):
+    """
+    :param owner: class name used in the error message
+    :type owner: str
+    :raises NotImplementedError: no run context is active
+    :return: active run context
+    :rtype: RunContext
+    """
+    run_context = _run_context.get()
+    if run_context is None:
+        raise NotImplementedError(f"need to call {owner}.SetUpAssociations")
+    return run_context
+
+
+def start_thread(target, *args, name=None, daemon=True):
+    """
+    Start a thread running target in a copy of the current context, so it sees the run context and the current
+    trace span of the code that started it. Use it instead of threading.Thread for workers that belong to a run
+    and are not started by the test runner.
+
+    :param target: function to run
+    :type target: callable
+    :param args: arguments of target
+    :param name: thread name, defaults to None
+    :type name: str, optional
+    :param daemon: daemon thread, defaults to True
+    :type daemon: bool, optional
+    :return: the started thread
+    :rtype: threading.Thread
+    """
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(target, *args), name=name, daemon=daemon)
+    thread.start()
+    return thread
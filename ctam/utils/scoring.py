@@ -0,0 +1,378 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Running score aggregates of a test run and the reports built from them.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+from prettytable import PrettyTable
+
+
+class ScoringEngine:
+    """
+    Keeps the totals of a test run per domain and per compliance level up to date as test results come in, so
+    the reports can be written at any time during the run without scanning the results again. The number of
+    available test cases per domain and compliance level is taken from the test hierarchy once.
+
+    After every result, write_reports replaces TestReport_<>.json and TestReport_<>.html atomically, so partial
+    results can be read while the run is in progress ("complete" is false until the final reports).
+
+    Domains are the domain_name attributes of the test groups. Every domain known to the test hierarchy gets a
+    row, in discovery order, followed by the domains only seen in results. Results of test cases whose group has
+    no domain_name are accounted to NO_DOMAIN.
+    """
+
+    NO_DOMAIN = "Unassigned"
+
+    def __init__(self, compliance_test_counts, domain_test_counts, weighted_scores=None, normalized_scores=None):
+        """
+        :param compliance_test_counts: available test cases per compliance level, see
+            TestHierarchy.get_compliance_test_cases
+        :type compliance_test_counts: dict
+        :param domain_test_counts: available test cases per domain name, see TestHierarchy.get_domains
+        :type domain_test_counts: dict
+        :param weighted_scores: weight per compliance level of the test runner config, defaults to None
+        :type weighted_scores: dict, optional
+        :param normalized_scores: normalized weight per compliance level of the test runner config, defaults to None
+        :type normalized_scores: dict, optional
+        """
+        self.compliance_test_counts = compliance_test_counts
+        self.domain_test_counts = domain_test_counts
+        self.weighted_scores = weighted_scores
+        self.normalized_scores = normalized_scores
+        self.tests = []
+        self.total_score = 0
+        self.max_score = 0
+        self.execution_time = timedelta(seconds=0)
+        # domain name: accumulators of the domain, reduced per result in add_result
+        self.domains = {domain_name: self._new_domain() for domain_name in domain_test_counts}
+        # rows of the weighted report: level, level weight, available, executed, passed, weight, score, grade, time
+        self.weighted_levels = {}
+        self.normalized_levels = {}
+        if normalized_scores:
+            for c_level, available in compliance_test_counts.items():
+                normalized_weight = normalized_scores[c_level]
+                self.normalized_levels[c_level] = {
+                    "Compliance Level": c_level,
+                    "Normalized Weight": normalized_weight,
+                    "TestCases Available": available,
+                    "Normalized Score": round(normalized_weight / available, 2),
+                    "TestCases Executed": 0,
+                    "TestCases Passed": 0,
+                    "Total Score": 0,
+                    "Max Score": 0,
+                    "Grade": 0,
+                    "Execution Time": timedelta(seconds=0),
+                }
+
+    @staticmethod
+    def _new_domain():
+        return {"executed": 0, "passed": 0, "weight": 0, "score": 0, "execution_time": 0}
+
+    def add_result(
+        self, test_id, test_name, compliance_level, execution_time, score_weight, score, result, domain_name=None
+    ):
+        """
+        :param test_id: test id
+        :type test_id: str
+        :param test_name: test name
+        :type test_name: str
+        :param compliance_level: compliance level of the test case, "" if none
+        :type compliance_level: str
+        :param execution_time: execution time of the test case
+        :type execution_time: timedelta
+        :param score_weight: maximum score of the test case
+        :type score_weight: int
+        :param score: score of the test case
+        :type score: int
+        :param result: result name, e.g. "PASS"
+        :type result: str
+        :param domain_name: domain_name of the group of the test case, defaults to None (NO_DOMAIN)
+        :type domain_name: str, optional
+        """
+        passed = result == "PASS"
+        self.tests.append(
+            {
+                "test_id": test_id,
+                "test_name": test_name,
+                "compliance_level": compliance_level,
+                "domain": domain_name or self.NO_DOMAIN,
+                "execution_time": execution_time,
+                "score_weight": score_weight,
+                "score": score,
+                "result": result,
+            }
+        )
+        if passed:
+            self.total_score += score
+        self.max_score += score_weight
+        self.execution_time += execution_time
+
+        domain = self.domains.get(domain_name or self.NO_DOMAIN)
+        if domain is None:
+            domain = self.domains[domain_name or self.NO_DOMAIN] = self._new_domain()
+        domain["executed"] += 1
+        domain["passed"] += 1 if passed else 0
+        domain["weight"] += score_weight
+        domain["score"] += score
+        domain["execution_time"] += execution_time.total_seconds()
+
+        if self.weighted_scores:
+            if compliance_level in self.weighted_scores:
+                level_weight = self.weighted_scores[compliance_level]
+                self._add_weighted(compliance_level, level_weight, passed, score_weight, score, execution_time)
+            else:
+                self._add_weighted("L3", self.weighted_scores["L3"], passed, 0, 0, execution_time)
+
+        if self.normalized_scores:
+            data = self.normalized_levels.get(compliance_level) or self.normalized_levels["L3"]
+            data["TestCases Executed"] += 1
+            data["TestCases Passed"] += 1 if passed else 0
+            data["Total Score"] = data["Normalized Score"] * data["TestCases Passed"]
+            data["Max Score"] = data["Normalized Score"] * data["TestCases Executed"]
+            data["Execution Time"] += execution_time
+            if compliance_level in self.normalized_levels:
+                data["Grade"] = round(data["TestCases Passed"] / data["TestCases Executed"] * 100, 2)
+            else:
+                data["Grade"] = 0
+
+    def _add_weighted(self, c_level, level_weight, passed, score_weight, score, execution_time):
+        row = self.weighted_levels.get(c_level)
+        if row is None:
+            available = self.compliance_test_counts.get(c_level, 0)
+            row = [c_level, level_weight, available, 0, 0, 0, 0, 0, timedelta(seconds=0)]
+            self.weighted_levels[c_level] = row
+        row[3] += 1
+        row[4] += 1 if passed else 0
+        row[5] += score_weight
+        row[6] += score
+        row[7] = round(row[6] / row[5] * 100, 2) if score_weight else 0
+        row[8] += execution_time
+
+    @property
+    def grade(self):
+        """
+        :return: total score in percent of the maximum score
+        :rtype: float
+        """
+        return round(self.total_score / self.max_score * 100, 2) if self.max_score else 0
+
+    def get_domain_rows(self):
+        """
+        :return: domain, available, executed, passed, weight, score, grade, execution time (seconds) of every domain
+        :rtype: List[list]
+        """
+        rows = []
+        for domain_name, domain in self.domains.items():
+            grade = round(domain["score"] / domain["weight"] * 100, 2) if domain["weight"] else 0
+            rows.append(
+                [
+                    domain_name,
+                    self.domain_test_counts.get(domain_name, 0),
+                    domain["executed"],
+                    domain["passed"],
+                    domain["weight"],
+                    domain["score"],
+                    grade,
+                    domain["execution_time"],
+                ]
+            )
+        return rows
+
+    def get_domain_table(self):
+        """
+        :return: Domain-wise Test Report
+        :rtype: PrettyTable
+        """
+        dt = PrettyTable(["Domain", "TestCases Available","TestCases Executed", "Testcases Passed", "Total Weight", "Total Score", "Grade", "Total Execution Time"])
+        dt.title = "Domain-wise Test Report"
+        rows = self.get_domain_rows()
+        for row in rows:
+            dt.add_row(row[:6] + ["{}%".format(row[6]), timedelta(seconds=row[7])], divider=row is rows[-1])
+        weight = sum(row[4] for row in rows)
+        score = sum(row[5] for row in rows)
+        grade = round(score / weight * 100, 2) if weight else 0
+        dt.add_row(
+            [
+                "Total",
+                sum(row[1] for row in rows),
+                sum(row[2] for row in rows),
+                sum(row[3] for row in rows),
+                weight,
+                score,
+                "{}%".format(grade),
+                timedelta(seconds=sum(row[7] for row in rows)),
+            ],
+            divider=True,
+        )
+        return dt
+
+    def get_weighted_table(self):
+        """
+        :return: Compliance Level Weighted Report
+        :rtype: PrettyTable
+        """
+        rows = [self.weighted_levels[c_level] for c_level in sorted(self.weighted_levels)]
+        total_weight = sum(row[5] for row in rows)
+        total_score = sum(row[6] for row in rows)
+        grade = round((total_score / total_weight * 100), 2) if total_weight else 0
+
+        ct = PrettyTable(["Compliance Level", "Level Weight", "TestCases Available", "TestCases Executed", "TestCases Passed", "Total Weight", "Total Score", "Grade", "Total Execution Time"])
+        ct.title = "Compliance Level Weighted Report"
+        ct.add_rows([list(row) for row in rows])
+        ct.add_row(["","","","","","","","",""], divider=True)
+        ct.add_row(
+            [
+                "Total",
+                "",
+                sum(row[2] for row in rows),
+                sum(row[3] for row in rows),
+                sum(row[4] for row in rows),
+                total_weight,
+                total_score,
+                f"{grade}%",
+                sum((row[8] for row in rows), timedelta(seconds=0)),
+            ]
+        )
+        return ct
+
+    def get_normalized_tables(self):
+        """
+        :return: Compliance Level Normalized Weighted Report and Compliance Level Normalized Weight Overall Report
+        :rtype: PrettyTable, PrettyTable
+        """
+        levels = [self.normalized_levels[c_level] for c_level in sorted(self.normalized_levels)]
+
+        def total(key, start=0):
+            return sum((level[key] for level in levels), start)
+
+        sum_max_score = total("Max Score")
+        grade = round((total("Total Score") / sum_max_score * 100), 2) if sum_max_score else 0
+        available = total("TestCases Available")
+        normalized_grade = round((total("TestCases Passed") / available * 100), 2) if available else 0
+
+        dt = PrettyTable(list(levels[0].keys()) if levels else [])
+        dt.title = "Compliance Level Normalized Weighted Report"
+        dt.add_rows([list(level.values()) for level in levels])
+        dt.add_row(["","","","","","","","", "", ""], divider=True)
+        dt.add_row(
+            [
+                "Total",
+                total("Normalized Weight"),
+                available,
+                total("Normalized Score"),
+                total("TestCases Executed"),
+                total("TestCases Passed"),
+                total("Total Score"),
+                sum_max_score,
+                f"{grade}%",
+                total("Execution Time", timedelta(seconds=0)),
+            ]
+        )
+        dt2 = PrettyTable(["TestCases Available", "TestCases Passed", "Grade"])
+        dt2.title = "Compliance Level Normalized Weight Overall Report"
+        dt2.add_row([available, total("TestCases Passed"), normalized_grade])
+        return dt, dt2
+
+    def get_test_table(self, version):
+        """
+        :param version: ctam version
+        :type version: str
+        :return: Test Result table
+        :rtype: PrettyTable
+        """
+        t = PrettyTable(["Test ID", "Test Name", "Execution Time", "TestCase Weight", "Test Score", "Test Result"])
+        t.title = f"Test Result -  V {version}"
+        t.add_rows(
+            [
+                [test["test_id"], test["test_name"], test["execution_time"], test["score_weight"], test["score"], test["result"]]
+                for test in self.tests
+            ]
+        )
+        t.add_row(["", "", "", "", "", ""], divider=True)
+        t.add_row(["Total", "", self.execution_time, self.max_score, self.total_score, "{}%".format(self.grade)], divider=True)
+        return t
+
+    def get_tables(self, version):
+        """
+        :param version: ctam version
+        :type version: str
+        :return: all report tables in report order
+        :rtype: List[PrettyTable]
+        """
+        tables = [self.get_domain_table()]
+        if self.weighted_scores:
+            tables.append(self.get_weighted_table())
+        if self.normalized_scores:
+            tables.extend(self.get_normalized_tables())
+        tables.append(self.get_test_table(version))
+        return tables
+
+    def get_report(self, version, complete=False):
+        """
+        :param version: ctam version
+        :type version: str
+        :param complete: True if all test cases of the run finished, defaults to False
+        :type complete: bool, optional
+        :return: report of the results so far, json serializable
+        :rtype: dict
+        """
+        domain_keys = ["domain", "available", "executed", "passed", "weight", "score", "grade", "execution_time"]
+        weighted_keys = ["compliance_level", "level_weight", "available", "executed", "passed", "weight", "score", "grade"]
+        return {
+            "version": version,
+            "updated": datetime.now().isoformat(),
+            "complete": complete,
+            "summary": {
+                "tests": len(self.tests),
+                "passed": sum(1 for test in self.tests if test["result"] == "PASS"),
+                "total_score": self.total_score,
+                "max_score": self.max_score,
+                "grade": self.grade,
+                "execution_time": self.execution_time.total_seconds(),
+            },
+            "tests": [dict(test, execution_time=test["execution_time"].total_seconds()) for test in self.tests],
+            "domains": [dict(zip(domain_keys, row)) for row in self.get_domain_rows()],
+            "weighted_compliance_levels": [
+                dict(zip(weighted_keys, row), execution_time=row[8].total_seconds())
+                for _, row in sorted(self.weighted_levels.items())
+            ],
+            "normalized_compliance_levels": [
+                dict(level, **{"Execution Time": level["Execution Time"].total_seconds()})
+                for _, level in sorted(self.normalized_levels.items())
+            ],
+        }
+
+    def write_reports(self, report_file_prefix, version, complete=False):
+        """
+        Atomically replace the json and html report of the run
+
+        :param report_file_prefix: report path without extension, e.g. <run dir>/TestReport_<>
+        :type report_file_prefix: str
+        :param version: ctam version
+        :type version: str
+        :param complete: True if all test cases of the run finished, defaults to False
+        :type complete: bool, optional
+        """
+        report = self.get_report(version, complete)
+        refresh = "" if complete else '<meta http-equiv="refresh" content="30">'
+        html = "\n".join(
+            [
+                f"<html><head><title>CTAM Test Report</title>{refresh}</head><body>",
+                f"<p>Version {version}, {'complete' if complete else 'in progress'}, updated {report['updated']}</p>",
+                *(table.get_html_string() for table in self.get_tables(version)),
+                "</body></html>",
+            ]
+        )
+        for extension, content in ((".json", json.dumps(report, indent=4)), (".html", html)):
+            report_file = report_file_prefix + extension
+            with open(report_file + ".tmp", "w") as f:
+                f.write(content)
+            os.replace(report_file + ".tmp", report_file)
@@ -1,68 +1,505 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
 
-from  sshtunnel import SSHTunnelForwarder, HandlerSSHTunnelForwarderError
+:Description:        SSH tunnels to the Redfish service of a DUT. One keepalive SSH connection per jump host carries
+                     the tunnels to all its remote endpoints and is connected again when the link drops, e.g. while
+                     the DUT is AC cycled. The tunnels can be shared across runs by an SSH tunnel manager process
+                     listening on a local control socket.
 
+:Command line:       Library functions are made as generic as possible.
 
+"""
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+
+import paramiko
+
+
+class SSHConnection:
+    """
+    SSH transport to a jump host, shared by all endpoints forwarded over it. Keepalives detect a dropped link and
+    the transport is connected again when the next forwarded connection is opened, so the local ports of the
+    endpoints stay the same.
+    """
+
+    KEEPALIVE = 15  # seconds between keepalives
+    TIMEOUT = 10  # seconds to connect, authenticate or open a channel
+
+    def __init__(self, ssh_host, ssh_port, ssh_username, ssh_password, log=print):
+        """
+        :param ssh_host: jump host
+        :type ssh_host: str
+        :param ssh_port: SSH port of the jump host
+        :type ssh_port: int
+        :param ssh_username: user name, keys of the SSH agent are tried before the password
+        :type ssh_username: str
+        :param ssh_password: password
+        :type ssh_password: str
+        :param log: function to log messages with, defaults to print
+        :type log: callable, optional
+        """
+        self.ssh_host = ssh_host
+        self.ssh_port = ssh_port
+        self.ssh_username = ssh_username
+        self.ssh_password = ssh_password
+        self.log = log
+        self.transport = None
+        self.connects = 0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        """
+        :return: new authenticated transport
+        :rtype: paramiko.Transport
+        """
+        sock = socket.create_connection((self.ssh_host, self.ssh_port), timeout=self.TIMEOUT)
+        transport = paramiko.Transport(sock)
+        transport.banner_timeout = transport.auth_timeout = self.TIMEOUT
+        try:
+            transport.start_client(timeout=self.TIMEOUT)
+            for key in paramiko.Agent().get_keys():
+                try:
+                    transport.auth_publickey(self.ssh_username, key)
+                    break
+                except paramiko.AuthenticationException:
+                    pass
+            if not transport.is_authenticated():
+                transport.auth_password(self.ssh_username, self.ssh_password)
+        except Exception:
+            transport.close()
+            raise
+        transport.set_keepalive(self.KEEPALIVE)
+        return transport
+
+    def get_transport(self):
+        """
+        :return: the transport, connected again if the link dropped
+        :rtype: paramiko.Transport
+        """
+        with self.lock:
+            if self.transport is not None and self.transport.is_active():
+                return self.transport
+        # connect without the lock, so channels of a live transport are not held up by the connect timeouts
+        transport = self._connect()
+        with self.lock:
+            if self.transport is not None and self.transport.is_active():
+                transport.close()  # connected by another thread meanwhile
+                return self.transport
+            if self.transport:
+                self.transport.close()
+            self.transport = transport
+            self.connects += 1
+            reconnected = self.connects > 1
+        if reconnected:
+            self.log(f"SSH connection to {self.ssh_host}:{self.ssh_port} dropped and is connected again.")
+        return transport
+
+    def open_channel(self, remote_address, origin):
+        """
+        Open a channel to a remote endpoint. A link that dropped without the keepalives noticing yet is connected
+        again once.
+
+        :param remote_address: (host, port) of the remote endpoint, as seen from the jump host
+        :type remote_address: tuple
+        :param origin: (host, port) of the local client
+        :type origin: tuple
+        :return: channel
+        :rtype: paramiko.Channel
+        """
+        for attempt in range(2):
+            transport = self.get_transport()
+            try:
+                return transport.open_channel("direct-tcpip", remote_address, origin, timeout=self.TIMEOUT)
+            except (paramiko.SSHException, EOFError, OSError):
+                if attempt:
+                    raise
+                with self.lock:
+                    if self.transport is transport:
+                        transport.close()
+
+    def close(self):
+        with self.lock:
+            if self.transport:
+                self.transport.close()
+                self.transport = None
 
-class SSHTunnel():
-    def __init__(self, logger) -> None:
-        self.test_info_logger = logger
-        self.ssh_tunnel = None
-        self.binded_port = None
 
+class ForwardedEndpoint:
+    """
+    Local port forwarded to a remote endpoint over an SSH connection, every accepted connection gets its own channel
+    """
 
-    def create_tunnel(self, local_port, remote_host, remote_port, ssh_host, ssh_port, ssh_username, ssh_password):
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, connection, listener, remote_address):
+        """
+        :param connection: SSH connection to forward over
+        :type connection: SSHConnection
+        :param listener: bound and listening local socket
+        :type listener: socket.socket
+        :param remote_address: (host, port) of the remote endpoint, as seen from the jump host
+        :type remote_address: tuple
+        """
+        self.connection = connection
+        self.listener = listener
+        self.remote_address = tuple(remote_address)
+        self.local_port = listener.getsockname()[1]
+        self.users = 0
+        # plain threads, not utils.run_context.start_thread: tunnels are shared by the runs of the process and
+        # must not keep the context of the run that opened them
+        threading.Thread(target=self._accept, name=f"ctam_ssh_tunnel_{self.local_port}", daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, origin = self.listener.accept()
+            except OSError:
+                return  # closed
+            threading.Thread(target=self._forward, args=(client, origin), daemon=True).start()
+
+    def _forward(self, client, origin):
         try:
-            return True, SSHTunnelForwarder(
-                    (ssh_host, ssh_port),
-                    ssh_username=ssh_username,
-                    ssh_password=ssh_password,
-                    remote_bind_address=(remote_host, remote_port),
-                    local_bind_address=('localhost', local_port),
+            channel = self.connection.open_channel(self.remote_address, origin)
+        except Exception as e:
+            self.connection.log(f"[WARNING]: SSH tunnel to {self.remote_address[0]}:{self.remote_address[1]}: {e}")
+            client.close()
+            return
+        try:
+            while True:
+                readable, _, _ = select.select([client, channel], [], [])
+                for source, destination in ((client, channel), (channel, client)):
+                    if source in readable:
+                        data = source.recv(self.BUFFER_SIZE)
+                        if not data:
+                            return
+                        destination.sendall(data)
+        except (OSError, EOFError, paramiko.SSHException):
+            pass
+        finally:
+            channel.close()
+            client.close()
+
+    def close(self):
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)  # wakes up accept
+        except OSError:
+            pass
+        self.listener.close()
+
+
+class SSHTunnelManager:
+    """
+    Tunnels to remote endpoints, by jump host. Forwarding another endpoint of a jump host that is already connected
+    reuses its SSH connection, forwarding an endpoint that is already forwarded reuses its local port.
+    """
+
+    def __init__(self, log=print):
+        """
+        :param log: function to log the messages of the manager and its connections with, defaults to print. Runs
+            using the manager pass their own log to forward.
+        :type log: callable, optional
+        """
+        self.log = log
+        self.lock = threading.Lock()
+        self.connections = {}  # (ssh_host, ssh_port, ssh_username): SSHConnection
+        self.endpoints = {}  # (ssh_host, ssh_port, ssh_username, remote_host, remote_port): ForwardedEndpoint
+
+    @staticmethod
+    def bind_free_port(ports, host="127.0.0.1"):
+        """
+        Bind the first free port in one pass over the ports. The port is kept bound, so no other process can take
+        it before the tunnel listens on it.
+
+        :param ports: candidate ports
+        :type ports: List[int]
+        :param host: local address to bind, defaults to "127.0.0.1"
+        :type host: str, optional
+        :return: listening socket, None if no port is free
+        :rtype: socket.socket
+        """
+        for port in ports:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if os.name == "posix":  # reuse ports in TIME_WAIT of a previous run, not ports in use (as on Windows)
+                listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                listener.bind((host, port))
+                listener.listen()
+                return listener
+            except OSError:
+                listener.close()
+        return None
+
+    def forward(
+        self, local_ports, remote_host, remote_port, ssh_host, ssh_port, ssh_username, ssh_password, log=None
+    ):
+        """
+        Forward a local port to a remote endpoint over the SSH connection of the jump host
+
+        :param local_ports: candidate local ports, the first free one is used
+        :type local_ports: List[int]
+        :param remote_host: remote host, as seen from the jump host
+        :type remote_host: str
+        :param remote_port: remote port
+        :type remote_port: int
+        :param ssh_host: jump host
+        :type ssh_host: str
+        :param ssh_port: SSH port of the jump host
+        :type ssh_port: int
+        :param ssh_username: user name
+        :type ssh_username: str
+        :param ssh_password: password
+        :type ssh_password: str
+        :param log: function to log the messages of this call with, defaults to None (log of the manager)
+        :type log: callable, optional
+        :raises Exception: jump host not reachable or no local port free
+        :return: local port
+        :rtype: int
+        """
+        connection_key = (ssh_host, ssh_port, ssh_username)
+        endpoint_key = connection_key + (remote_host, remote_port)
+        with self.lock:
+            endpoint = self.endpoints.get(endpoint_key)
+            if endpoint is not None:
+                endpoint.users += 1
+                return endpoint.local_port
+            connection = self.connections.get(connection_key)
+            if connection is None:
+                connection = SSHConnection(ssh_host, ssh_port, ssh_username, ssh_password, self.log)
+                self.connections[connection_key] = connection
+            connection.ssh_password = ssh_password
+        # connect without the lock, so an unreachable jump host does not hold up the tunnels of other jump hosts
+        try:
+            connection.get_transport()  # fail here if the jump host is not reachable
+        except Exception:
+            with self.lock:
+                if self.connections.get(connection_key) is connection and not self._has_endpoints(connection_key):
+                    del self.connections[connection_key]
+            raise
+        with self.lock:
+            endpoint = self.endpoints.get(endpoint_key)
+            if endpoint is None:  # not forwarded by another thread meanwhile
+                # the connection is registered again if its last tunnel was released meanwhile
+                connection = self.connections.setdefault(connection_key, connection)
+                listener = self.bind_free_port(local_ports)
+                if listener is None:
+                    if not self._has_endpoints(connection_key):
+                        self.connections.pop(connection_key).close()
+                    raise Exception(
+                        f"Failed to bind port! Please make sure the host machine has port forwarding enabled and "
+                        f"there is at least one port available in {local_ports}."
                     )
-        except HandlerSSHTunnelForwarderError:
-            self.test_info_logger.log(f"Port {ssh_host} is already in use. Skipping..")
-            return False, None
-        except Exception as error:
-            print(error)
-            return False, None
+                endpoint = ForwardedEndpoint(connection, listener, (remote_host, remote_port))
+                self.endpoints[endpoint_key] = endpoint
+                (log or self.log)(
+                    f"Forwarding port {endpoint.local_port} to {remote_host}:{remote_port} via {ssh_host}."
+                )
+            endpoint.users += 1
+            return endpoint.local_port
+
+    def _has_endpoints(self, connection_key):
+        """
+        :param connection_key: (ssh_host, ssh_port, ssh_username) of an SSH connection
+        :type connection_key: tuple
+        :return: whether any endpoint is forwarded over the connection, call with the lock held
+        :rtype: bool
+        """
+        return any(key[:3] == connection_key for key in self.endpoints)
+
+    def release(self, local_port):
+        """
+        Release a forwarded port. The tunnel is closed when it has no users left, the SSH connection when it has no
+        tunnels left.
+
+        :param local_port: port returned by forward
+        :type local_port: int
+        """
+        with self.lock:
+            for endpoint_key, endpoint in list(self.endpoints.items()):
+                if endpoint.local_port != local_port:
+                    continue
+                endpoint.users -= 1
+                if endpoint.users > 0:
+                    return
+                endpoint.close()
+                del self.endpoints[endpoint_key]
+                connection_key = endpoint_key[:3]
+                if not self._has_endpoints(connection_key):
+                    self.connections.pop(connection_key).close()
+                return
+
+    def close(self):
+        """
+        Close all tunnels and SSH connections
+        """
+        with self.lock:
+            for endpoint in self.endpoints.values():
+                endpoint.close()
+            for connection in self.connections.values():
+                connection.close()
+            self.endpoints = {}
+            self.connections = {}
+
+    def serve(self, control_socket):
+        """
+        Share the tunnels with other CTAM processes, e.g. consecutive runs or the workers of a fleet run, over a unix
+        socket only the current user can connect to. Tunnels stay open until the manager is stopped. Blocks until
+        interrupted or terminated.
+
+        One request per connection, a json line with the arguments of forward, answered with a json line
+        {"port": <local port>} or {"error": <message>}.
+
+        :param control_socket: path of the unix socket
+        :type control_socket: str
+        """
+        if os.path.exists(control_socket):
+            os.remove(control_socket)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            server.bind(control_socket)
+        finally:
+            os.umask(umask)
+        server.listen()
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        self.log(f"SSH tunnel manager is listening on {control_socket}")
+        try:
+            while True:
+                client, _ = server.accept()
+                threading.Thread(target=self._handle_request, args=(client,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            os.remove(control_socket)
+            self.close()
+
+    def _handle_request(self, client):
+        with client, client.makefile("rw") as stream:
+            try:
+                response = {"port": self.forward(**json.loads(stream.readline()))}
+            except Exception as e:
+                response = {"error": str(e)}
+            stream.write(json.dumps(response) + "\n")
+            stream.flush()
+
+    @staticmethod
+    def request_forward(control_socket, timeout=60, **forward_args):
+        """
+        Forward a port by the SSH tunnel manager listening on the control socket, see forward
+
+        :param control_socket: path of the unix socket
+        :type control_socket: str
+        :param timeout: seconds to wait for the tunnel, defaults to 60
+        :type timeout: float, optional
+        :raises Exception: the manager failed to forward the port
+        :return: local port, None if no manager is listening on the control socket
+        :rtype: int
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            return None
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(timeout)
+        try:
+            client.connect(control_socket)
+        except OSError:
+            client.close()
+            return None
+        with client, client.makefile("rw") as stream:
+            stream.write(json.dumps(forward_args) + "\n")
+            stream.flush()
+            response = json.loads(stream.readline())
+        if "error" in response:
+            raise Exception(f"SSH tunnel manager {control_socket}: {response['error']}")
+        return response["port"]
+
+
+class SSHTunnel:
+    """
+    SSH tunnel of a DUT. It is taken from the SSH tunnel manager listening on the control socket if there is one,
+    the tunnel then outlives the run. Otherwise it is taken from the tunnel manager of this process, so DUTs behind
+    the same jump host share its SSH connection.
+    """
+
+    _manager = None
+    _manager_lock = threading.Lock()
+
+    def __init__(self, logger, control_socket=None) -> None:
+        """
+        :param logger: test info logger
+        :param control_socket: unix socket of an SSH tunnel manager, defaults to None
+        :type control_socket: str, optional
+        """
+        self.test_info_logger = logger
+        self.control_socket = control_socket
+        self.shared = False
+        self.binded_port = None
+
+    @classmethod
+    def get_manager(cls):
+        """
+        :return: tunnel manager of this process, it logs to the console as it outlives the runs using it
+        :rtype: SSHTunnelManager
+        """
+        with cls._manager_lock:
+            if cls._manager is None:
+                cls._manager = SSHTunnelManager()
+            return cls._manager
 
     def setup_ssh_tunnel(self, local_port, remote_host, remote_port, ssh_host, ssh_port, ssh_username, ssh_password):
         """
         Setup SSH Tunneling to AMC
 
+        :param local_port: candidate local ports
+        :type local_port: List[int]
         :raises Exception: failed port forwarding/ssh tunneling
-        :return: None
-        :rtype: None
+        :return: local port of the tunnel
+        :rtype: int
         """
-        if self.ssh_tunnel:
-            return
+        if self.binded_port:
+            return self.binded_port
 
         if not local_port:
             raise Exception(f"Expecting list of ports to ssh tunnelling, found none!")
         self.port_list = local_port
-        for port in self.port_list:
-            status, self.ssh_tunnel = self.create_tunnel(local_port=port, remote_host=remote_host, remote_port=remote_port, 
-                                             ssh_host=ssh_host, ssh_port=ssh_port,
-                                            ssh_username=ssh_username, ssh_password=ssh_password)
-            if status:
-                self.binded_port = port
-                self.ssh_tunnel.start()
-                break
-            self.test_info_logger.log(f"Failed to bind port {port}.")
-        if self.binded_port is None:
-            raise Exception(f"Failed to bind port! Please make sure the host machine has port forwarding enabled and there is at least one port available in {self.port_list}.")
+        forward_args = dict(
+            local_ports=list(local_port),
+            remote_host=remote_host,
+            remote_port=remote_port,
+            ssh_host=ssh_host,
+            ssh_port=ssh_port,
+            ssh_username=ssh_username,
+            ssh_password=ssh_password,
+        )
+        if self.control_socket:
+            self.binded_port = SSHTunnelManager.request_forward(self.control_socket, **forward_args)
+            if self.binded_port:
+                self.shared = True
+                self.test_info_logger.log(
+                    f"SSH tunnel of the tunnel manager at {self.control_socket} is used at port: {self.binded_port}"
+                )
+                return self.binded_port
+            print(f"[WARNING]: No SSH tunnel manager is listening on {self.control_socket}, tunnel is not shared.")
+        self.binded_port = self.get_manager().forward(**forward_args, log=self.test_info_logger.log)
         msg = f"SSH tunnel established at port: {self.binded_port}"
         self.test_info_logger.log(msg)
         return self.binded_port
-    
+
     def kill_ssh_tunnel(self):
         """
-        Kill SSH Tunneling to AMC
+        Kill SSH Tunneling to AMC, tunnels of the tunnel manager at the control socket are left open
 
         :return: None
         :rtype: None
         """
-        if self.ssh_tunnel:
-            self.ssh_tunnel.close()
+        if self.binded_port and not self.shared:
+            self.get_manager().release(self.binded_port)
             self.test_info_logger.log("SSH tunnel is killed successfully!")
-            self.binded_port = None
\ No newline at end of file
+        self.binded_port = None
+        self.shared = False
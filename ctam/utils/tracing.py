@@ -0,0 +1,322 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Tracing spans of a test run (test group, test case, step, Redfish call, sleep, power command),
+                     exported as Chrome trace events (Perfetto, chrome://tracing) or OTLP json.
+
+:Command line:       Library functions are made as generic as possible.
+
+"""
+import contextlib
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+
+from utils.events import EventBus
+from utils.run_context import get_run_context
+
+_current_span = contextvars.ContextVar("ctam_current_span", default=None)
+
+
+class Span:
+    """
+    Timed operation of a test run. Times are nanoseconds since the epoch, end is None while the span is open.
+    """
+
+    def __init__(self, name, category, parent=None, start=None, **attributes):
+        """
+        :param name: name of the span, e.g. the test id and name
+        :type name: str
+        :param category: kind of operation, e.g. "test", "step", "redfish", "sleep" or "power"
+        :type category: str
+        :param parent: enclosing span, defaults to None
+        :type parent: Span, optional
+        :param start: start time in nanoseconds since the epoch, defaults to None (now)
+        :type start: int, optional
+        """
+        self.name = name
+        self.category = category
+        self.span_id = random.getrandbits(64) or 1
+        self.parent = parent
+        self.start = time.time_ns() if start is None else start
+        self.end = None
+        self.thread = threading.current_thread()
+        self.attributes = attributes
+
+
+class Tracer:
+    """
+    Collects the spans of a test run. The current span is held in a context variable, so spans of concurrently
+    running test cases are nested below their own test case. Step and Redfish call spans are created from the
+    events of the run, see subscribe; group, test case, sleep and power command spans are started by the code
+    that runs them, see trace_span.
+    """
+
+    CHROME = "chrome"
+    OTLP = "otlp"
+    FORMATS = (CHROME, OTLP)
+
+    def __init__(self, version=""):
+        """
+        :param version: ctam version, defaults to ""
+        :type version: str, optional
+        """
+        self.version = version
+        self.trace_id = random.getrandbits(128) or 1
+        self.spans = []  # finished spans
+        self.open_steps = {}  # testStepId: Span
+        self.lock = threading.Lock()
+
+    def start_span(self, name, category, **attributes):
+        """
+        Start a span below the current span and make it the current span
+
+        :param name: name of the span
+        :type name: str
+        :param category: kind of operation
+        :type category: str
+        :return: the started span
+        :rtype: Span
+        """
+        span = Span(name, category, _current_span.get(), **attributes)
+        _current_span.set(span)
+        return span
+
+    def end_span(self, span, **attributes):
+        """
+        End a span started with start_span, its parent becomes the current span again
+
+        :param span: span to end
+        :type span: Span
+        :param attributes: attributes known at the end, e.g. the result
+        """
+        span.end = time.time_ns()
+        span.attributes.update(attributes)
+        if _current_span.get() is span:
+            _current_span.set(span.parent)
+        with self.lock:
+            self.spans.append(span)
+
+    def add_span(self, name, category, start, end, **attributes):
+        """
+        Add a finished span below the current span
+
+        :param name: name of the span
+        :type name: str
+        :param category: kind of operation
+        :type category: str
+        :param start: start time in seconds since the epoch
+        :type start: float
+        :param end: end time in seconds since the epoch
+        :type end: float
+        """
+        span = Span(name, category, _current_span.get(), int(start * 1e9), **attributes)
+        span.end = int(end * 1e9)
+        with self.lock:
+            self.spans.append(span)
+
+    def subscribe(self, event_bus):
+        """
+        Create the step and Redfish call spans from the events of a run. Events are published in the thread of
+        the test case, so the spans are nested below the current span of that test case.
+
+        :param event_bus: event bus of the run
+        :type event_bus: EventBus
+        """
+        event_bus.subscribe(self.on_event, [EventBus.STEP, EventBus.REDFISH_CALL])
+
+    def on_event(self, event):
+        """
+        :param event: step or redfish_call event, see EventBus
+        :type event: dict
+        """
+        if event["event"] == EventBus.REDFISH_CALL:
+            latency = event["latency"] or 0
+            self.add_span(
+                f"{event['method']} {event['uri']}",
+                "redfish",
+                event["timestamp"] - latency,
+                event["timestamp"],
+                test_id=event["test_id"],
+                method=event["method"],
+                uri=event["uri"],
+                status=event["status"],
+                bytes=event["bytes"],
+            )
+            return
+        step = event["artifact"]
+        step_id = step.get("testStepId")
+        if "testStepStart" in step:
+            self.open_steps[step_id] = self.start_span(
+                step["testStepStart"].get("name"), "step", test_id=event["test_id"], step_id=step_id
+            )
+        elif "testStepEnd" in step and step_id in self.open_steps:
+            self.end_span(self.open_steps.pop(step_id), status=step["testStepEnd"].get("status"))
+
+    def get_spans(self):
+        """
+        :return: finished spans, by start time
+        :rtype: List[Span]
+        """
+        with self.lock:
+            return sorted(self.spans, key=lambda span: span.start)
+
+    def get_chrome_trace(self):
+        """
+        :return: Chrome trace event format, one complete event per span and thread name metadata events
+        :rtype: dict
+        """
+        pid = os.getpid()
+        thread_ids = {}
+        events = []
+        for span in self.get_spans():
+            if span.thread not in thread_ids:
+                thread_ids[span.thread] = len(thread_ids) + 1
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": thread_ids[span.thread],
+                        "args": {"name": span.thread.name},
+                    }
+                )
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": span.start / 1000,
+                    "dur": (span.end - span.start) / 1000,
+                    "pid": pid,
+                    "tid": thread_ids[span.thread],
+                    "args": span.attributes,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"version": self.version}}
+
+    @staticmethod
+    def _get_otlp_value(value):
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def get_otlp_trace(self):
+        """
+        :return: OTLP json (ExportTraceServiceRequest) of the spans, failed tests and steps and Redfish calls
+            without success status have the error status
+        :rtype: dict
+        """
+        spans = []
+        for span in self.get_spans():
+            status = span.attributes.get("status") or span.attributes.get("result")
+            failed = status in ("FAIL", "ERROR") or (span.category == "redfish" and not (status and status < 400))
+            otlp_span = {
+                "traceId": f"{self.trace_id:032x}",
+                "spanId": f"{span.span_id:016x}",
+                "name": span.name,
+                "kind": 3 if span.category == "redfish" else 1,  # SPAN_KIND_CLIENT, SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start),
+                "endTimeUnixNano": str(span.end),
+                "attributes": [
+                    {"key": key, "value": self._get_otlp_value(value)}
+                    for key, value in dict(span.attributes, category=span.category, thread=span.thread.name).items()
+                    if value is not None
+                ],
+                "status": {"code": 2 if failed else 0},  # STATUS_CODE_ERROR, STATUS_CODE_UNSET
+            }
+            if span.parent:
+                otlp_span["parentSpanId"] = f"{span.parent.span_id:016x}"
+            spans.append(otlp_span)
+        resource = {"attributes": [{"key": "service.name", "value": {"stringValue": "ctam"}}]}
+        scope = {"name": "ctam", "version": self.version}
+        return {"resourceSpans": [{"resource": resource, "scopeSpans": [{"scope": scope, "spans": spans}]}]}
+
+    def write(self, trace_file, trace_format=CHROME):
+        """
+        :param trace_file: json file to write the trace to
+        :type trace_file: str
+        :param trace_format: Tracer.CHROME or Tracer.OTLP, defaults to Tracer.CHROME
+        :type trace_format: str, optional
+        """
+        trace = self.get_otlp_trace() if trace_format == self.OTLP else self.get_chrome_trace()
+        with open(trace_file, "w") as f:
+            json.dump(trace, f)
+
+
+def get_tracer():
+    """
+    :return: tracer of the active run, None if the run is not traced or no run is active
+    :rtype: Tracer
+    """
+    try:
+        return get_run_context().tracer
+    except NotImplementedError:
+        return None
+
+
+def start_span(name, category, **attributes):
+    """
+    Start a span below the current span if the active run is traced, see Tracer.start_span
+
+    :return: the started span, None if the run is not traced
+    :rtype: Span
+    """
+    tracer = get_tracer()
+    return tracer.start_span(name, category, **attributes) if tracer else None
+
+
+def end_span(span, **attributes):
+    """
+    End a span returned by start_span, does nothing for None
+
+    :param span: span to end
+    :type span: Span
+    """
+    tracer = get_tracer()
+    if tracer and span:
+        tracer.end_span(span, **attributes)
+
+
+@contextlib.contextmanager
+def trace_span(name, category, **attributes):
+    """
+    Trace the enclosed code as a span if the active run is traced and publish it as operation event when it
+    finished, e.g.
+
+        with trace_span("sleep", "sleep", seconds=30):
+            time.sleep(30)
+
+    :param name: name of the span
+    :type name: str
+    :param category: kind of operation, e.g. "sleep" or "power"
+    :type category: str
+    """
+    span = start_span(name, category, **attributes)
+    start = time.time()
+    try:
+        yield span
+    finally:
+        end_span(span)
+        try:
+            dut = get_run_context().dut
+        except NotImplementedError:
+            dut = None
+        if dut is not None and dut.event_bus is not None:
+            dut.event_bus.publish(
+                EventBus.OPERATION,
+                test_id=dut.current_test_id,
+                name=name,
+                category=category,
+                duration=time.time() - start,
+                attributes=attributes,
+            )
@@ -0,0 +1,170 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Synthetic PLDM firmware packages for the Redfish emulator, stand in for the vendor packages of
+                     package_info.json. Writes the packages and their PLDM package JSON to the directory
+                     workspace/package_info.json points at, with the ComponentIdentifiers of the updateable
+                     firmware of the emulator. Negative packages are named after the failing_images of the emulator.
+
+:Command line:       python emulator/fwpkg.py [--output emulator/workspace/fwpkg] [--package-mb 4]
+
+"""
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+import uuid
+from pathlib import Path
+
+EMULATOR_DIR = Path(__file__).resolve().parent
+CTAM_DIR = EMULATOR_DIR.parent / "ctam"
+sys.path.append(str(CTAM_DIR))
+
+from utils.fwpkg_utils import PLDMUnpack
+
+PACKAGE_HEADER_IDENTIFIER = b"\xf0\x18\x87\x8c\xcb\x7d\x49\x43\x98\x00\xa0\x2f\x05\x9a\xca\x02"
+UUID_DESCRIPTOR = 0x0002
+
+# SoftwareIds of the updateable firmware of the emulator (DEFAULT_CONFIG["firmware"] of redfish_emulator.py)
+COMPONENT_IDENTIFIERS = [0x0010, 0x0020]
+
+# package file, its PLDM package JSON (None if the tests do not read it) and version, by image of package_info.json
+PACKAGES = {
+    "GPU_FW_IMAGE": ("emulator-2.0.0.fwpkg", "emulator-2.0.0.json", "2.0.0"),
+    "GPU_FW_IMAGE_OLD": ("emulator-0.9.0.fwpkg", "emulator-0.9.0.json", "0.9.0"),
+    "GPU_FW_IMAGE_BACKUP": ("emulator-1.0.0.fwpkg", "emulator-1.0.0.json", "1.0.0"),
+    "GPU_FW_IMAGE_INVALID_SIGNED": ("emulator-invalid_sign-2.0.0.fwpkg", None, "2.0.0"),
+    "GPU_FW_IMAGE_UNSIGNED_COMPONENT": ("emulator-unsigned_component-2.0.0.fwpkg", None, "2.0.0"),
+    "GPU_FW_IMAGE_UNSIGNED_BUNDLE": ("emulator-unsigned_bundle-2.0.0.fwpkg", None, "2.0.0"),
+}
+
+
+def build_package(path, package_size, components, version="1.0.0", identifiers=None):
+    """
+    :Description:                       Write a PLDM v1.0 package with one device ID record and the given number of
+                                        components. Component images are sparse, the package takes no disk space
+                                        until it is copied.
+
+    :param str path:                    Package file to write
+    :param int package_size:            Package size in bytes
+    :param int components:              Number of component images
+    :param str version:                 Package and component version. Default is "1.0.0".
+    :param list identifiers:            ComponentIdentifier of every component. Default is 0x0010 onwards.
+
+    :returns:                           Path of the package
+    :rtype:                             str
+    """
+    identifiers = identifiers or [0x0010 + component for component in range(components)]
+    version_bytes = version.encode()
+    bitmap_length = 8 * math.ceil(components / 8)
+    applicable_components = ((1 << components) - 1).to_bytes(bitmap_length // 8, "little")
+
+    # PackageHeaderSize (the second field) is only known once the component area is
+    version_info = struct.pack("<HBB", bitmap_length, 1, len(version_bytes)) + version_bytes
+
+    descriptor = struct.pack("<HH", UUID_DESCRIPTOR, 16) + uuid.uuid4().bytes
+    record = struct.pack("<BIBBH", 1, 0, 1, len(version_bytes), 0) + applicable_components
+    record += version_bytes + descriptor
+    device_records = struct.pack("<B", 1) + struct.pack("<H", len(record) + 2) + record
+
+    component_info_size = 2 + components * (22 + len(version_bytes))
+    header_size = len(PACKAGE_HEADER_IDENTIFIER) + 16 + len(version_info) + len(device_records)
+    header_size += component_info_size + 4
+    header = PACKAGE_HEADER_IDENTIFIER + struct.pack("<BH", 1, header_size) + bytes(13) + version_info
+    image_offset = header_size
+    image_size = (package_size - image_offset) // components
+    component_info = struct.pack("<H", components)
+    for component in range(components):
+        component_info += struct.pack(
+            "<HHIHHII", 0x000A, identifiers[component], 0, 0, 0, image_offset + component * image_size, image_size
+        )
+        component_info += struct.pack("<BB", 1, len(version_bytes)) + version_bytes
+
+    with open(path, "wb") as f:
+        f.write(header + device_records + component_info + bytes(4))
+        f.truncate(image_offset + components * image_size)
+    return path
+
+
+def write_package_json(package, json_file):
+    """
+    :Description:                       Write the PLDM package JSON of a package, in the layout of
+                                        json_spec/input/gpu_pldm_pkg_info.json
+
+    :param str package:                 Package file
+    :param str json_file:               PLDM package JSON file to write
+
+    :returns:                           Path of the PLDM package JSON
+    :rtype:                             str
+    """
+    parser = PLDMUnpack(package)
+    if not parser.parse_pldm_package():
+        raise Exception(f"Failed to parse {package}")
+    header = parser.full_header["PackageHeaderInformation"]
+    package_json = {
+        "PackageHeaderInformation": {
+            "PackageHeaderIdentifier": PACKAGE_HEADER_IDENTIFIER.hex(),
+            "PackageHeaderFormatVersion": 1,
+            "PackageVersionString": header.get("PackageVersionString", ""),
+        },
+        "FirmwareDeviceRecords": [
+            {
+                "ComponentImageSetVersionString": header.get("PackageVersionString", ""),
+                # ctam_get_version_from_bundle looks the components up by their decimal ComponentIdentifier
+                "Components": [
+                    {
+                        "ComponentIdentifier": str(int(info["ComponentIdentifier"], 16)),
+                        "ComponentVersionString": info["ComponentVersionString"],
+                        "FWImageSize": info["ComponentSize"],
+                    }
+                    for info in parser.component_img_info_list
+                ],
+            }
+        ],
+    }
+    with open(json_file, "w") as f:
+        json.dump(package_json, f, indent=2)
+    return json_file
+
+
+def generate(output_dir, package_mb=4):
+    """
+    :Description:                       Write the packages and PLDM package JSONs of PACKAGES
+
+    :param str output_dir:              Directory to write to, created if missing
+    :param int package_mb:              Size of every package in MB
+
+    :returns:                           Paths of the written files
+    :rtype:                             list
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    for package_file, json_file, version in PACKAGES.values():
+        package = build_package(
+            os.path.join(output_dir, package_file),
+            package_mb * 1024 * 1024,
+            len(COMPONENT_IDENTIFIERS),
+            version=version,
+            identifiers=COMPONENT_IDENTIFIERS,
+        )
+        files.append(package)
+        if json_file:
+            files.append(write_package_json(package, os.path.join(output_dir, json_file)))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic PLDM packages for the Redfish emulator")
+    parser.add_argument("--output", default=str(EMULATOR_DIR / "workspace" / "fwpkg"))
+    parser.add_argument("--package-mb", type=int, default=4)
+    args = parser.parse_args()
+    for path in generate(args.output, args.package_mb):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Power stub of the Redfish emulator, stands in for the PowerOffCommand and PowerOnCommand of
+                     dut_info.json. Staged firmware of the emulator becomes active with power on. status stands in
+                     for the PowerStateCommand.
+
+:Command line:       python emulator/power.py {on,off,cycle,status} [--url http://127.0.0.1:8000]
+
+"""
+import argparse
+import json
+import sys
+import urllib.request
+
+
+def set_power(url, state):
+    """
+    :param url: emulator url, e.g. http://127.0.0.1:8000
+    :type url: str
+    :param state: "On", "Off" or "Cycle"
+    :type state: str
+    :return: status of the emulator after the power change
+    :rtype: dict
+    """
+    request = urllib.request.Request(
+        url.rstrip("/") + "/emulator/power",
+        data=json.dumps({"State": state}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def get_status(url):
+    """
+    :param url: emulator url, e.g. http://127.0.0.1:8000
+    :type url: str
+    :return: status of the emulator
+    :rtype: dict
+    """
+    with urllib.request.urlopen(url.rstrip("/") + "/emulator/status", timeout=30) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Power the Redfish emulator on or off")
+    parser.add_argument("state", choices=["on", "off", "cycle", "status"])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Emulator url")
+    args = parser.parse_args()
+    try:
+        if args.state == "status":
+            print(f"Power is {'on' if get_status(args.url)['Powered'] else 'off'}")
+        else:
+            print(json.dumps(set_power(args.url, args.state.capitalize())))
+    except OSError as e:
+        print(f"[ERROR]: Power {args.state} of {args.url} failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
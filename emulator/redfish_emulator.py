@@ -0,0 +1,808 @@
+"""
+Copyright (c) NVIDIA CORPORATION
+This source code is licensed under the MIT license found in the
+LICENSE file in the root directory of this source tree.
+
+:Description:        Redfish DUT emulator to run CTAM without hardware, e.g. to benchmark and regression test CTAM.
+                     Serves a configurable Redfish tree (UpdateService, FirmwareInventory, TaskService, LogServices,
+                     TelemetryService, EventService), simulates firmware update tasks and AC power cycles and
+                     injects latency and errors. See power.py for the power commands of dut_info.json.
+
+:Command line:       python emulator/redfish_emulator.py [--config config.json] [--host 127.0.0.1] [--port 8000]
+
+"""
+import argparse
+import base64
+import copy
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+CTAM_DIR = Path(__file__).resolve().parent.parent / "ctam"
+sys.path.append(str(CTAM_DIR))
+
+from utils.fwpkg_utils import PLDMUnpack
+
+ROOT = "/redfish/v1"
+CONTROL = "/emulator"
+
+DEFAULT_CONFIG = {
+    "auth": {"required": False, "username": "admin", "password": "admin"},
+    "system": {
+        "Model": "CTAM Emulated System",
+        "Manufacturer": "CTAM",
+        "HostName": "ctam-emulator",
+        "UUID": "00000000-0000-0000-0000-000000000000",
+        "BiosVersion": "1.0.0",
+        "PartNumber": "EMU-0001",
+        "SerialNumber": "EMU0000001",
+    },
+    "gpus": 8,
+    # firmware components: one inventory member per component and index, "{index}" in Id is replaced by the index
+    "firmware": [
+        {"Id": "FW_GPU_SXM_{index}", "SoftwareId": "0x0010", "Version": "1.0.0", "count": "gpus"},
+        {"Id": "FW_ERoT_GPU_SXM_{index}", "SoftwareId": "0x0020", "Version": "1.0.0", "count": "gpus"},
+        {"Id": "FW_BMC_0", "SoftwareId": "0x0030", "Version": "1.0.0", "Updateable": False},
+    ],
+    "max_image_size": 64 * 1024 * 1024,
+    # seconds an update task runs, and seconds the DUT is not reachable after power on
+    "task_duration": 5,
+    "boot_time": 2,
+    # update tasks of uploaded files whose name matches one of the patterns fail (e.g. negative test images)
+    "failing_images": ["unsigned", "invalid_sign", "corrupt", "invalid_uuid"],
+    # latency added to every request and to requests matching a rule ("uri" regex, optional "method")
+    "latency": {"default_ms": 0, "jitter_ms": 0, "rules": []},
+    # injected errors: "uri" regex, optional "method", "status", optional "probability" (default 1) and "count"
+    "errors": [],
+    "log_entries": 10,
+    # resources added to or replacing the generated tree, by URI
+    "resources": {},
+}
+
+SUCCESS = {
+    "@Message.ExtendedInfo": [
+        {
+            "@odata.type": "#Message.v1_1_1.Message",
+            "MessageId": "Base.1.15.0.Success",
+            "Message": "The request completed successfully.",
+            "MessageArgs": [],
+            "Severity": "OK",
+            "Resolution": "None",
+        }
+    ]
+}
+
+
+def redfish_error(message_id, message):
+    """
+    :param message_id: Redfish message id, e.g. Base.1.15.0.ResourceNotFound
+    :type message_id: str
+    :param message: message text
+    :type message: str
+    :return: Redfish error response body
+    :rtype: dict
+    """
+    return {
+        "error": {
+            "code": message_id,
+            "message": message,
+            "@Message.ExtendedInfo": [{"MessageId": message_id, "Message": message, "Severity": "Critical"}],
+        }
+    }
+
+
+class RedfishEmulator:
+    """
+    State of the emulated DUT: the Redfish resources by URI, the firmware update tasks and the power state.
+
+    Firmware pushed to the UpdateService (the UpdateService itself, HttpPushUri or MultipartHttpPushUri) is parsed
+    as PLDM package. The update task runs task_duration seconds and then stages the component versions of the
+    package on the targets (HttpPushUriTargets, or every updateable component with a SoftwareId of the package).
+    Staged versions become active with the next power on. Packages that can not be parsed, or whose file name
+    matches failing_images, end the task with TaskState Exception and TaskStatus Critical.
+
+    While powered off and for boot_time seconds after power on, every Redfish request gets 503.
+
+    Task and boot durations are measured with the clock of the emulator, which the waits of a CTAM run with a
+    virtual clock advance, see advance_clock.
+    """
+
+    def __init__(self, config=None):
+        """
+        :param config: emulator config, merged over DEFAULT_CONFIG, defaults to None
+        :type config: dict, optional
+        """
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        self.config.update(config or {})
+        self.lock = threading.RLock()
+        self.task_ids = itertools.count(1)
+        self.subscription_ids = itertools.count(1)
+        self.tasks = {}  # task uri: (task resource, end time, staged versions {inventory uri: version} or None)
+        self.staged = {}  # inventory uri: version, active with the next power on
+        self.powered = True
+        self.available_at = 0
+        self.clock_offset = 0  # seconds the clock was advanced
+        self.requests = 0
+        self.error_counts = {}
+        self.resources = self._build_tree()
+
+    @staticmethod
+    def _collection(uri, odata_type, name, members):
+        return {
+            "@odata.id": uri,
+            "@odata.type": f"#{odata_type}.{odata_type}",
+            "Name": name,
+            "Members": [{"@odata.id": member} for member in members],
+            "Members@odata.count": len(members),
+        }
+
+    def _build_tree(self):
+        """
+        :return: Redfish resources by URI
+        :rtype: dict
+        """
+        config = self.config
+        gpus = config["gpus"]
+        system = f"{ROOT}/Systems/HGX_Baseboard_0"
+        manager = f"{ROOT}/Managers/HGX_BMC_0"
+        r = {}
+        r[ROOT] = {
+            "@odata.id": ROOT,
+            "@odata.type": "#ServiceRoot.v1_15_0.ServiceRoot",
+            "Id": "RootService",
+            "Name": "Root Service",
+            "RedfishVersion": "1.17.0",
+            "UUID": config["system"]["UUID"],
+            "Chassis": {"@odata.id": f"{ROOT}/Chassis"},
+            "Systems": {"@odata.id": f"{ROOT}/Systems"},
+            "Managers": {"@odata.id": f"{ROOT}/Managers"},
+            "UpdateService": {"@odata.id": f"{ROOT}/UpdateService"},
+            "TaskService": {"@odata.id": f"{ROOT}/TaskService"},
+            "TelemetryService": {"@odata.id": f"{ROOT}/TelemetryService"},
+            "EventService": {"@odata.id": f"{ROOT}/EventService"},
+            "SessionService": {"@odata.id": f"{ROOT}/SessionService"},
+            "Links": {"Sessions": {"@odata.id": f"{ROOT}/SessionService/Sessions"}},
+        }
+        r[f"{ROOT}/SessionService"] = {
+            "@odata.id": f"{ROOT}/SessionService",
+            "@odata.type": "#SessionService.v1_1_8.SessionService",
+            "Sessions": {"@odata.id": f"{ROOT}/SessionService/Sessions"},
+        }
+        r[f"{ROOT}/SessionService/Sessions"] = self._collection(
+            f"{ROOT}/SessionService/Sessions", "SessionCollection", "Sessions", []
+        )
+
+        chassis = [f"{ROOT}/Chassis/HGX_GPU_SXM_{i}" for i in range(1, gpus + 1)]
+        r[f"{ROOT}/Chassis"] = self._collection(f"{ROOT}/Chassis", "ChassisCollection", "Chassis Collection", chassis)
+        for i, uri in enumerate(chassis, 1):
+            r[uri] = {
+                "@odata.id": uri,
+                "@odata.type": "#Chassis.v1_21_0.Chassis",
+                "Id": f"HGX_GPU_SXM_{i}",
+                "ChassisType": "Module",
+                "SKU": "0x1",
+                "Status": {"State": "Enabled", "Health": "OK"},
+            }
+
+        processors = [f"{system}/Processors/GPU_SXM_{i}" for i in range(1, gpus + 1)]
+        r[f"{ROOT}/Systems"] = self._collection(
+            f"{ROOT}/Systems", "ComputerSystemCollection", "Computer System Collection", [system]
+        )
+        r[system] = dict(
+            config["system"],
+            **{
+                "@odata.id": system,
+                "@odata.type": "#ComputerSystem.v1_20_0.ComputerSystem",
+                "Id": "HGX_Baseboard_0",
+                "ProcessorSummary": {"Count": gpus, "Model": "GPU", "Status": {"State": "Enabled", "Health": "OK"}},
+                "Processors": {"@odata.id": f"{system}/Processors"},
+                "LogServices": {"@odata.id": f"{system}/LogServices"},
+                "Status": {"State": "Enabled", "Health": "OK"},
+            },
+        )
+        r[f"{system}/Processors"] = self._collection(
+            f"{system}/Processors", "ProcessorCollection", "Processor Collection", processors
+        )
+        for i, uri in enumerate(processors, 1):
+            r[uri] = {
+                "@odata.id": uri,
+                "@odata.type": "#Processor.v1_18_0.Processor",
+                "Id": f"GPU_SXM_{i}",
+                "ProcessorType": "GPU",
+                "Status": {"State": "Enabled", "Health": "OK"},
+                "Links": {"Chassis": {"@odata.id": chassis[i - 1]}},
+            }
+
+        r[f"{ROOT}/Managers"] = self._collection(
+            f"{ROOT}/Managers", "ManagerCollection", "Manager Collection", [manager]
+        )
+        r[manager] = {
+            "@odata.id": manager,
+            "@odata.type": "#Manager.v1_17_0.Manager",
+            "Id": "HGX_BMC_0",
+            "ManagerType": "BMC",
+            "LogServices": {"@odata.id": f"{manager}/LogServices"},
+            "Status": {"State": "Enabled", "Health": "OK"},
+        }
+        for parent in (system, manager):
+            self._add_log_services(r, f"{parent}/LogServices")
+
+        inventory = []
+        for component in config["firmware"]:
+            count = component.get("count", 1)
+            count = config[count] if isinstance(count, str) else count
+            for index in range(1, count + 1):
+                component_id = component["Id"].format(index=index)
+                uri = f"{ROOT}/UpdateService/FirmwareInventory/{component_id}"
+                inventory.append(uri)
+                r[uri] = {
+                    "@odata.id": uri,
+                    "@odata.type": "#SoftwareInventory.v1_9_0.SoftwareInventory",
+                    "Id": component_id,
+                    "Name": component_id,
+                    "SoftwareId": component["SoftwareId"],
+                    "Version": component["Version"],
+                    "Updateable": component.get("Updateable", True),
+                    "Status": {"State": "Enabled", "Health": "OK"},
+                    "RelatedItem": [{"@odata.id": chassis[(index - 1) % len(chassis)]}] if chassis else [],
+                }
+        r[f"{ROOT}/UpdateService"] = {
+            "@odata.id": f"{ROOT}/UpdateService",
+            "@odata.type": "#UpdateService.v1_11_3.UpdateService",
+            "Id": "UpdateService",
+            "ServiceEnabled": True,
+            "HttpPushUri": f"{ROOT}/UpdateService/update",
+            "MultipartHttpPushUri": f"{ROOT}/UpdateService/update-multipart",
+            "HttpPushUriTargets": [],
+            "HttpPushUriTargetsBusy": False,
+            "MaxImageSizeBytes": config["max_image_size"],
+            "FirmwareInventory": {"@odata.id": f"{ROOT}/UpdateService/FirmwareInventory"},
+            "SoftwareInventory": {"@odata.id": f"{ROOT}/UpdateService/SoftwareInventory"},
+        }
+        r[f"{ROOT}/UpdateService/FirmwareInventory"] = self._collection(
+            f"{ROOT}/UpdateService/FirmwareInventory", "SoftwareInventoryCollection", "Firmware Inventory", inventory
+        )
+        r[f"{ROOT}/UpdateService/SoftwareInventory"] = self._collection(
+            f"{ROOT}/UpdateService/SoftwareInventory", "SoftwareInventoryCollection", "Software Inventory", []
+        )
+
+        r[f"{ROOT}/TaskService"] = {
+            "@odata.id": f"{ROOT}/TaskService",
+            "@odata.type": "#TaskService.v1_2_0.TaskService",
+            "Id": "TaskService",
+            "ServiceEnabled": True,
+            "Tasks": {"@odata.id": f"{ROOT}/TaskService/Tasks"},
+        }
+        r[f"{ROOT}/TaskService/Tasks"] = self._collection(
+            f"{ROOT}/TaskService/Tasks", "TaskCollection", "Task Collection", []
+        )
+
+        telemetry = f"{ROOT}/TelemetryService"
+        r[telemetry] = {
+            "@odata.id": telemetry,
+            "@odata.type": "#TelemetryService.v1_3_1.TelemetryService",
+            "Id": "TelemetryService",
+            "ServiceEnabled": True,
+            "MetricReportDefinitions": {"@odata.id": f"{telemetry}/MetricReportDefinitions"},
+            "MetricReports": {"@odata.id": f"{telemetry}/MetricReports"},
+        }
+        r[f"{telemetry}/MetricReportDefinitions"] = self._collection(
+            f"{telemetry}/MetricReportDefinitions",
+            "MetricReportDefinitionCollection",
+            "Metric Report Definitions",
+            [f"{telemetry}/MetricReportDefinitions/All"],
+        )
+        r[f"{telemetry}/MetricReportDefinitions/All"] = {
+            "@odata.id": f"{telemetry}/MetricReportDefinitions/All",
+            "@odata.type": "#MetricReportDefinition.v1_4_2.MetricReportDefinition",
+            "Id": "All",
+            "MetricReportDefinitionType": "OnRequest",
+            "MetricReport": {"@odata.id": f"{telemetry}/MetricReports/All"},
+        }
+        r[f"{telemetry}/MetricReports"] = self._collection(
+            f"{telemetry}/MetricReports", "MetricReportCollection", "Metric Reports", [f"{telemetry}/MetricReports/All"]
+        )
+        r[f"{telemetry}/MetricReports/All"] = {
+            "@odata.id": f"{telemetry}/MetricReports/All",
+            "@odata.type": "#MetricReport.v1_5_0.MetricReport",
+            "Id": "All",
+            "MetricValues": [
+                {"MetricProperty": f"{uri}#/Status/Health", "MetricValue": "OK"} for uri in processors
+            ],
+        }
+
+        r[f"{ROOT}/EventService"] = {
+            "@odata.id": f"{ROOT}/EventService",
+            "@odata.type": "#EventService.v1_10_0.EventService",
+            "Id": "EventService",
+            "ServiceEnabled": True,
+            "EventFormatTypes": ["Event", "MetricReport"],
+            "Subscriptions": {"@odata.id": f"{ROOT}/EventService/Subscriptions"},
+        }
+        r[f"{ROOT}/EventService/Subscriptions"] = self._collection(
+            f"{ROOT}/EventService/Subscriptions", "EventDestinationCollection", "Event Subscriptions", []
+        )
+
+        r.update(copy.deepcopy(config["resources"]))
+        return r
+
+    def _add_log_services(self, r, uri):
+        services = [f"{uri}/EventLog", f"{uri}/Dump"]
+        r[uri] = self._collection(uri, "LogServiceCollection", "Log Services", services)
+        for service in services:
+            entries = [f"{service}/Entries/{i}" for i in range(1, self.config["log_entries"] + 1)]
+            r[service] = {
+                "@odata.id": service,
+                "@odata.type": "#LogService.v1_4_0.LogService",
+                "Id": service.rsplit("/", 1)[-1],
+                "Entries": {"@odata.id": f"{service}/Entries"},
+                "Actions": {
+                    "#LogService.ClearLog": {"target": f"{service}/Actions/LogService.ClearLog"},
+                    "#LogService.CollectDiagnosticData": {
+                        "target": f"{service}/Actions/LogService.CollectDiagnosticData"
+                    },
+                },
+            }
+            r[f"{service}/Entries"] = self._collection(
+                f"{service}/Entries", "LogEntryCollection", "Log Entries", entries
+            )
+            for i, entry in enumerate(entries, 1):
+                r[entry] = {
+                    "@odata.id": entry,
+                    "@odata.type": "#LogEntry.v1_15_0.LogEntry",
+                    "Id": str(i),
+                    "EntryType": "Event",
+                    "Severity": "OK",
+                    "Created": datetime.now().isoformat(),
+                    "Message": f"Emulated log entry {i}",
+                }
+
+    def _add_member(self, collection_uri, uri, resource):
+        collection = self.resources[collection_uri]
+        collection["Members"].append({"@odata.id": uri})
+        collection["Members@odata.count"] = len(collection["Members"])
+        self.resources[uri] = resource
+
+    def _remove_member(self, uri):
+        self.resources.pop(uri)
+        collection = self.resources.get(uri.rsplit("/", 1)[0])
+        if collection and "Members" in collection:
+            collection["Members"] = [member for member in collection["Members"] if member["@odata.id"] != uri]
+            collection["Members@odata.count"] = len(collection["Members"])
+
+    def now(self):
+        """
+        :return: time of the emulator clock, seconds since the epoch
+        :rtype: float
+        """
+        return time.time() + self.clock_offset
+
+    def advance_clock(self, seconds):
+        """
+        :param seconds: seconds to advance the emulator clock by
+        :type seconds: float
+        """
+        with self.lock:
+            self.clock_offset += max(seconds, 0)
+
+    def _update_tasks(self, now):
+        """
+        Finish the update tasks whose duration elapsed, staging the component versions of successful updates
+        """
+        for uri, (task, end_time, versions) in list(self.tasks.items()):
+            if task["TaskState"] != "Running":
+                continue
+            duration = self.config["task_duration"]
+            task["PercentComplete"] = min(100, int(100 - (end_time - now) / duration * 100)) if duration else 100
+            if now < end_time:
+                continue
+            task["PercentComplete"] = 100
+            task["EndTime"] = datetime.now().isoformat()
+            if versions is None:
+                task["TaskState"] = "Exception"
+                task["TaskStatus"] = "Critical"
+            else:
+                task["TaskState"] = "Completed"
+                task["TaskStatus"] = "OK"
+                self.staged.update(versions)
+
+    def power(self, state):
+        """
+        :param state: "On", "Off" or "Cycle" (off and on)
+        :type state: str
+        """
+        with self.lock:
+            if state in ("Off", "Cycle"):
+                self.powered = False
+            if state in ("On", "Cycle") and not self.powered:
+                self.powered = True
+                self.available_at = self.now() + self.config["boot_time"]
+                for uri, version in self.staged.items():
+                    self.resources[uri]["Version"] = version
+                self.staged.clear()
+
+    def get_status(self):
+        """
+        :return: state of the emulator, served at /emulator/status
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "Powered": self.powered,
+                "Available": self.powered and self.now() >= self.available_at,
+                "Requests": self.requests,
+                "Tasks": len(self.tasks),
+                "StagedVersions": dict(self.staged),
+            }
+
+    def get_latency(self, method, path):
+        """
+        :return: seconds to delay the response of the request
+        :rtype: float
+        """
+        latency = self.config["latency"]
+        milliseconds = latency.get("default_ms", 0) + random.uniform(0, latency.get("jitter_ms", 0))
+        for rule in latency.get("rules", []):
+            if rule.get("method", method) == method and re.search(rule["uri"], path):
+                milliseconds += rule.get("ms", 0)
+        return milliseconds / 1000
+
+    def get_injected_error(self, method, path):
+        """
+        :return: status code of an injected error for the request, None if no error is injected
+        :rtype: int
+        """
+        with self.lock:
+            for index, rule in enumerate(self.config["errors"]):
+                if rule.get("method", method) != method or not re.search(rule["uri"], path):
+                    continue
+                if "count" in rule and self.error_counts.get(index, 0) >= rule["count"]:
+                    continue
+                if random.random() < rule.get("probability", 1):
+                    self.error_counts[index] = self.error_counts.get(index, 0) + 1
+                    return rule.get("status", 500)
+        return None
+
+    def get(self, path, query):
+        """
+        :param path: resource URI
+        :type path: str
+        :param query: query string, $expand inlines the members of a collection
+        :type query: str
+        :return: status code, response body
+        :rtype: int, dict
+        """
+        with self.lock:
+            self._update_tasks(self.now())
+            resource = self.resources.get(path)
+            if resource is None:
+                return 404, redfish_error("Base.1.15.0.ResourceNotFound", f"The resource {path} was not found.")
+            resource = copy.deepcopy(resource)
+            if "$expand" in unquote(query) and "Members" in resource:
+                resource["Members"] = [
+                    copy.deepcopy(self.resources.get(member["@odata.id"], member)) for member in resource["Members"]
+                ]
+            return 200, resource
+
+    def patch(self, path, body):
+        """
+        Update the existing properties of a resource
+
+        :return: status code, response body
+        :rtype: int, dict
+        """
+        with self.lock:
+            resource = self.resources.get(path)
+            if resource is None:
+                return 404, redfish_error("Base.1.15.0.ResourceNotFound", f"The resource {path} was not found.")
+            unknown = [key for key in body if key not in resource]
+            if unknown:
+                return 400, redfish_error("Base.1.15.0.PropertyUnknown", f"The properties {unknown} are unknown.")
+            resource.update(body)
+            return 200, SUCCESS
+
+    def post(self, path, body, content_type):
+        """
+        :param body: request body
+        :type body: bytes
+        :param content_type: Content-Type header of the request
+        :type content_type: str
+        :return: status code, response body, response headers
+        :rtype: int, dict, dict
+        """
+        update_service = self.resources[f"{ROOT}/UpdateService"]
+        if path in (f"{ROOT}/UpdateService", update_service["HttpPushUri"], update_service["MultipartHttpPushUri"]):
+            return self.push_firmware(body, content_type)
+        with self.lock:
+            if path == f"{ROOT}/EventService/Subscriptions":
+                subscription = json.loads(body or b"{}")
+                uri = f"{path}/{next(self.subscription_ids)}"
+                subscription.update(
+                    {
+                        "@odata.id": uri,
+                        "@odata.type": "#EventDestination.v1_13_0.EventDestination",
+                        "Id": uri.rsplit("/", 1)[-1],
+                    }
+                )
+                self._add_member(path, uri, subscription)
+                return 201, subscription, {"Location": uri}
+            if path.endswith("/Actions/LogService.ClearLog"):
+                entries = path.rsplit("/Actions/", 1)[0] + "/Entries"
+                if entries in self.resources:
+                    for member in list(self.resources[entries]["Members"]):
+                        self._remove_member(member["@odata.id"])
+                    return 200, SUCCESS, {}
+            elif "/Actions/" in path:
+                return 200, SUCCESS, {}
+        return 405, redfish_error("Base.1.15.0.ActionNotSupported", f"POST is not supported on {path}."), {}
+
+    def delete(self, path):
+        """
+        :return: status code, response body
+        :rtype: int, dict
+        """
+        with self.lock:
+            if path.startswith(f"{ROOT}/EventService/Subscriptions/") and path in self.resources:
+                self._remove_member(path)
+                return 200, SUCCESS
+        return 405, redfish_error("Base.1.15.0.ActionNotSupported", f"DELETE is not supported on {path}.")
+
+    def push_firmware(self, body, content_type):
+        """
+        Start an update task for a pushed firmware package
+
+        :return: status code, response body (the task), response headers
+        :rtype: int, dict, dict
+        """
+        file_name, image = "", body
+        if content_type.startswith("multipart/form-data"):
+            message = BytesParser(policy=default_policy).parsebytes(
+                b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+            )
+            for part in message.iter_parts():
+                if part.get_param("name", header="content-disposition") == "UpdateFile":
+                    file_name, image = part.get_filename() or "", part.get_payload(decode=True) or b""
+        if len(image) > self.config["max_image_size"]:
+            return 413, redfish_error("Base.1.15.0.PayloadTooLarge", "The image exceeds MaxImageSizeBytes."), {}
+
+        versions = self._get_package_versions(image)
+        failing = any(re.search(pattern, os.path.basename(file_name)) for pattern in self.config["failing_images"])
+        with self.lock:
+            staged = None
+            messages = []
+            if versions is None or failing:
+                messages.append(
+                    {
+                        "MessageId": "Update.1.0.VerificationFailed",
+                        "Message": f"Verification of image {file_name} failed.",
+                        "MessageArgs": [os.path.basename(file_name)],
+                        "Severity": "Critical",
+                    }
+                )
+            else:
+                targets = self.resources[f"{ROOT}/UpdateService"]["HttpPushUriTargets"]
+                inventory = self.resources[f"{ROOT}/UpdateService/FirmwareInventory"]["Members"]
+                staged = {}
+                for member in inventory:
+                    component = self.resources[member["@odata.id"]]
+                    if targets and member["@odata.id"] not in targets or not component["Updateable"]:
+                        continue
+                    version = versions.get(int(component["SoftwareId"], 16))
+                    if version is not None:
+                        staged[member["@odata.id"]] = version
+                        messages.append(
+                            {
+                                "MessageId": "Update.1.0.UpdateSuccessful",
+                                "Message": f"Device {component['Id']} successfully updated with image {version}.",
+                                "MessageArgs": [component["Id"], version],
+                                "Severity": "OK",
+                            }
+                        )
+            task_id = str(next(self.task_ids))
+            uri = f"{ROOT}/TaskService/Tasks/{task_id}"
+            task = {
+                "@odata.id": uri,
+                "@odata.type": "#Task.v1_4_3.Task",
+                "Id": task_id,
+                "Name": f"Task {task_id}",
+                "TaskState": "Running",
+                "TaskStatus": "OK",
+                "PercentComplete": 0,
+                "StartTime": datetime.now().isoformat(),
+                "Messages": messages,
+            }
+            self._add_member(f"{ROOT}/TaskService/Tasks", uri, task)
+            self.tasks[uri] = (task, self.now() + self.config["task_duration"], staged)
+            self._update_tasks(self.now())
+            return 202, copy.deepcopy(task), {"Location": uri}
+
+    @staticmethod
+    def _get_package_versions(image):
+        """
+        :param image: pushed firmware package
+        :type image: bytes
+        :return: {component identifier: version} of the components of a PLDM package, None if it can not be parsed
+        :rtype: dict
+        """
+        with tempfile.NamedTemporaryFile(suffix=".fwpkg", delete=False) as f:
+            f.write(image)
+        try:
+            package = PLDMUnpack(f.name)
+            if not package.parse_pldm_package():
+                return None
+            return {
+                int(info["ComponentIdentifier"], 16): info["ComponentVersionString"]
+                for info in package.component_img_info_list
+            }
+        except Exception:
+            return None
+        finally:
+            os.remove(f.name)
+
+
+class RedfishRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP front end of a RedfishEmulator (server.emulator). Control endpoints:
+
+        - POST /emulator/power {"State": "On" | "Off" | "Cycle"}
+        - POST /emulator/clock {"Advance": seconds}
+        - GET /emulator/status
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "CTAMRedfishEmulator/1.0"
+    # headers and body are separate writes, with Nagle every keep-alive response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("OData-Version", "4.0")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _authorized(self):
+        auth = self.server.emulator.config["auth"]
+        if not auth.get("required"):
+            return True
+        expected = base64.b64encode(f"{auth['username']}:{auth['password']}".encode()).decode()
+        return self.headers.get("Authorization", "") == f"Basic {expected}"
+
+    def _handle(self, method):
+        emulator = self.server.emulator
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        body = self._read_body()
+        with emulator.lock:
+            emulator.requests += 1
+
+        if path == f"{CONTROL}/power" and method == "POST":
+            state = json.loads(body or b"{}").get("State", "Cycle")
+            emulator.power(state)
+            return self._send(200, emulator.get_status())
+        if path == f"{CONTROL}/clock" and method == "POST":
+            emulator.advance_clock(json.loads(body or b"{}").get("Advance", 0))
+            return self._send(200, emulator.get_status())
+        if path == f"{CONTROL}/status":
+            return self._send(200, emulator.get_status())
+
+        if not path.startswith(ROOT):
+            return self._send(404, redfish_error("Base.1.15.0.ResourceNotFound", f"{path} is not a Redfish URI."))
+        if not self._authorized():
+            return self._send(401, redfish_error("Base.1.15.0.AccessDenied", "Authentication required."))
+        status = emulator.get_status()
+        if not status["Available"]:
+            return self._send(503, redfish_error("Base.1.15.0.ServiceTemporarilyUnavailable", "The DUT is not up."))
+
+        latency = emulator.get_latency(method, path)
+        if latency:
+            time.sleep(latency)
+        error_status = emulator.get_injected_error(method, path)
+        if error_status:
+            return self._send(error_status, redfish_error("Base.1.15.0.InternalError", "Injected error."))
+
+        if method == "GET":
+            return self._send(*emulator.get(path, url.query))
+        if method == "PATCH":
+            try:
+                patch = json.loads(body or b"{}")
+            except json.JSONDecodeError:
+                return self._send(400, redfish_error("Base.1.15.0.MalformedJSON", "The request body is malformed."))
+            return self._send(*emulator.patch(path, patch))
+        if method == "POST":
+            return self._send(*emulator.post(path, body, self.headers.get("Content-Type", "")))
+        return self._send(*emulator.delete(path))
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def create_server(config=None, host="127.0.0.1", port=8000, verbose=False):
+    """
+    :param config: emulator config, defaults to None (DEFAULT_CONFIG)
+    :type config: dict, optional
+    :param host: address to listen on, defaults to "127.0.0.1"
+    :type host: str, optional
+    :param port: port to listen on, 0 for any free port, defaults to 8000
+    :type port: int, optional
+    :param verbose: log every request, defaults to False
+    :type verbose: bool, optional
+    :return: server, its emulator is server.emulator and its port server.server_address[1]
+    :rtype: ThreadingHTTPServer
+    """
+    server = ThreadingHTTPServer((host, port), RedfishRequestHandler)
+    server.daemon_threads = True
+    server.emulator = RedfishEmulator(config)
+    server.verbose = verbose
+    return server
+
+
+def start_emulator(config=None, host="127.0.0.1", port=8000, verbose=False):
+    """
+    Start the emulator in a daemon thread, e.g. for benchmarks. Parameters as create_server.
+
+    :return: running server, stop it with server.shutdown()
+    :rtype: ThreadingHTTPServer
+    """
+    server = create_server(config, host, port, verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redfish DUT emulator for CTAM")
+    parser.add_argument("--config", help="Emulator config (json), merged over the default config")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    config = None
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    server = create_server(config, args.host, args.port, args.verbose)
+    print(f"Redfish emulator listening on http://{args.host}:{server.server_address[1]}{ROOT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()